@@ -0,0 +1,587 @@
+"""
+Benchmarks de rendimiento de Focus Title.
+
+Uso:
+    python benchmarks.py                 # ejecuta todos
+    python benchmarks.py commit          # ejecuta solo uno
+    python benchmarks.py export          # tamaño y velocidad de cada formato de exportación
+    python benchmarks.py search          # latencia de la búsqueda de texto completo
+    python benchmarks.py report          # informe de tiempo desde los totales por día
+    python benchmarks.py contention      # latencia de lectura con escrituras concurrentes
+    python benchmarks.py memory          # memoria por tarea y tiempo de carga de 100k tareas
+    python benchmarks.py wakeups         # despertares por hora del temporizador en pantalla
+    python benchmarks.py drift           # deriva del temporizador tras millones de pausas (reloj simulado)
+    python benchmarks.py concurrent      # costo por tick con cientos de temporizadores en marcha
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from database import Database, DELETED_PAGE_SIZE, STORAGE_PROFILES
+from exporter import EXPORT_FORMATS, export_tasks
+from models import NS_PER_SECOND, TaskFactory, TaskTimer, TimerState
+from rollups import roll_up_interval
+from ticker import TickScheduler
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silencia los mensajes de depuración de la base de datos durante la medición"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_commit_latency(iterations=300):
+    """Latencia de guardar una tarea (un commit) con cada perfil de almacenamiento"""
+    print(f"Latencia de commit por perfil ({iterations} guardados de una tarea)")
+    print(f"{'perfil':<10} {'mediana ms':>12} {'p95 ms':>10} {'máx ms':>10}")
+    for profile in STORAGE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with quiet():
+                db = Database(os.path.join(tmp_dir, "bench.db"), storage_profile=profile)
+                latencies = []
+                for i in range(iterations):
+                    task = TaskFactory.create_task(f"Tarea {i}", "Nota de prueba")
+                    start = time.perf_counter()
+                    db.save_task(task)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                db.close()
+        print(f"{profile:<10} {statistics.median(latencies):>12.3f} "
+              f"{percentile(latencies, 0.95):>10.3f} {max(latencies):>10.3f}")
+
+
+def bench_export_formats(rows=200_000):
+    """Tamaño y velocidad de cada formato de exportación sobre un historial grande"""
+    print(f"Exportación de {rows} tareas eliminadas por formato")
+    print(f"{'formato':<10} {'segundos':>10} {'filas/s':>12} {'MB':>8} {'MB/s':>8} {'vs csv':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with quiet():
+            db = Database(os.path.join(tmp_dir, "bench.db"))
+            db.connection.executemany(
+                "INSERT INTO tasks (title, note, link, elapsed_time, deleted_at) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                ((f"Tarea {i}", f"Nota de la tarea {i} con algo de texto", f"https://example.com/{i % 97}", i % 20000)
+                 for i in range(rows))
+            )
+            db.connection.commit()
+        csv_size = None
+        for name, export_format in EXPORT_FORMATS.items():
+            if not export_format.available():
+                print(f"{name:<10} no disponible (falta {export_format.requires})")
+                continue
+            path = os.path.join(tmp_dir, f"export{export_format.extension}")
+            with quiet():
+                start = time.perf_counter()
+                export_tasks(db, path, name)
+                elapsed = time.perf_counter() - start
+            size = os.path.getsize(path)
+            csv_size = csv_size or size
+            print(f"{name:<10} {elapsed:>10.2f} {rows / elapsed:>12.0f} {size / 1e6:>8.1f} "
+                  f"{size / 1e6 / elapsed:>8.1f} {size / csv_size:>8.2f}")
+        with quiet():
+            db.close()
+
+
+def bench_search(rows=120_000, repeats=50):
+    """Latencia de Database.search sobre un historial grande con un vocabulario realista"""
+    rng = random.Random(42)
+    syllables = ["ca", "ción", "re", "mo", "ta", "di", "se", "ño", "in", "for", "lu", "pe", "dro", "án", "sis"]
+    vocabulary = sorted({"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(8000)})
+    # Frecuencias tipo Zipf: pocas palabras muy comunes y muchas raras
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    
+    def text(words):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words))
+    
+    print(f"Búsqueda de texto completo en {rows} tareas ({repeats} repeticiones por consulta)")
+    print(f"{'consulta':<24} {'resultados':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with quiet():
+            db = Database(os.path.join(tmp_dir, "bench.db"))
+            deleted_rows = rows // 4
+            db.connection.executemany(
+                "INSERT INTO tasks (title, note, link, elapsed_time) VALUES (?, ?, ?, 0)",
+                ((text(4), text(30), f"https://example.com/{i % 97}") for i in range(rows - deleted_rows))
+            )
+            db.connection.executemany(
+                "INSERT INTO tasks (title, note, link, elapsed_time, deleted_at) VALUES (?, ?, ?, 0, CURRENT_TIMESTAMP)",
+                ((text(4), text(30), "") for _ in range(deleted_rows))
+            )
+            db.connection.commit()
+        queries = [
+            vocabulary[0],                      # la palabra más común
+            vocabulary[len(vocabulary) // 2],   # una palabra rara
+            vocabulary[1][:3],                  # prefijo mientras se escribe
+            f"{vocabulary[2]} {vocabulary[40]}",
+        ]
+        for query in queries:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                results = db.search(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{query:<24} {len(results):>10} {statistics.median(timings):>8.2f} "
+                  f"{percentile(timings, 0.95):>8.2f}")
+        with quiet():
+            db.close()
+
+
+def bench_time_report(tasks=500, intervals=300_000, repeats=20):
+    """Informe mensual de un año: desde time_rollups frente a sumar time_intervals"""
+    rng = random.Random(7)
+    end = datetime.date.today() + datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=365)
+    first = time.mktime(start.timetuple())
+    print(f"Informe de un año por meses: {intervals} intervalos de {tasks} tareas ({repeats} repeticiones)")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with quiet():
+            db = Database(os.path.join(tmp_dir, "bench.db"))
+            db.backfills_done.wait()
+            db.connection.executemany(
+                "INSERT INTO tasks (title, elapsed_time) VALUES (?, 0)",
+                ((f"Tarea {i}",) for i in range(tasks))
+            )
+            rows = []
+            for _ in range(intervals):
+                started_at = first + rng.random() * 365 * 86400
+                rows.append((rng.randint(1, tasks), started_at, started_at + rng.randint(60, 3 * 3600)))
+            cursor = db.connection.cursor()
+            cursor.executemany(
+                "INSERT INTO time_intervals (task_id, started_at, ended_at) VALUES (?, ?, ?)", rows
+            )
+            # Llenar time_rollups como al cerrar cada intervalo
+            for interval_id, ended_at in cursor.execute("SELECT id, ended_at FROM time_intervals").fetchall():
+                roll_up_interval(cursor, interval_id, ended_at)
+            db.connection.commit()
+        
+        def from_intervals():
+            # Lo que costaría sin rollups (sin siquiera partir los intervalos en la medianoche)
+            with db.pool.connection() as connection:
+                return connection.execute('''
+                SELECT strftime('%Y-%m-01', started_at, 'unixepoch', 'localtime') AS period, task_id,
+                    SUM(ended_at - started_at)
+                FROM time_intervals
+                WHERE started_at >= ? AND ended_at IS NOT NULL
+                GROUP BY period, task_id
+                ''', (first,)).fetchall()
+        
+        for label, run in (("time_rollups", lambda: db.time_report(start, end, "month")),
+                           ("time_intervals", from_intervals)):
+            timings = []
+            for _ in range(repeats):
+                begin = time.perf_counter()
+                result = run()
+                timings.append((time.perf_counter() - begin) * 1000)
+            print(f"{label:<16} {len(result):>8} filas  p50 {statistics.median(timings):>8.2f} ms  "
+                  f"p95 {percentile(timings, 0.95):>8.2f} ms")
+        with quiet():
+            db.close()
+
+
+def bench_read_contention(tasks=2_000, deleted=50_000, reads=200):
+    """
+    Latencia de abrir el historial (contar y leer una página) mientras otro hilo
+    guarda lotes grandes sin parar. "vaciando la cola" repite lo que hacían
+    las lecturas antes: esperar todas las escrituras encoladas.
+    """
+    print(f"Lectura del historial ({reads} lecturas) con lotes de {tasks} tareas guardándose en paralelo")
+    print(f"{'escenario':<28} {'mediana ms':>12} {'p95 ms':>10} {'máx ms':>10} {'lotes':>7}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with quiet():
+            db = Database(os.path.join(tmp_dir, "bench.db"))
+            db.backfills_done.wait()
+            db.connection.executemany(
+                "INSERT INTO tasks (title, elapsed_time, deleted_at) VALUES (?, 0, CURRENT_TIMESTAMP)",
+                ((f"Eliminada {i}",) for i in range(deleted))
+            )
+            db.connection.commit()
+            batch = [TaskFactory.create_task(f"Tarea {i}", "Nota") for i in range(tasks)]
+            db.save_dirty_tasks(batch)
+        
+        def read_history():
+            db.count_deleted_tasks()
+            list(db.iter_deleted_tasks(limit=DELETED_PAGE_SIZE))
+        
+        def read_after_flush():
+            db.flush_writes()
+            read_history()
+        
+        for label, read, concurrent in (("sin escrituras", read_history, False),
+                                        ("con escrituras", read_history, True),
+                                        ("con escrituras, vaciando cola", read_after_flush, True)):
+            stop = threading.Event()
+            batches = [0]
+            
+            def write_loop():
+                round_number = 0
+                # Como el guardado diferido: escrituras de segundo plano
+                with db.background_writes():
+                    while not stop.is_set():
+                        round_number += 1
+                        for task in batch:
+                            task.title = f"Tarea {task.id} v{round_number}"
+                        # Un lote detrás de otro: el escritor nunca queda libre
+                        db.save_dirty_tasks_async(batch).result()
+                        batches[0] += 1
+            
+            writer = threading.Thread(target=write_loop) if concurrent else None
+            with quiet():
+                if writer:
+                    writer.start()
+                    time.sleep(0.2)
+                latencies = []
+                for _ in range(reads):
+                    start = time.perf_counter()
+                    read()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    time.sleep(0.002)
+                stop.set()
+                if writer:
+                    writer.join()
+            print(f"{label:<28} {statistics.median(latencies):>12.3f} "
+                  f"{percentile(latencies, 0.95):>10.3f} {max(latencies):>10.3f} {batches[0]:>7}")
+        with quiet():
+            db.close()
+
+
+class _DictTaskTimer:
+    """TaskTimer tal como era antes de __slots__ (solo sus campos), para comparar la memoria"""
+    
+    def __init__(self):
+        self._state = TimerState.STOPPED
+        self.elapsed_time = 0
+        self.start_time = None
+        self.pause_time = None
+        self.revision = 0
+        self.saved_revision = 0
+        self.interval_events = []
+        self.open_interval = None
+        self.on_change = None
+
+
+class _DictTask:
+    """Task tal como era antes de __slots__: __dict__ por instancia y un método enlazado por tarea"""
+    
+    def __init__(self, title, note, link=None):
+        self.id = None
+        self._title = title
+        self._note = note
+        self._link = link
+        self._details_loader = None
+        self.timer = _DictTaskTimer()
+        self.revision = 1
+        self.saved_revision = 0
+        self.on_dirty = None
+        self.timer.on_change = self._changed
+    
+    def _changed(self):
+        if self.on_dirty is not None:
+            self.on_dirty(self)
+
+
+def _load_dict_tasks(db):
+    """Lo que hacía load_tasks con las tareas sin __slots__"""
+    tasks = []
+    for row in db.load_task_summaries():
+        task = _DictTask(row['title'], None)
+        # Antes se pedía el método enlazado en cada vuelta: un objeto por tarea
+        task._details_loader = db._load_task_details
+        task.id = row['id']
+        task.timer.elapsed_time = row['elapsed_time'] or 0
+        task.timer._state = TimerState(row['timer_state'] or 0)
+        task.timer.saved_revision = task.timer.revision
+        task.saved_revision = task.revision
+        tasks.append(task)
+    return tasks
+
+
+def _retained_bytes(load):
+    """Memoria que siguen ocupando las tareas después de cargarlas (sin las filas leídas)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    loaded = load()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / len(loaded)
+
+
+def bench_task_memory(tasks=100_000, repeats=3):
+    """
+    Memoria que ocupa cada tarea cargada (Task + TaskTimer) con __slots__ frente
+    a las mismas clases con __dict__ (como antes del cambio), y tiempo de
+    Database.load_tasks
+    """
+    print(f"Carga de {tasks} tareas")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with quiet():
+            db = Database(os.path.join(tmp_dir, "bench.db"))
+            db.backfills_done.wait()
+            db.connection.executemany(
+                "INSERT INTO tasks (title, note, elapsed_time) VALUES (?, 'Nota', ?)",
+                ((f"Tarea {i}", i % 7200) for i in range(tasks))
+            )
+            db.connection.commit()
+            
+            timings = []
+            for _ in range(repeats):
+                begin = time.perf_counter()
+                loaded = db.load_tasks()
+                timings.append(time.perf_counter() - begin)
+                del loaded
+            
+            dict_bytes = _retained_bytes(lambda: _load_dict_tasks(db))
+            slots_bytes = _retained_bytes(db.load_tasks)
+            db.close()
+    print(f"{'clases':<22} {'bytes por tarea':>16}")
+    print(f"{'__dict__ (antes)':<22} {dict_bytes:>16.1f}")
+    print(f"{'__slots__ (ahora)':<22} {slots_bytes:>16.1f}")
+    print(f"__slots__ ocupa {slots_bytes / dict_bytes:.2f} veces lo de __dict__ "
+          f"({dict_bytes / slots_bytes:.2f}x menos)")
+    print(f"carga p50 {statistics.median(timings) * 1000:>8.1f} ms   mín {min(timings) * 1000:>8.1f} ms")
+
+
+def bench_tick_wakeups(duration=10.0, load_pause=0.4):
+    """
+    Despertares por hora del temporizador en pantalla: sondeo cada 100 ms (como
+    el antiguo update_display) frente a TickScheduler alineado al segundo, con
+    y sin carga en el bucle de eventos. Cuenta también los segundos mostrados
+    que se repiten o se saltan.
+    """
+    print(f"Temporizador en pantalla durante {duration:.0f} s por escenario")
+    print(f"{'escenario':<26} {'despertares/h':>14} {'repetidos':>10} {'saltados':>9}")
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+    
+    def run_task(handler, *args):
+        return asyncio.run_coroutine_threadsafe(handler(*args), loop)
+    
+    def shown_seconds_report(shown):
+        steps = [b - a for a, b in zip(shown, shown[1:])]
+        return sum(1 for step in steps if step == 0), sum(step - 1 for step in steps if step > 1)
+    
+    async def busy_loop(stop):
+        # Bloquea el bucle de eventos a ratos, como un redibujado pesado
+        rng = random.Random(3)
+        while not stop.is_set():
+            await asyncio.sleep(rng.uniform(0.2, 0.8))
+            time.sleep(rng.uniform(0.0, load_pause))
+    
+    anchor = time.monotonic() - 0.37  # Un temporizador que empezó a mitad de segundo
+    
+    async def polling(stop, counters, shown):
+        last_second = -1
+        while not stop.is_set():
+            counters[0] += 1
+            elapsed = int(time.monotonic() - anchor)
+            if elapsed != last_second:
+                last_second = elapsed
+                shown.append(elapsed)
+            await asyncio.sleep(0.1)
+    
+    for label, aligned, loaded in (("sondeo cada 100 ms", False, False),
+                                   ("alineado al segundo", True, False),
+                                   ("alineado, bucle con carga", True, True)):
+        stop = threading.Event()
+        shown = []
+        counters = [0]
+        ticker = None
+        tasks = []
+        if loaded:
+            tasks.append(run_task(busy_loop, stop))
+        if aligned:
+            ticker = TickScheduler(run_task)
+            ticker.align_to(anchor)
+            ticker.subscribe(lambda: shown.append(int(time.monotonic() - anchor)))
+        else:
+            tasks.append(run_task(polling, stop, counters, shown))
+        time.sleep(duration)
+        stop.set()
+        if ticker:
+            ticker.stop()
+            counters[0] = ticker.wakeups
+        for task in tasks:
+            task.result()
+        # Dejar que el bucle procese la cancelación del ticker antes de seguir
+        run_task(asyncio.sleep, 0.05).result()
+        repeated, skipped = shown_seconds_report(shown)
+        print(f"{label:<26} {counters[0] / duration * 3600:>14.0f} {repeated:>10} {skipped:>9}")
+    loop.call_soon_threadsafe(loop.stop)
+    loop_thread.join()
+
+
+class FakeClock:
+    """Reloj simulado para TaskTimer: el tiempo solo avanza con advance y la hora se puede ajustar"""
+    
+    def __init__(self):
+        self.now_ns = 0
+        self.wall_offset = 1_700_000_000.0
+    
+    def monotonic_ns(self):
+        return self.now_ns
+    
+    def time(self):
+        return self.now_ns / NS_PER_SECOND + self.wall_offset
+    
+    def advance(self, ns):
+        self.now_ns += ns
+    
+    def adjust_wall(self, seconds):
+        """Ajuste de la hora del sistema (NTP, cambio manual): el reloj monotónico no se entera"""
+        self.wall_offset += seconds
+
+
+def bench_timer_drift(cycles=2_000_000, seed=7):
+    """
+    Repite millones de ciclos arranque/pausa de TaskTimer con un reloj simulado,
+    con tramos de duración no entera y ajustes de la hora del sistema, y
+    comprueba que el tiempo acumulado coincide exactamente con el trabajado.
+    Como referencia calcula también el antiguo cálculo con time.time() e int().
+    """
+    print(f"Deriva del temporizador tras {cycles:,} ciclos arranque/pausa (reloj simulado)")
+    rng = random.Random(seed)
+    clock = FakeClock()
+    timer = TaskTimer(clock=clock)
+    expected_ns = 0
+    legacy_elapsed = 0
+    begin = time.perf_counter()
+    for cycle in range(cycles):
+        timer.start(keep_elapsed=True)
+        legacy_start = clock.time() - legacy_elapsed
+        run_ns = rng.randrange(1, 3 * NS_PER_SECOND)
+        clock.advance(run_ns)
+        if cycle % 1000 == 0:
+            # De vez en cuando se corrige la hora con el temporizador en marcha
+            clock.adjust_wall(rng.uniform(-120.0, 120.0))
+        expected_ns += run_ns
+        timer.pause()
+        legacy_elapsed = int(clock.time() - legacy_start)
+        clock.advance(rng.randrange(0, 5 * NS_PER_SECOND))
+        # Las transiciones se vacían al guardar; aquí no hay base de datos
+        timer.interval_events.clear()
+    duration = time.perf_counter() - begin
+    
+    drift_ns = timer.get_elapsed_ns() - expected_ns
+    expected_seconds = expected_ns // NS_PER_SECOND
+    print(f"{'cálculo':<30} {'segundos':>14} {'deriva s':>12}")
+    print(f"{'monotónico en nanosegundos':<30} {timer.get_elapsed_time():>14,} "
+          f"{timer.get_elapsed_time() - expected_seconds:>12,}")
+    print(f"{'antiguo (time.time e int)':<30} {legacy_elapsed:>14,} {legacy_elapsed - expected_seconds:>12,}")
+    print(f"Deriva exacta: {drift_ns} ns; {cycles / duration:,.0f} ciclos/s")
+    if drift_ns != 0 or timer.get_elapsed_time() != expected_seconds:
+        raise AssertionError(f"El temporizador derivó {drift_ns} ns tras {cycles} ciclos")
+
+
+def bench_concurrent_timers(counts=(1, 100, 500, 1000), ticks=100, interval=0.02):
+    """
+    Cientos de temporizadores en marcha a la vez con un solo TickScheduler:
+    costo de cada tick cuando solo se redibuja la tarea mostrada (como
+    main.update_display) frente a suscribir un redibujo por temporizador,
+    filas escritas mientras corren y tareas que siguen en marcha al reabrir
+    la base de datos.
+    """
+    print(f"Temporizadores simultáneos ({ticks} ticks cada {interval * 1000:.0f} ms)")
+    print(f"{'en marcha':>10} {'µs/tick compartido':>19} {'µs/tick uno por tarea':>22} "
+          f"{'filas escritas':>15} {'restauradas':>12}")
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+    
+    def run_task(handler, *args):
+        return asyncio.run_coroutine_threadsafe(handler(*args), loop)
+    
+    shown = [0]
+    
+    def redraw(task):
+        # Lo que hace un redibujo: leer el tiempo de la tarea
+        shown[0] = task.elapsed_time
+    
+    def tick_cost(tasks_to_redraw):
+        """Mediana de lo que tarda un tick completo (todas las funciones suscritas)"""
+        ticker = TickScheduler(run_task, interval=interval)
+        durations = []
+        done = threading.Event()
+        started = [0.0]
+        
+        def begin():
+            started[0] = time.perf_counter()
+        
+        def end():
+            durations.append(time.perf_counter() - started[0])
+            if len(durations) >= ticks:
+                done.set()
+        
+        # Los suscriptores se llaman en orden: begin primero y end al final
+        ticker.subscribe(begin)
+        for task in tasks_to_redraw:
+            ticker.subscribe(lambda task=task: redraw(task))
+        ticker.subscribe(end)
+        done.wait()
+        ticker.stop()
+        run_task(asyncio.sleep, interval).result()
+        return statistics.median(durations) * 1_000_000
+    
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bench.db")
+            with quiet():
+                db = Database(path)
+                tasks = [TaskFactory.create_task(f"Tarea {i}", "Nota") for i in range(count)]
+                for task in tasks:
+                    task.timer.start()
+                db.save_dirty_tasks(tasks)
+                
+                shared = tick_cost(tasks[:1])
+                per_timer = tick_cost(tasks)
+                
+                # Un temporizador en marcha no es un cambio: no hay nada que escribir
+                rows_written = db.save_dirty_tasks(tasks)
+                live = {task.id: task.elapsed_time for task in tasks}
+                db.close()
+                db = Database(path)
+                restored = db.load_tasks()
+                db.close()
+            running = [task for task in restored if task.timer.state == TimerState.RUNNING]
+            if len(running) != count or any(abs(task.elapsed_time - live[task.id]) > 1 for task in running):
+                raise AssertionError(f"Solo {len(running)} de {count} temporizadores siguen en marcha al reabrir")
+        print(f"{count:>10} {shared:>19.1f} {per_timer:>22.1f} {rows_written:>15} {len(running):>12}")
+    loop.call_soon_threadsafe(loop.stop)
+    loop_thread.join()
+
+
+BENCHMARKS = {
+    "commit": bench_commit_latency,
+    "export": bench_export_formats,
+    "search": bench_search,
+    "report": bench_time_report,
+    "contention": bench_read_contention,
+    "memory": bench_task_memory,
+    "wakeups": bench_tick_wakeups,
+    "drift": bench_timer_drift,
+    "concurrent": bench_concurrent_timers,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de Focus Title")
+    parser.add_argument("names", nargs="*", metavar="nombre",
+                        help=f"Benchmarks a ejecutar: {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Benchmark desconocido: {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+        print()
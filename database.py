@@ -1,21 +1,336 @@
 import sqlite3
+import contextlib
 import os
+import queue
 import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, wait
 from models import Task, TaskFactory, TimerState
+from rollups import GRANULARITIES, period_start, roll_up_interval
+from migrations import (
+    BACKFILL_BATCH_SIZE, BACKFILL_DONE, BACKFILL_PAUSE, pending_backfills, run_migrations
+)
+
+# Perfiles de almacenamiento: equilibrio entre durabilidad y velocidad de escritura.
+# Todos usan WAL; cambian la frecuencia de fsync, la memoria usada y
+# cómo se vuelca el WAL al archivo principal.
+STORAGE_PROFILES = {
+    # Cada commit se sincroniza con el disco: no se pierde nada ni ante un corte de luz
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,          # 8 MB (valor negativo = KiB)
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "wal_autocheckpoint": 1000,   # páginas
+        "checkpoint_on_close": "TRUNCATE",
+    },
+    # Un corte de luz puede perder los últimos commits, pero la base nunca se corrompe
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+        "checkpoint_on_close": "PASSIVE",
+    },
+    # Sin fsync: solo recomendable si los datos se pueden reconstruir
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 4000,
+        "checkpoint_on_close": "PASSIVE",
+    },
+}
+
+DEFAULT_STORAGE_PROFILE = "balanced"
+
+# Máximo de escrituras encoladas que se agrupan en una misma transacción
+WRITE_BATCH_SIZE = 200
+
+# Marca que detiene el hilo escritor
+_STOP_WRITER = object()
+
+# Tareas eliminadas que se leen por página en el historial
+DELETED_PAGE_SIZE = 50
+
+# Condiciones del borrado lógico: las tareas eliminadas tienen deleted_at
+ACTIVE = "deleted_at IS NULL"
+DELETED = "deleted_at IS NOT NULL"
+
+# Ids por consulta IN (...) en las operaciones en bloque
+BULK_CHUNK_SIZE = 500
+
+# Notas y enlaces que se mantienen en memoria (los más recientes)
+DETAILS_CACHE_SIZE = 64
+
+# Copias de seguridad: páginas copiadas por paso y pausa entre pasos (segundos)
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE = 0.005
+# Cada cuánto se hace una copia y cuánto se espera tras abrir la aplicación (segundos)
+BACKUP_INTERVAL = 60 * 60
+BACKUP_FIRST_DELAY = 60
+# Retención: las últimas copias, más la última de cada uno de los días más recientes
+BACKUP_KEEP_LAST = 5
+BACKUP_KEEP_DAYS = 7
+
+# Milisegundos que una conexión espera a que otra libere el bloqueo de escritura
+BUSY_TIMEOUT_MS = 5000
+
+# Resultados que devuelve una búsqueda de texto completo
+SEARCH_LIMIT = 20
+# Coincidencias (las más recientes) que se ordenan por relevancia en cada
+# etapa de la búsqueda: primero el título, después la nota y el enlace
+SEARCH_CANDIDATES = 500
+
+class SearchResult:
+    """Una coincidencia de Database.search"""
+    
+    def __init__(self, task_id, title, note_snippet, rank, deleted=False):
+        self.task_id = task_id
+        self.deleted = deleted
+        self.title = title
+        self.note_snippet = note_snippet or ""
+        self.rank = rank  # bm25: más negativo = más relevante
+    
+    def __repr__(self):
+        state = "eliminada" if self.deleted else "activa"
+        return f"SearchResult({state} {self.task_id}, {self.title!r})"
+
+
+class _DeferredFuture(Future):
+    """Future de una escritura hecha dentro de db.transaction(): no se envía hasta salir del bloque"""
+    
+    def __init__(self):
+        super().__init__()
+        self.submitted = False
+    
+    def result(self, timeout=None):
+        if not self.submitted:
+            raise RuntimeError("La escritura se aplica al salir de db.transaction(): "
+                               "dentro del bloque usa las variantes _async")
+        return super().result(timeout)
+
+
+class PoolExhaustedError(sqlite3.OperationalError):
+    """No quedó ninguna conexión libre en el pool dentro del tiempo de espera"""
+
+# Pool acotado de conexiones SQLite
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite: cada hilo que lee o escribe usa su propia conexión.
+    
+    Con WAL cada conexión lee su propia instantánea sin bloquear al escritor,
+    así que la interfaz y los trabajos en segundo plano pueden leer mientras
+    el hilo escritor confirma. Mientras un hilo tiene una conexión prestada,
+    queda guardada en el threading.local, de modo que las llamadas anidadas
+    del mismo hilo reutilizan esa conexión en lugar de pedir otra.
+    """
+    
+    def __init__(self, db_path, local, configure=None, max_connections=8,
+                 acquire_timeout=10.0, health_check_interval=30.0):
+        """
+        Args:
+            db_path: Ruta del archivo SQLite
+            local: threading.local donde cada hilo guarda la conexión que tiene prestada
+            configure: Función que aplica los PRAGMA a cada conexión
+            max_connections: Máximo de conexiones abiertas a la vez
+            acquire_timeout: Segundos a esperar una conexión libre
+            health_check_interval: Segundos tras los que se verifica una conexión inactiva antes de prestarla
+        """
+        self.db_path = db_path
+        self.local = local
+        self.configure = configure
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []  # (conexión, generación, momento en que se devolvió)
+        self._open_count = 0
+        self._condition = threading.Condition()
+        self._generation = 0  # Cambia cuando hay que reconfigurar las conexiones
+        self._all = set()
+        self._closed = False
+    
+    @contextlib.contextmanager
+    def connection(self):
+        """Presta una conexión al hilo actual durante el bloque with"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            # Llamada anidada: el hilo ya tiene una conexión prestada
+            yield connection
+            return
+        connection = self.acquire()
+        self.local.connection = connection
+        try:
+            yield connection
+        finally:
+            self.local.connection = None
+            self.release(connection)
+    
+    def acquire(self):
+        """Toma una conexión libre (o abre una nueva si no se llegó al máximo)"""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+                if self._idle:
+                    connection, generation, returned_at = self._idle.pop()
+                    break
+                if self._open_count < self.max_connections:
+                    self._open_count += 1
+                    connection = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError(
+                        f"No hay conexiones libres ({self.max_connections} en uso)"
+                    )
+                self._condition.wait(remaining)
+        
+        if connection is None:
+            return self._open()
+        if self._is_healthy(connection, generation, returned_at):
+            return connection
+        # La conexión no pasó la verificación: se reemplaza por una nueva
+        self._close_quietly(connection)
+        return self._open()
+    
+    def release(self, connection):
+        """Devuelve una conexión al pool"""
+        if connection.in_transaction:
+            # Nunca devolver una transacción a medias al siguiente hilo
+            connection.rollback()
+        with self._condition:
+            if self._closed:
+                self._close_quietly(connection)
+                return
+            self._idle.append((connection, self._generation, time.monotonic()))
+            self._condition.notify()
+    
+    def _open(self):
+        try:
+            # Las conexiones pasan de un hilo a otro, pero nunca se usan a la vez desde dos
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            if self.configure:
+                self.configure(connection)
+        except sqlite3.Error:
+            with self._condition:
+                self._open_count -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._all.add(connection)
+        return connection
+    
+    def _is_healthy(self, connection, generation, returned_at):
+        """Reconfigura la conexión si cambió el perfil y la verifica si llevaba tiempo sin usarse"""
+        try:
+            if generation != self._generation and self.configure:
+                self.configure(connection)
+            if time.monotonic() - returned_at >= self.health_check_interval:
+                connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            print(f"Conexión del pool no válida, se reemplaza: {e}")
+            return False
+    
+    def _close_quietly(self, connection):
+        with self._condition:
+            self._all.discard(connection)
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+    
+    def reconfigure(self):
+        """Hace que cada conexión vuelva a aplicar sus PRAGMA la próxima vez que se preste"""
+        with self._condition:
+            self._generation += 1
+    
+    def size(self):
+        """Número de conexiones abiertas"""
+        with self._condition:
+            return self._open_count
+    
+    def close_all(self):
+        """Cierra todas las conexiones; el pool deja de prestar conexiones"""
+        with self._condition:
+            self._closed = True
+            connections = list(self._all)
+            self._all.clear()
+            self._idle.clear()
+            self._condition.notify_all()
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error as e:
+                print(f"Error al cerrar una conexión del pool: {e}")
+
 
 class Database:
-    def __init__(self, db_path="focus_title.db"):
+    def __init__(self, db_path="focus_title.db", storage_profile=None, max_connections=8):
         """
         Inicializa la conexión a la base de datos.
         Si no existe, la crea con la estructura necesaria.
+        
+        Args:
+            db_path: Ruta del archivo SQLite
+            storage_profile: Nombre de un perfil de STORAGE_PROFILES. Si no se indica,
+                se usa el guardado en la configuración o "balanced".
+            max_connections: Máximo de conexiones del pool (una por hilo)
         """
         self.db_path = db_path
         self.connection = None
-        self.cursor = None
         self.lock = threading.Lock()  # Para sincronizar acceso a la base de datos
         self.thread_local = threading.local()  # Almacenamiento local por hilo
+        self.storage_profile = DEFAULT_STORAGE_PROFILE
+        self._closed = False
+        self._submit_lock = threading.Lock()  # Ordena los envíos al hilo escritor frente al cierre
+        self._commit_hooks = []
+        # Cómo deshacer en memoria lo que las operaciones ya cambiaron (ids asignados...)
+        # si su SAVEPOINT o el lote entero se deshacen
+        self._rollback_hooks = []
+        # Unidades de trabajo abiertas por cada hilo (pilas de listas de escrituras)
+        self._units = threading.local()
+        # Última escritura encolada por la interfaz (desde cualquier hilo), para que
+        # las lecturas la vean: Flet atiende cada evento en un hilo distinto.
+        # Las de segundo plano (ver background_writes) no cuentan
+        self._last_write = None
+        self._background = threading.local()
+        # SAVEPOINT anidados abiertos en el hilo escritor
+        self._savepoint_depth = 0
+        # Suma de los intervalos cerrados por tarea (segundos), para no recalcularla
+        self._logged_time_cache = {}
+        # Caché LRU de (nota, enlace) por id de tarea, para las tareas cargadas como resumen
+        self._details_cache = OrderedDict()
+        self._details_lock = threading.Lock()
+        self.schema_version = 0
+        self._backfill_stop = threading.Event()
+        self._backup_stop = threading.Event()
+        self._backup_thread = None
+        self.backfills_done = threading.Event()
         self.connect()
-        self.create_tables()
+        self.migrate()
+        # Cada hilo (interfaz, guardado periódico, escritor) obtiene su propia conexión
+        self.pool = ConnectionPool(
+            db_path,
+            self.thread_local,
+            configure=self._configure_connection,
+            max_connections=max_connections
+        )
+        self.apply_storage_profile(
+            storage_profile or self.get_setting("storage_profile", DEFAULT_STORAGE_PROFILE)
+        )
+        self._start_writer()
+        # Los rellenos de datos costosos corren en segundo plano: no retrasan el inicio
+        self._start_backfills()
     
     def connect(self):
         """Establece la conexión a la base de datos"""
@@ -23,310 +338,1474 @@ class Database:
             # Usar check_same_thread=False para permitir acceso desde diferentes hilos
             self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
             self.connection.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
-            self.cursor = self.connection.cursor()
             print(f"Conexión establecida a la base de datos: {self.db_path}")
         except sqlite3.Error as e:
             print(f"Error al conectar a la base de datos: {e}")
     
-    def create_tables(self):
-        """Crea las tablas necesarias si no existen"""
-        try:
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                note TEXT,
-                link TEXT,
-                elapsed_time INTEGER DEFAULT 0,
-                timer_state INTEGER DEFAULT 0
-            )
-            ''')
-            
-            # Crear tabla para tareas eliminadas
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS deleted_tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                note TEXT,
-                link TEXT,
-                elapsed_time INTEGER DEFAULT 0,
-                deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            self.connection.commit()
-            print("Tablas creadas o verificadas correctamente")
+    def apply_storage_profile(self, profile_name):
+        """Aplica los PRAGMA del perfil de almacenamiento a la conexión"""
+        if profile_name not in STORAGE_PROFILES:
+            print(f"Perfil de almacenamiento desconocido: {profile_name}, se usa '{DEFAULT_STORAGE_PROFILE}'")
+            profile_name = DEFAULT_STORAGE_PROFILE
+        profile = STORAGE_PROFILES[profile_name]
+        
+        error = None
+        with self.lock:
+            try:
+                # El modo WAL es persistente en el archivo: basta con fijarlo una vez
+                self.connection.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+                self.storage_profile = profile_name
+                self._configure_connection(self.connection)
+            except sqlite3.Error as e:
+                error = e
+        # Los mensajes se imprimen fuera del bloqueo
+        if error is not None:
+            print(f"Error al aplicar el perfil de almacenamiento: {error}")
+        # Las conexiones del pool aplican el nuevo perfil en su próximo uso
+        self.pool.reconfigure()
+        
+        print(f"Perfil de almacenamiento activo: {self.storage_profile}")
+        return self.storage_profile
+    
+    def _configure_connection(self, connection):
+        """Aplica a una conexión los PRAGMA por conexión del perfil activo"""
+        profile = STORAGE_PROFILES[self.storage_profile]
+        connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        connection.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        connection.execute(f"PRAGMA cache_size = {profile['cache_size']}")
+        connection.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+        connection.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+        connection.execute(f"PRAGMA wal_autocheckpoint = {profile['wal_autocheckpoint']}")
+    
+    def set_storage_profile(self, profile_name):
+        """Cambia el perfil de almacenamiento y lo guarda para los próximos inicios"""
+        if profile_name not in STORAGE_PROFILES:
+            print(f"Perfil de almacenamiento desconocido: {profile_name}")
+            return False
+        self.apply_storage_profile(profile_name)
+        return self.set_setting("storage_profile", profile_name)
+    
+    def checkpoint(self, mode=None):
+        """
+        Vuelca el WAL al archivo principal.
+        Por defecto usa el modo de cierre del perfil activo (PASSIVE o TRUNCATE).
+        """
+        mode = mode or STORAGE_PROFILES[self.storage_profile]["checkpoint_on_close"]
+        try:
+            with self.lock:
+                self.connection.execute(f"PRAGMA wal_checkpoint({mode})")
+            return True
         except sqlite3.Error as e:
-            print(f"Error al crear las tablas: {e}")
+            print(f"Error al volcar el WAL: {e}")
+            return False
+    
+    def get_setting(self, key, default=None):
+        """Lee un valor de la tabla de configuración"""
+        try:
+            with self.pool.connection() as connection:
+                row = connection.execute("SELECT value FROM app_settings WHERE key = ?", (key,)).fetchone()
+            return row['value'] if row else default
+        except sqlite3.Error as e:
+            print(f"Error al leer la configuración '{key}': {e}")
+            return default
+    
+    def _op_set_setting(self, cursor, key, value):
+        """Operación de escritura: guarda un valor de configuración"""
+        cursor.execute('''
+        INSERT INTO app_settings (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (key, str(value)))
+        return True
+    
+    def set_setting(self, key, value):
+        """Guarda un valor en la tabla de configuración"""
+        try:
+            return self.submit_write(self._op_set_setting, key, value).result()
+        except Exception as e:
+            print(f"Error al guardar la configuración '{key}': {e}")
+            return False
+    
+    def migrate(self):
+        """Aplica las migraciones de esquema pendientes (ver migrations.py)"""
+        with self.lock:
+            self.schema_version = run_migrations(self.connection)
+        print(f"Esquema de la base de datos en la versión {self.schema_version}")
+        return self.schema_version
+    
+    def _start_writer(self):
+        """Arranca el hilo escritor que aplica las escrituras encoladas"""
+        self._write_queue = queue.Queue()
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop,
+            name="focus-title-db-writer",
+            daemon=True
+        )
+        self._writer_thread.start()
+    
+    def submit_write(self, operation, *args):
+        """
+        Encola una operación de escritura para el hilo escritor.
+        
+        La operación recibe el cursor del escritor seguido de *args, no debe
+        hacer commit y se ejecuta dentro de la transacción del lote. El Future se resuelve con su valor de retorno
+        una vez hecho el commit, así que esperar su resultado garantiza que
+        el cambio ya está en disco.
+        """
+        unit = self._current_unit()
+        if unit is not None:
+            # Dentro de db.transaction(): se aplica junto con el resto del bloque
+            future = _DeferredFuture()
+            unit.append((operation, args, future))
+            return future
+        return self._enqueue(operation, args)
+    
+    def _enqueue(self, operation, args, future=None):
+        future = future or Future()
+        with self._submit_lock:
+            if self._closed:
+                future.set_exception(RuntimeError("La base de datos está cerrada"))
+                return future
+            self._write_queue.put((operation, args, future))
+            if not getattr(self._background, "active", False):
+                self._last_write = future
+        return future
+    
+    @contextlib.contextmanager
+    def background_writes(self):
+        """
+        Las escrituras que este hilo envíe dentro del bloque (guardado diferido,
+        importación, backfills) no hacen esperar a las lecturas: con WAL cada
+        conexión del pool lee el último commit sin bloquearse por el escritor.
+        Quien las envía espera su propio Future si necesita verlas.
+        """
+        previous = getattr(self._background, "active", False)
+        self._background.active = True
+        try:
+            yield
+        finally:
+            self._background.active = previous
+    
+    def flush_writes(self, timeout=None):
+        """Espera a que se apliquen todas las escrituras encoladas hasta ahora"""
+        if threading.current_thread() is self._writer_thread:
+            return True
+        try:
+            self._enqueue(lambda cursor: None, ()).result(timeout)
+            return True
+        except Exception as e:
+            print(f"Error al esperar las escrituras pendientes: {e}")
+            return False
+    
+    def _wait_queued_writes(self):
+        """
+        Espera a que se confirmen las escrituras de la interfaz encoladas hasta
+        ahora, para que una lectura vea los cambios anteriores aunque los haya
+        enviado otro hilo (en Flet, cada acción de la interfaz puede correr en
+        un hilo del pool). No espera a las que se encolen mientras tanto ni a
+        las de segundo plano.
+        """
+        future = self._last_write
+        if future is None or future.done() or threading.current_thread() is self._writer_thread:
+            return
+        # El escritor confirma en orden: esperar la última cubre las anteriores
+        wait([future])
+    
+    def _current_unit(self):
+        """Lista de escrituras de la unidad de trabajo más interna de este hilo, o None"""
+        stack = getattr(self._units, "stack", None)
+        return stack[-1] if stack else None
+    
+    @contextlib.contextmanager
+    def transaction(self, wait=True):
+        """
+        Unidad de trabajo: las escrituras enviadas dentro del bloque (submit_write
+        y los métodos _async) se aplican juntas al salir, todas o ninguna, con un
+        solo commit. Al salir del bloque exterior se espera a que estén en disco;
+        si alguna falla, no se aplica ninguna y la excepción se propaga. Con
+        wait=False (por ejemplo, desde la interfaz) no se espera: el resultado o
+        el error llega por los Future de cada escritura.
+        
+        Los bloques se pueden anidar: cada uno interior es un SAVEPOINT dentro del
+        exterior. Si un bloque termina con una excepción, sus escrituras se
+        descartan sin tocar las del bloque que lo contiene.
+        
+        Dentro del bloque hay que usar las variantes _async: el resultado de sus
+        Future solo está disponible después de salir.
+        
+        Uso:
+            with db.transaction():
+                db.save_task_async(task)
+                db.delete_task_async(other_task)
+        """
+        if threading.current_thread() is self._writer_thread:
+            raise RuntimeError("Las operaciones del escritor ya corren en una transacción")
+        stack = getattr(self._units, "stack", None)
+        if stack is None:
+            stack = self._units.stack = []
+        unit = []
+        stack.append(unit)
+        try:
+            yield
+        except BaseException as e:
+            stack.pop()
+            for _, _, future in unit:
+                future.submitted = True
+                future.set_exception(RuntimeError(f"Transacción deshecha: {e!r}"))
+            raise
+        stack.pop()
+        if not unit:
+            return
+        
+        future = _DeferredFuture() if stack else Future()
+        
+        def fail_unit(done):
+            # Si la unidad no se confirmó, ninguna de sus escrituras lo hizo
+            error = done.exception()
+            if error is None:
+                return
+            for _, _, pending in unit:
+                if not pending.done():
+                    pending.submitted = True
+                    pending.set_exception(error)
+        future.add_done_callback(fail_unit)
+        if stack:
+            # Bloque anidado: pasa a ser una sola escritura del bloque exterior
+            stack[-1].append((self._op_unit, (unit,), future))
+        else:
+            # Fuera del bloque ya se puede esperar cualquiera de sus Future
+            self._mark_submitted(unit)
+            self._enqueue(self._op_unit, (unit,), future)
+            if wait:
+                future.result()
+    
+    def _mark_submitted(self, unit):
+        for operation, args, future in unit:
+            future.submitted = True
+            if operation == self._op_unit:
+                self._mark_submitted(args[0])
+    
+    def _op_unit(self, cursor, unit):
+        """
+        Operación de escritura: aplica las escrituras de una unidad de trabajo,
+        cada una en su SAVEPOINT. Si una falla, la excepción deshace la unidad entera.
+        """
+        results = []
+        for operation, args, future in unit:
+            with self._savepoint(cursor):
+                results.append((future, operation(cursor, *args)))
+        
+        def resolve():
+            for future, result in results:
+                future.submitted = True
+                future.set_result(result)
+        self._after_commit(resolve)
+        return len(results)
+    
+    @contextlib.contextmanager
+    def _savepoint(self, cursor):
+        """
+        SAVEPOINT anidable en el cursor del escritor. Si el bloque lanza una
+        excepción se deshace lo escrito en él, también en memoria (descarta sus
+        acciones _after_commit y ejecuta sus _on_rollback), y la excepción sigue su curso.
+        """
+        name = f"write_op_{self._savepoint_depth}"
+        hooks_before = len(self._commit_hooks)
+        undo_before = len(self._rollback_hooks)
+        cursor.execute(f"SAVEPOINT {name}")
+        self._savepoint_depth += 1
+        try:
+            yield
+        except BaseException:
+            cursor.execute(f"ROLLBACK TO {name}")
+            cursor.execute(f"RELEASE {name}")
+            del self._commit_hooks[hooks_before:]
+            self._undo_in_memory(undo_before)
+            raise
+        else:
+            cursor.execute(f"RELEASE {name}")
+        finally:
+            self._savepoint_depth -= 1
+    
+    def _writer_loop(self):
+        """Bucle del hilo escritor: agrupa lo encolado en transacciones"""
+        stopping = False
+        while not stopping:
+            item = self._write_queue.get()
+            if item is _STOP_WRITER:
+                break
+            batch = [item]
+            # Agrupar todo lo que ya esté esperando, hasta el tamaño máximo del lote
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP_WRITER:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_write_batch(batch)
+    
+    def _run_write_batch(self, batch):
+        """
+        Ejecuta un lote de escrituras en una sola transacción.
+        Cada operación va en su propio SAVEPOINT: si una falla se deshace solo
+        esa y las demás del lote se confirman igual.
+        """
+        results = []
+        self._commit_hooks = []
+        self._rollback_hooks = []
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                for operation, args, future in batch:
+                    try:
+                        with self._savepoint(cursor):
+                            results.append((future, operation(cursor, *args), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+                connection.commit()
+        except sqlite3.Error as e:
+            # Al devolver la conexión al pool se deshace la transacción a medias
+            print(f"Error al confirmar el lote de escrituras: {e}")
+            self._commit_hooks = []
+            self._undo_in_memory(0)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        # Ya está en disco: confirmar el estado en memoria y avisar a quien espera
+        self._rollback_hooks = []
+        for hook in self._commit_hooks:
+            hook()
+        self._commit_hooks = []
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def _after_commit(self, hook):
+        """Registra una acción a ejecutar cuando el lote actual se confirme"""
+        self._commit_hooks.append(hook)
+    
+    def _on_rollback(self, hook):
+        """
+        Registra cómo deshacer un cambio en memoria que la operación en curso ya
+        hizo (por ejemplo, el id recién asignado a una tarea) si lo escrito no se confirma
+        """
+        self._rollback_hooks.append(hook)
+    
+    def _undo_in_memory(self, undo_before):
+        """Ejecuta, de la más reciente a la más antigua, las acciones _on_rollback desde undo_before"""
+        hooks = self._rollback_hooks[undo_before:]
+        del self._rollback_hooks[undo_before:]
+        for hook in reversed(hooks):
+            hook()
+    
+    def _assign_id(self, task, task_id):
+        """Pone a la tarea el id de su fila nueva; si la inserción se deshace, se lo quita"""
+        previous_id = task.id
+        task.id = task_id
+        self._on_rollback(lambda: setattr(task, "id", previous_id))
+    
+    def _op_save_task(self, cursor, task):
+        """Operación de escritura: guarda una sola tarea"""
+        revisions = task.snapshot_revision()
+        if task.timer.state == TimerState.RUNNING:
+            print(f"Guardando tarea con temporizador en ejecución, tiempo actualizado: {task.elapsed_time} segundos")
+        else:
+            print(f"Guardando tarea con temporizador no en ejecución, tiempo: {task.elapsed_time} segundos")
+        
+        self._upsert_task(cursor, task)
+        self._after_commit(lambda: task.mark_clean(revisions))
+        return task
+    
+    def save_task_async(self, task):
+        """Encola el guardado de una tarea. Devuelve un Future con la tarea guardada"""
+        return self.submit_write(self._op_save_task, task)
     
     def save_task(self, task):
         """
         Guarda una tarea en la base de datos.
         Si la tarea ya existe (tiene id), la actualiza.
         """
-        with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
-            try:
-                # Verificar si la tarea ya tiene un ID (para actualización)
-                task_id = getattr(task, 'id', None)
-                
-                # Asegurarnos de obtener el tiempo acumulado más reciente
-                elapsed_time = task.elapsed_time
-                if task.timer.state == TimerState.RUNNING:
-                    # Si el temporizador está corriendo, obtener el tiempo actualizado
-                    elapsed_time = task.timer.get_elapsed_time()
-                    print(f"Guardando tarea con temporizador en ejecución, tiempo actualizado: {elapsed_time} segundos")
-                else:
-                    print(f"Guardando tarea con temporizador no en ejecución, tiempo: {elapsed_time} segundos")
-                
-                if task_id:
-                    # Actualizar tarea existente
-                    self.cursor.execute('''
-                    UPDATE tasks 
-                    SET title = ?, note = ?, link = ?, elapsed_time = ?, timer_state = ?
-                    WHERE id = ?
-                    ''', (
-                        task.title, 
-                        task.note, 
-                        getattr(task, 'link', ''),
-                        elapsed_time,  # Usar el tiempo actualizado
-                        task.timer.state.value,
-                        task_id
-                    ))
-                else:
-                    # Insertar nueva tarea
-                    self.cursor.execute('''
-                    INSERT INTO tasks (title, note, link, elapsed_time, timer_state)
-                    VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        task.title, 
-                        task.note, 
-                        getattr(task, 'link', ''),
-                        elapsed_time,  # Usar el tiempo actualizado
-                        task.timer.state.value
-                    ))
-                    # Obtener el ID generado y asignarlo a la tarea
-                    task.id = self.cursor.lastrowid
-                
-                self.connection.commit()
-                return task
-            except sqlite3.Error as e:
-                print(f"Error al guardar la tarea: {e}")
-                return None
+        try:
+            return self.save_task_async(task).result()
+        except Exception as e:
+            print(f"Error al guardar la tarea: {e}")
+            return None
+    
+    def _upsert_task(self, cursor, task):
+        """
+        Escribe una sola tarea sin hacer commit.
+        Las tareas con id se actualizan en su misma fila (el id se conserva);
+        las nuevas se insertan y reciben el id generado.
+        Nunca borra filas: el guardado es solo de inserción/actualización.
+        """
+        if task.id and not task.has_details():
+            # La nota y el enlace no se cargaron: se conservan los de la base de datos
+            cursor.execute('''
+            UPDATE tasks SET title = ?, elapsed_time = ?, timer_state = ?, started_at = ?
+            WHERE id = ? AND deleted_at IS NULL
+            ''', (task.title, task.elapsed_time, task.timer.state.value, task.timer.get_anchor(), task.id))
+            self._write_interval_events(cursor, task)
+            return
+        
+        values = (
+            task.title,
+            task.note,
+            task.link,
+            task.elapsed_time,
+            task.timer.state.value,
+            task.timer.get_anchor()
+        )
+        if task.id:
+            # Una tarea eliminada (o borrada del historial) no se modifica ni se vuelve a crear
+            cursor.execute('''
+            UPDATE tasks
+            SET title = ?, note = ?, link = ?, elapsed_time = ?, timer_state = ?, started_at = ?
+            WHERE id = ? AND deleted_at IS NULL
+            ''', values + (task.id,))
+            task_id = task.id
+            self._after_commit(lambda: self._forget_details(task_id))
+        else:
+            cursor.execute('''
+            INSERT INTO tasks (title, note, link, elapsed_time, timer_state, started_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', values)
+            self._assign_id(task, cursor.lastrowid)
+        self._write_interval_events(cursor, task)
+    
+    def _write_interval_events(self, cursor, task):
+        """
+        Registra en time_intervals las transiciones pendientes del temporizador.
+        Iniciar abre una fila; pausar o detener le pone la hora de fin.
+        Lo trabajado se suma a time_rollups al cerrar el intervalo y, mientras
+        sigue abierto, cada vez que se guarda la tarea.
+        """
+        timer = task.timer
+        events = timer.interval_events[:]
+        if not events:
+            if timer.open_interval and timer.state == TimerState.RUNNING:
+                roll_up_interval(cursor, timer.open_interval[0], time.time())
+            return
+        
+        # Se quitan ya, no al confirmar: otra operación del mismo lote que guarde
+        # esta tarea no debe volver a escribirlas. Si esto se deshace, vuelven a la cola
+        del timer.interval_events[:len(events)]
+        open_interval = timer.open_interval
+        
+        def restore_events():
+            timer.interval_events[:0] = events
+            timer.open_interval = open_interval
+        self._on_rollback(restore_events)
+        
+        closed_seconds = 0.0
+        cache_valid = True
+        for kind, instant in events:
+            if kind == "start":
+                cursor.execute(
+                    "INSERT INTO time_intervals (task_id, started_at) VALUES (?, ?)",
+                    (task.id, instant)
+                )
+                timer.open_interval = (cursor.lastrowid, instant)
+            elif timer.open_interval:
+                interval_id, started_at = timer.open_interval
+                cursor.execute(
+                    "UPDATE time_intervals SET ended_at = ? WHERE id = ?",
+                    (instant, interval_id)
+                )
+                roll_up_interval(cursor, interval_id, instant)
+                closed_seconds += max(0.0, instant - started_at)
+                timer.open_interval = None
+            else:
+                # Intervalo abierto en otra sesión: se cierra el último sin fin
+                row = cursor.execute('''
+                SELECT id FROM time_intervals
+                WHERE task_id = ? AND ended_at IS NULL
+                ORDER BY started_at DESC LIMIT 1
+                ''', (task.id,)).fetchone()
+                if row:
+                    cursor.execute(
+                        "UPDATE time_intervals SET ended_at = ? WHERE id = ?",
+                        (instant, row['id'])
+                    )
+                    roll_up_interval(cursor, row['id'], instant)
+                cache_valid = False
+        if timer.open_interval and timer.state == TimerState.RUNNING:
+            # Sigue corriendo: sumar hasta ahora lo del intervalo recién abierto
+            roll_up_interval(cursor, timer.open_interval[0], time.time())
+        
+        def update_logged_time():
+            if not cache_valid:
+                self._logged_time_cache.pop(task.id, None)
+            elif task.id in self._logged_time_cache:
+                self._logged_time_cache[task.id] += closed_seconds
+        self._after_commit(update_logged_time)
+    
+    def get_logged_time(self, task_id):
+        """Segundos registrados en los intervalos cerrados de una tarea (con caché)"""
+        cached = self._logged_time_cache.get(task_id)
+        if cached is not None:
+            return int(cached)
+        try:
+            with self.pool.connection() as connection:
+                row = connection.execute('''
+                SELECT COALESCE(SUM(ended_at - started_at), 0) AS total
+                FROM time_intervals
+                WHERE task_id = ? AND ended_at IS NOT NULL
+                ''', (task_id,)).fetchone()
+            self._logged_time_cache[task_id] = row['total']
+            return int(row['total'])
+        except sqlite3.Error as e:
+            print(f"Error al sumar los intervalos de la tarea {task_id}: {e}")
+            return 0
+    
+    def get_time_between(self, task_id, start, end):
+        """
+        Segundos trabajados en una tarea entre dos instantes (timestamps Unix).
+        Los intervalos que cruzan los límites se recortan.
+        """
+        try:
+            with self.pool.connection() as connection:
+                row = connection.execute('''
+                SELECT COALESCE(SUM(MIN(ended_at, ?) - MAX(started_at, ?)), 0) AS total
+                FROM time_intervals
+                WHERE task_id = ? AND started_at < ? AND ended_at > ?
+                ''', (end, start, task_id, end, start)).fetchone()
+            return int(row['total'])
+        except sqlite3.Error as e:
+            print(f"Error al consultar los intervalos de la tarea {task_id}: {e}")
+            return 0
+    
+    def time_report(self, start, end, granularity="day"):
+        """
+        Tiempo trabajado por período y tarea, leído solo de time_rollups.
+        
+        Args:
+            start: Primer día del informe (datetime.date); se incluye
+                completo el período que lo contiene
+            end: Día siguiente al último incluido (datetime.date)
+            granularity: "day", "week" (semanas de lunes a domingo) o "month"
+        
+        Returns:
+            Lista de (inicio del período "YYYY-MM-DD", id de la tarea, título,
+            segundos, eliminada), ordenada por período y de más a menos tiempo.
+            eliminada es True para las tareas del historial de eliminadas; el
+            título es None (y eliminada True) si además se borró del historial.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularidad desconocida: {granularity!r}")
+        self._wait_queued_writes()
+        try:
+            with self.pool.connection() as connection:
+                rows = connection.execute('''
+                SELECT r.period, r.task_id, t.title, r.seconds,
+                    t.id IS NULL OR t.deleted_at IS NOT NULL AS deleted
+                FROM time_rollups r
+                LEFT JOIN tasks t ON t.id = r.task_id
+                WHERE r.granularity = ? AND r.period >= ? AND r.period < ?
+                ORDER BY r.period, r.seconds DESC
+                ''', (granularity, period_start(start, granularity).isoformat(), end.isoformat())).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error al generar el informe de tiempo: {e}")
+            return []
+        return [(row['period'], row['task_id'], row['title'], int(row['seconds']), bool(row['deleted']))
+                for row in rows]
+    
+    def _load_logged_times(self, connection):
+        """Calcula de una vez la suma de intervalos de todas las tareas y llena la caché"""
+        rows = connection.execute('''
+        SELECT task_id, SUM(ended_at - started_at) AS total
+        FROM time_intervals
+        WHERE ended_at IS NOT NULL
+        GROUP BY task_id
+        ''').fetchall()
+        self._logged_time_cache = {row['task_id']: row['total'] for row in rows}
+    
+    def _op_save_dirty_tasks(self, cursor, tasks):
+        """Operación de escritura: guarda las tareas con cambios pendientes"""
+        # Tomar las revisiones antes de escribir: si la tarea cambia
+        # mientras se guarda, seguirá marcada como pendiente
+        dirty = [(task, task.snapshot_revision()) for task in tasks if task.is_dirty()]
+        for task, _ in dirty:
+            self._upsert_task(cursor, task)
+        
+        def mark_saved():
+            for task, revisions in dirty:
+                task.mark_clean(revisions)
+        self._after_commit(mark_saved)
+        
+        if dirty:
+            print(f"Se guardaron {len(dirty)} de {len(tasks)} tareas en la base de datos")
+        return len(dirty)
+    
+    def save_dirty_tasks_async(self, tasks):
+        """Encola el guardado de las tareas modificadas. El Future devuelve cuántas se escribieron"""
+        # Copiar la lista: la interfaz puede agregar o quitar tareas mientras tanto
+        return self.submit_write(self._op_save_dirty_tasks, list(tasks))
+    
+    def save_dirty_tasks(self, tasks):
+        """
+        Guarda solo las tareas con cambios pendientes en una única transacción.
+        
+        Returns:
+            Número de filas escritas, o None si hubo un error
+        """
+        try:
+            return self.save_dirty_tasks_async(tasks).result()
+        except Exception as e:
+            print(f"Error al guardar las tareas modificadas: {e}")
+            return None
     
     def save_all_tasks(self, tasks):
-        """Guarda todas las tareas en la base de datos"""
-        with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
-            try:
-                # Primero eliminar todas las tareas existentes
-                self.cursor.execute("DELETE FROM tasks")
-                
-                # Luego insertar todas las tareas actuales
-                for task in tasks:
-                    # Insertar directamente sin llamar a save_task para evitar bloqueos anidados
-                    task_id = getattr(task, 'id', None)
-                    
-                    # Asegurarse de que el tiempo acumulado esté actualizado
-                    # Si la tarea está en ejecución, calcular el tiempo acumulado actual
-                    # antes de guardarlo en la base de datos
-                    current_elapsed_time = task.elapsed_time
-                    
-                    self.cursor.execute('''
-                    INSERT INTO tasks (title, note, link, elapsed_time, timer_state)
-                    VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        task.title, 
-                        task.note, 
-                        getattr(task, 'link', ''),
-                        current_elapsed_time,
-                        task.timer.state.value
-                    ))
-                    
-                    # Actualizar el ID si es una tarea nueva
-                    if not task_id:
-                        task.id = self.cursor.lastrowid
-                
-                self.connection.commit()
-                print(f"Se guardaron {len(tasks)} tareas en la base de datos")
+        """
+        Guarda todas las tareas en la base de datos.
+        Solo escribe las que tienen cambios pendientes y conserva sus ids.
+        """
+        return self.save_dirty_tasks(tasks) is not None
+    
+    def load_task_summaries(self):
+        """
+        Lee solo las columnas que la interfaz necesita al iniciar.
+        
+        Returns:
+            Lista de filas (id, title, elapsed_time, timer_state, started_at), ordenadas por id
+        """
+        # Ver lo que ya se envió al escritor, desde este hilo o desde otro
+        self._wait_queued_writes()
+        try:
+            # Conexión propia del hilo: no espera a que termine una escritura
+            with self.pool.connection() as connection:
+                rows = connection.execute('''
+                SELECT id, title, elapsed_time, timer_state, started_at FROM tasks
+                WHERE deleted_at IS NULL
+                ORDER BY id
+                ''').fetchall()
+                self._load_logged_times(connection)
+            return rows
+        except sqlite3.Error as e:
+            print(f"Error al cargar el resumen de las tareas: {e}")
+            return []
+    
+    def _load_open_intervals(self):
+        """
+        Intervalos abiertos de las tareas que quedaron en ejecución.
+        
+        Returns:
+            Diccionario {task_id: (id del intervalo, instante de inicio)}
+        """
+        try:
+            with self.pool.connection() as connection:
+                rows = connection.execute('''
+                SELECT i.task_id, i.id, i.started_at
+                FROM tasks t
+                JOIN time_intervals i ON i.task_id = t.id AND i.ended_at IS NULL
+                WHERE t.started_at IS NOT NULL AND t.deleted_at IS NULL
+                ORDER BY i.started_at
+                ''').fetchall()
+        except sqlite3.Error as e:
+            print(f"Error al cargar los intervalos abiertos: {e}")
+            return {}
+        # Si hubiera varios abiertos, el último es el de la ejecución actual
+        return {row['task_id']: (row['id'], row['started_at']) for row in rows}
+    
+    def load_tasks(self):
+        """
+        Carga todas las tareas desde la base de datos.
+        La nota y el enlace no se leen aquí: cada tarea los pide con
+        get_task_details la primera vez que se muestran.
+        """
+        tasks = []
+        summaries = self.load_task_summaries()
+        open_intervals = self._load_open_intervals()
+        # Un solo método enlazado para todas las tareas, no uno por tarea
+        details_loader = self._load_task_details
+        for row in summaries:
+            # Crear una tarea con los datos de la base de datos
+            task = TaskFactory.create_task(title=row['title'], note=None)
+            task.set_details_loader(details_loader)
+            
+            # Asignar el ID de la base de datos
+            task.id = row['id']
+            
+            # Establecer el tiempo acumulado. Si los intervalos registrados suman
+            # más (trabajo registrado después del último guardado), usar esa suma
+            elapsed_time = max(row['elapsed_time'] or 0, int(self._logged_time_cache.get(task.id, 0)))
+            
+            # Rehacer el temporizador con el estado guardado: uno en ejecución
+            # sigue contando desde su ancla, con el intervalo que dejó abierto
+            task.timer.restore(TimerState(row['timer_state'] or 0), elapsed_time, row['started_at'])
+            if task.timer.state == TimerState.RUNNING:
+                task.timer.open_interval = open_intervals.get(task.id)
+                elapsed_time = task.elapsed_time
+            
+            # Imprimir información de depuración
+            print(f"Tarea cargada: {task.title}, Tiempo: {elapsed_time} segundos")
+            
+            # Recién leída de la base de datos: no hay nada pendiente de guardar
+            task.mark_clean()
+            tasks.append(task)
+        
+        print(f"Se cargaron {len(tasks)} tareas desde la base de datos")
+        return tasks
+    
+    def _load_task_details(self, task):
+        return self.get_task_details(task.id)
+    
+    def get_task_details(self, task_id):
+        """
+        Devuelve (nota, enlace) de una tarea, pasando por la caché LRU.
+        Si la tarea no existe devuelve ("", "").
+        """
+        with self._details_lock:
+            details = self._details_cache.get(task_id)
+            if details is not None:
+                self._details_cache.move_to_end(task_id)
+                return details
+        try:
+            with self.pool.connection() as connection:
+                row = connection.execute(
+                    "SELECT note, link FROM tasks WHERE id = ?", (task_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error al cargar la nota y el enlace de la tarea {task_id}: {e}")
+            return ("", "")
+        details = (row['note'] or "", row['link'] or "") if row else ("", "")
+        with self._details_lock:
+            self._details_cache[task_id] = details
+            self._details_cache.move_to_end(task_id)
+            while len(self._details_cache) > DETAILS_CACHE_SIZE:
+                self._details_cache.popitem(last=False)
+        return details
+    
+    def _forget_details(self, task_id):
+        """Quita de la caché la nota y el enlace de una tarea que cambió o se eliminó"""
+        with self._details_lock:
+            self._details_cache.pop(task_id, None)
+    
+    def _op_delete_task(self, cursor, task, elapsed_time=None):
+        """
+        Operación de escritura: marca una tarea como eliminada (borrado lógico).
+        
+        La fila se queda en tasks con deleted_at y conserva su id, así que sus
+        intervalos y totales de tiempo siguen asociados a ella.
+        
+        Acepta un id o el objeto Task. Con el objeto, el id se lee al ejecutar la
+        operación, así que funciona aunque la inserción de la tarea siga en cola;
+        y si la fila no existe, la tarea se archiva con sus datos en memoria.
+        """
+        task_obj = task if isinstance(task, Task) else None
+        task_id = task_obj.id if task_obj else task
+        print(f"Intentando eliminar tarea con ID: {task_id}")
+        
+        if task_id:
+            cursor.execute('''
+            UPDATE tasks
+            SET deleted_at = CURRENT_TIMESTAMP, elapsed_time = COALESCE(?, elapsed_time), timer_state = ?,
+                started_at = NULL
+            WHERE id = ? AND deleted_at IS NULL
+            ''', (elapsed_time, TimerState.STOPPED.value, task_id))
+            if cursor.rowcount:
+                if task_obj:
+                    # Registrar la pausa o detención que precede a la eliminación
+                    self._write_interval_events(cursor, task_obj)
+                print(f"Tarea {task_id} marcada como eliminada")
+                self._after_commit(lambda: self._forget_details(task_id))
                 return True
-            except sqlite3.Error as e:
-                print(f"Error al guardar todas las tareas: {e}")
+            if cursor.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone():
+                print(f"La tarea {task_id} ya estaba eliminada")
                 return False
+        
+        if task_obj:
+            print(f"La tarea '{task_obj.title}' no está en la base de datos, se archiva con sus datos en memoria")
+            time_to_use = elapsed_time if elapsed_time is not None else task_obj.elapsed_time
+            cursor.execute('''
+            INSERT INTO tasks (title, note, link, elapsed_time, deleted_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (task_obj.title, task_obj.note, task_obj.link, time_to_use))
+            self._assign_id(task_obj, cursor.lastrowid)
+            return True
+        
+        print(f"No se encontró ninguna tarea con ID: {task_id}")
+        return False
     
-    def load_tasks(self):
-        """Carga todas las tareas desde la base de datos"""
-        with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
-            try:
-                self.cursor.execute("SELECT * FROM tasks ORDER BY id")
-                rows = self.cursor.fetchall()
-                
-                tasks = []
-                for row in rows:
-                    # Crear una tarea con los datos de la base de datos
-                    task = TaskFactory.create_task(
-                        title=row['title'],
-                        note=row['note'],
-                        link=row['link']
-                    )
-                    
-                    # Asignar el ID de la base de datos
-                    task.id = row['id']
-                    
-                    # Establecer el tiempo acumulado
-                    elapsed_time = row['elapsed_time']
-                    task.elapsed_time = elapsed_time
-                    
-                    # Establecer el estado del temporizador
-                    timer_state = row['timer_state']
-                    task.timer.state = TimerState(timer_state)
-                    
-                    # Si el temporizador estaba en ejecución, asegurarse de que el tiempo de inicio
-                    # se establezca correctamente para que el tiempo acumulado se mantenga
-                    # Nota: En realidad, al cargar siempre ponemos el temporizador en estado STOPPED
-                    # para evitar que siga corriendo sin control
-                    task.timer.state = TimerState.STOPPED
-                    
-                    # Imprimir información de depuración
-                    print(f"Tarea cargada: {task.title}, Tiempo: {elapsed_time} segundos")
-                    
-                    tasks.append(task)
-                
-                print(f"Se cargaron {len(tasks)} tareas desde la base de datos")
-                return tasks
-            except sqlite3.Error as e:
-                print(f"Error al cargar las tareas: {e}")
-                return []
+    def delete_task_async(self, task, elapsed_time=None):
+        """Encola la eliminación de una tarea (por id o por objeto). El Future devuelve True si se archivó"""
+        return self.submit_write(self._op_delete_task, task, elapsed_time)
     
     def delete_task(self, task_id, elapsed_time=None):
-        """Elimina una tarea por su ID y la guarda en la tabla de tareas eliminadas
+        """Elimina una tarea por su ID (pasa al historial de eliminadas con el mismo id)
         
         Args:
-            task_id: ID de la tarea a eliminar
+            task_id: ID de la tarea a eliminar (o el objeto Task)
             elapsed_time: Tiempo acumulado actualizado (opcional)
         """
-        with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
+        try:
+            return self.delete_task_async(task_id, elapsed_time).result()
+        except Exception as e:
+            print(f"Error al eliminar la tarea: {e}")
+            return False
+    
+    def _rows_by_id(self, cursor, table, ids, columns="id", where="1"):
+        """Lee las filas de la tabla con esos ids (y la condición where), por tramos. Devuelve {id: fila}"""
+        ids = [task_id for task_id in dict.fromkeys(ids) if task_id]
+        rows = {}
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[start:start + BULK_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f"SELECT {columns} FROM {table} WHERE id IN ({placeholders}) AND {where}", chunk)
+            rows.update((row['id'], row) for row in cursor.fetchall())
+        return rows
+    
+    def _insert_rows(self, cursor, table, columns, rows):
+        """INSERT con executemany que devuelve los ids generados, en el mismo orden"""
+        if not rows:
+            return []
+        placeholders = ", ".join("?" for _ in columns)
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+        )
+        # Con la transacción de escritura tomada, AUTOINCREMENT asigna ids consecutivos
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    
+    def _op_insert_many(self, cursor, tasks):
+        """Operación de escritura: inserta las tareas nuevas. Devuelve el id de cada una (None si ya tenía)"""
+        # Cada tarea una sola vez, aunque venga repetida en la lista
+        unique = {id(task): task for task in tasks if not task.id}.values()
+        pending = [(task, task.snapshot_revision()) for task in unique]
+        ids = self._insert_rows(
+            cursor,
+            "tasks",
+            ("title", "note", "link", "elapsed_time", "timer_state", "started_at"),
+            [(task.title, task.note, task.link, task.elapsed_time, task.timer.state.value,
+              task.timer.get_anchor())
+             for task, _ in pending]
+        )
+        for (task, _), task_id in zip(pending, ids):
+            self._assign_id(task, task_id)
+            self._write_interval_events(cursor, task)
+        
+        def mark_saved():
+            for task, revisions in pending:
+                task.mark_clean(revisions)
+        self._after_commit(mark_saved)
+        
+        inserted = {id(task): task.id for task, _ in pending}
+        print(f"Se insertaron {len(pending)} de {len(tasks)} tareas")
+        return [inserted.get(id(task)) for task in tasks]
+    
+    def insert_many(self, tasks):
+        """
+        Inserta varias tareas nuevas en una sola transacción.
+        
+        Returns:
+            Lista con el id asignado a cada tarea (None para las que ya tenían id),
+            o None si hubo un error
+        """
+        try:
+            return self.submit_write(self._op_insert_many, list(tasks)).result()
+        except Exception as e:
+            print(f"Error al insertar las tareas: {e}")
+            return None
+    
+    def _op_update_many(self, cursor, tasks):
+        """Operación de escritura: actualiza las filas existentes. Devuelve si se actualizó cada tarea"""
+        existing = self._rows_by_id(cursor, "tasks", [task.id for task in tasks], where=ACTIVE)
+        targets = [(task, task.snapshot_revision()) for task in tasks if task.id in existing]
+        
+        cursor.executemany('''
+        UPDATE tasks
+        SET title = ?, note = ?, link = ?, elapsed_time = ?, timer_state = ?, started_at = ?
+        WHERE id = ?
+        ''', [(task.title, task.note, task.link, task.elapsed_time,
+               task.timer.state.value, task.timer.get_anchor(), task.id)
+              for task, _ in targets if task.has_details()])
+        # Sin la nota y el enlace cargados se conservan los de la base de datos
+        cursor.executemany('''
+        UPDATE tasks SET title = ?, elapsed_time = ?, timer_state = ?, started_at = ?
+        WHERE id = ?
+        ''', [(task.title, task.elapsed_time, task.timer.state.value, task.timer.get_anchor(), task.id)
+              for task, _ in targets if not task.has_details()])
+        for task, _ in targets:
+            self._write_interval_events(cursor, task)
+        
+        def mark_saved():
+            for task, revisions in targets:
+                task.mark_clean(revisions)
+                self._forget_details(task.id)
+        self._after_commit(mark_saved)
+        
+        print(f"Se actualizaron {len(targets)} de {len(tasks)} tareas")
+        return [task.id in existing for task in tasks]
+    
+    def update_many(self, tasks):
+        """
+        Actualiza varias tareas en una sola transacción.
+        Las tareas sin id, eliminadas o cuya fila ya no existe no se tocan.
+        
+        Returns:
+            Lista de booleanos (True si la tarea se actualizó), o None si hubo un error
+        """
+        try:
+            return self.submit_write(self._op_update_many, list(tasks)).result()
+        except Exception as e:
+            print(f"Error al actualizar las tareas: {e}")
+            return None
+    
+    def _op_delete_many(self, cursor, tasks, elapsed_times):
+        """Operación de escritura: marca varias tareas como eliminadas. Devuelve si se archivó cada una"""
+        ids = [task.id if isinstance(task, Task) else task for task in tasks]
+        existing = self._rows_by_id(cursor, "tasks", ids, where=ACTIVE)
+        
+        # Registrar la pausa o detención que precede a la eliminación
+        for task in tasks:
+            if isinstance(task, Task) and task.id in existing:
+                self._write_interval_events(cursor, task)
+        
+        # Un solo registro por id aunque venga repetido
+        archived = {}
+        for task_id, elapsed_time in zip(ids, elapsed_times):
+            if task_id in existing and task_id not in archived:
+                archived[task_id] = elapsed_time
+        cursor.executemany('''
+        UPDATE tasks
+        SET deleted_at = CURRENT_TIMESTAMP, elapsed_time = COALESCE(?, elapsed_time), timer_state = ?,
+            started_at = NULL
+        WHERE id = ?
+        ''', [(elapsed_time, TimerState.STOPPED.value, task_id) for task_id, elapsed_time in archived.items()])
+        
+        def forget_deleted():
+            for task_id in archived:
+                self._forget_details(task_id)
+        self._after_commit(forget_deleted)
+        
+        print(f"Se eliminaron {len(archived)} de {len(tasks)} tareas")
+        return [task_id in existing for task_id in ids]
+    
+    def delete_many(self, tasks, elapsed_times=None):
+        """
+        Marca varias tareas (objetos Task o ids) como eliminadas en una sola transacción.
+        
+        Args:
+            tasks: Tareas o ids a eliminar
+            elapsed_times: Tiempo acumulado actualizado de cada tarea (opcional, None = el guardado)
+        
+        Returns:
+            Lista de booleanos (True si la tarea se archivó), o None si hubo un error
+        """
+        tasks = list(tasks)
+        elapsed_times = list(elapsed_times) if elapsed_times is not None else [None] * len(tasks)
+        try:
+            return self.submit_write(self._op_delete_many, tasks, elapsed_times).result()
+        except Exception as e:
+            print(f"Error al eliminar las tareas: {e}")
+            return None
+    
+    def _op_restore_many(self, cursor, deleted_task_ids):
+        """Operación de escritura: quita la marca de eliminada. Devuelve la Task restaurada o None"""
+        rows = self._rows_by_id(cursor, "tasks", deleted_task_ids, columns="*", where=DELETED)
+        cursor.executemany("UPDATE tasks SET deleted_at = NULL WHERE id = ?", [(task_id,) for task_id in rows])
+        
+        restored = {}
+        for task_id, row in rows.items():
+            task = TaskFactory.create_task(title=row['title'], note=row['note'], link=row['link'])
+            task.id = task_id
+            task.elapsed_time = row['elapsed_time'] or 0
+            restored[task_id] = task.mark_clean()
+        print(f"Se restauraron {len(restored)} de {len(deleted_task_ids)} tareas eliminadas")
+        return [restored.pop(task_id, None) for task_id in deleted_task_ids]
+    
+    def restore_many(self, deleted_task_ids):
+        """
+        Restaura varias tareas eliminadas en una sola transacción.
+        Cada tarea conserva su id y sale del historial.
+        
+        Returns:
+            Lista con la Task restaurada por cada id (None si no existía),
+            o None si hubo un error
+        """
+        try:
+            return self.submit_write(self._op_restore_many, list(deleted_task_ids)).result()
+        except Exception as e:
+            print(f"Error al restaurar las tareas eliminadas: {e}")
+            return None
+    
+    def _op_purge_deleted_many(self, cursor, deleted_task_ids):
+        """Operación de escritura: borra definitivamente entradas del historial"""
+        existing = self._rows_by_id(cursor, "tasks", deleted_task_ids, where=DELETED)
+        cursor.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in existing])
+        print(f"Se borraron {len(existing)} de {len(deleted_task_ids)} tareas del historial")
+        return [task_id in existing for task_id in deleted_task_ids]
+    
+    def purge_deleted_many(self, deleted_task_ids):
+        """
+        Borra definitivamente varias tareas del historial de eliminadas.
+        
+        Returns:
+            Lista de booleanos (True si la entrada existía y se borró), o None si hubo un error
+        """
+        try:
+            return self.submit_write(self._op_purge_deleted_many, list(deleted_task_ids)).result()
+        except Exception as e:
+            print(f"Error al borrar las tareas del historial: {e}")
+            return None
+    
+    def _op_import_rows(self, cursor, active_rows, deleted_rows, with_tasks=False):
+        """Operación de escritura: inserta un tramo de filas importadas"""
+        # Con la transacción del lote nadie más escribe: las filas nuevas son
+        # las de id mayor al último que había
+        last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0] if with_tasks else None
+        cursor.executemany('''
+        INSERT INTO tasks (title, note, link, elapsed_time)
+        VALUES (?, ?, ?, ?)
+        ''', active_rows)
+        imported_tasks = self._imported_tasks(cursor, last_id, active_rows) if with_tasks else []
+        # Sin fecha de eliminación se usa la actual, como al eliminar desde la aplicación
+        cursor.executemany('''
+        INSERT INTO tasks (title, note, link, elapsed_time, deleted_at)
+        VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', deleted_rows)
+        return len(active_rows), len(deleted_rows), imported_tasks
+    
+    @staticmethod
+    def _imported_tasks(cursor, last_id, active_rows):
+        """Tareas de las filas activas recién insertadas, con el id que les tocó"""
+        new_ids = [row[0] for row in cursor.execute(
+            "SELECT id FROM tasks WHERE id > ? ORDER BY id", (last_id,)
+        ).fetchall()]
+        imported_tasks = []
+        for task_id, (title, note, link, elapsed_time) in zip(new_ids, active_rows):
+            task = TaskFactory.create_task(title=title, note=note, link=link)
+            task.id = task_id
+            task.elapsed_time = elapsed_time
+            task.mark_clean()
+            imported_tasks.append(task)
+        return imported_tasks
+    
+    def import_rows_async(self, active_rows, deleted_rows, with_tasks=False):
+        """
+        Encola la inserción de un tramo de filas importadas, en una sola transacción.
+        
+        Args:
+            active_rows: Tuplas (title, note, link, elapsed_time) de tareas activas
+            deleted_rows: Tuplas (title, note, link, elapsed_time, deleted_at) de tareas eliminadas
+            with_tasks: Si se crean las Task de las filas activas (para agregarlas a la lista)
+        
+        Returns:
+            Future con (activas insertadas, eliminadas insertadas, Task activas
+            con su id; la lista está vacía si no se pidieron)
+        """
+        return self.submit_write(self._op_import_rows, active_rows, deleted_rows, with_tasks)
+    
+    def _deleted_task_from_row(self, row):
+        """Construye una Task a partir de una fila eliminada de tasks"""
+        task = TaskFactory.create_task(
+            title=row['title'],
+            note=row['note'],
+            link=row['link']
+        )
+        task.id = row['id']
+        task.elapsed_time = row['elapsed_time']
+        # Guardar la fecha de eliminación
+        task.deleted_at = row['deleted_at']
+        task.mark_clean()
+        return task
+    
+    def iter_deleted_tasks(self, after=None, limit=None, page_size=DELETED_PAGE_SIZE):
+        """
+        Genera las tareas eliminadas, de la más reciente a la más antigua.
+        
+        Usa paginación por cursor (keyset) sobre el índice de deleted_at: cada
+        página continúa después de la última fila de la anterior, sin OFFSET,
+        así que pedir la página 1000 cuesta lo mismo que pedir la primera.
+        
+        Args:
+            after: Cursor (deleted_at, id) de la última tarea ya vista, o None para empezar
+            limit: Máximo de tareas a generar (None = todas)
+            page_size: Filas leídas por consulta
+        """
+        # Ver lo que ya se envió al escritor, desde este hilo o desde otro
+        self._wait_queued_writes()
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
             try:
-                print(f"Intentando eliminar tarea con ID: {task_id}")
-                
-                # Primero obtener la tarea que se va a eliminar
-                self.cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-                task_row = self.cursor.fetchone()
-                
-                if task_row:
-                    print(f"Tarea encontrada: {task_row['title']}")
-                    
-                    try:
-                        # Determinar qué tiempo usar
-                        time_to_use = elapsed_time if elapsed_time is not None else task_row['elapsed_time']
-                        print(f"Tiempo acumulado en la base de datos: {task_row['elapsed_time']} segundos")
-                        print(f"Tiempo acumulado proporcionado: {elapsed_time if elapsed_time is not None else 'None'} segundos")
-                        print(f"Tiempo acumulado que se usará: {time_to_use} segundos")
-                        
-                        # Guardar la tarea en la tabla de tareas eliminadas
-                        self.cursor.execute('''
-                        INSERT INTO deleted_tasks (title, note, link, elapsed_time)
-                        VALUES (?, ?, ?, ?)
-                        ''', (
-                            task_row['title'],
-                            task_row['note'],
-                            task_row['link'],
-                            time_to_use  # Usar el tiempo proporcionado si está disponible
-                        ))
-                        
-                        # Verificar que se haya insertado correctamente
-                        deleted_id = self.cursor.lastrowid
-                        print(f"Tarea guardada en deleted_tasks con ID: {deleted_id}")
-                        
-                        # Eliminar la tarea de la tabla principal
-                        self.cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-                        self.connection.commit()
-                        print(f"Tarea eliminada de la tabla principal y movida a deleted_tasks")
-                        return True
-                    except sqlite3.Error as inner_e:
-                        print(f"Error al mover la tarea a deleted_tasks: {inner_e}")
-                        # Intentar hacer rollback
-                        self.connection.rollback()
-                        return False
-                else:
-                    print(f"No se encontró ninguna tarea con ID: {task_id}")
-                    return False
+                # La conexión se devuelve al pool entre páginas
+                with self.pool.connection() as connection:
+                    if after is None:
+                        rows = connection.execute('''
+                        SELECT * FROM tasks
+                        WHERE deleted_at IS NOT NULL
+                        ORDER BY deleted_at DESC, id DESC
+                        LIMIT ?
+                        ''', (size,)).fetchall()
+                    else:
+                        rows = connection.execute('''
+                        SELECT * FROM tasks
+                        WHERE deleted_at IS NOT NULL AND (deleted_at, id) < (?, ?)
+                        ORDER BY deleted_at DESC, id DESC
+                        LIMIT ?
+                        ''', (after[0], after[1], size)).fetchall()
             except sqlite3.Error as e:
-                print(f"Error al eliminar la tarea: {e}")
-                # Intentar hacer rollback
-                try:
-                    self.connection.rollback()
-                except:
-                    pass
-                return False
+                print(f"Error al cargar las tareas eliminadas: {e}")
+                return
+            
+            for row in rows:
+                yield self._deleted_task_from_row(row)
+            if len(rows) < size:
+                return
+            after = (rows[-1]['deleted_at'], rows[-1]['id'])
+            if remaining is not None:
+                remaining -= len(rows)
+    
+    @staticmethod
+    def deleted_task_cursor(task):
+        """Cursor para continuar iter_deleted_tasks después de esta tarea"""
+        return (task.deleted_at, task.id)
+    
+    def get_deleted_task(self, deleted_task_id):
+        """Carga una sola tarea eliminada por su id, o None si no existe"""
+        self._wait_queued_writes()
+        try:
+            with self.pool.connection() as connection:
+                row = connection.execute(
+                    "SELECT * FROM tasks WHERE id = ? AND deleted_at IS NOT NULL", (deleted_task_id,)
+                ).fetchone()
+            return self._deleted_task_from_row(row) if row else None
+        except sqlite3.Error as e:
+            print(f"Error al cargar la tarea eliminada {deleted_task_id}: {e}")
+            return None
+    
+    def count_deleted_tasks(self):
+        """Número de tareas en el historial de eliminadas"""
+        self._wait_queued_writes()
+        try:
+            with self.pool.connection() as connection:
+                return connection.execute(
+                    "SELECT COUNT(*) FROM tasks WHERE deleted_at IS NOT NULL"
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error al contar las tareas eliminadas: {e}")
+            return 0
     
     def load_deleted_tasks(self):
         """Carga todas las tareas eliminadas desde la base de datos"""
-        with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
+        deleted_tasks = list(self.iter_deleted_tasks())
+        print(f"Se cargaron {len(deleted_tasks)} tareas eliminadas desde la base de datos")
+        return deleted_tasks
+    
+    @staticmethod
+    def _search_expression(query):
+        """
+        Convierte el texto escrito por el usuario en una consulta FTS5: cada
+        palabra entre comillas (sin operadores) y como prefijo, todas requeridas.
+        """
+        terms = []
+        for word in query.split():
+            word = word.replace('"', '')
+            if any(char.isalnum() for char in word):
+                terms.append(f'"{word}"*')
+        return " ".join(terms)
+    
+    def search(self, query, limit=SEARCH_LIMIT, candidates=SEARCH_CANDIDATES):
+        """
+        Busca en el título, la nota y el enlace de las tareas activas y eliminadas.
+        
+        No importan las mayúsculas ni las tildes, y la última palabra puede
+        estar incompleta (búsqueda mientras se escribe).
+        
+        Calcular bm25 para cada coincidencia de una palabra muy común cuesta
+        cientos de milisegundos con 100k tareas, así que la búsqueda va por
+        etapas y cada una ordena por relevancia como mucho `candidates` filas:
+        primero las coincidencias en el título y, si faltan resultados, las de
+        la nota o el enlace. Cuando una etapa tiene más coincidencias que
+        `candidates`, se ordenan las más recientes (la interfaz lo indica).
+        
+        Args:
+            query: Texto a buscar
+            limit: Máximo de resultados
+            candidates: Coincidencias más recientes que se ordenan en cada etapa
+        
+        Returns:
+            Lista de SearchResult: las del título primero, cada grupo de la más
+            relevante a la menos relevante
+        """
+        expression = self._search_expression(query)
+        if not expression:
+            return []
+        self._wait_queued_writes()
+        try:
+            with self.pool.connection() as connection:
+                connection.execute("BEGIN")
+                rows = self._search_stage(connection, f"title : ({expression})", limit, candidates, [])
+                if len(rows) < limit:
+                    found = [row['task_id'] for row in rows]
+                    rows += self._search_stage(connection, expression, limit - len(rows), candidates, found)
+                connection.rollback()  # Solo se leyó
+        except sqlite3.Error as e:
+            print(f"Error al buscar {query!r}: {e}")
+            return []
+        return [SearchResult(row['task_id'], row['title'], row['note_snippet'], row['rank'], bool(row['deleted']))
+                for row in rows]
+    
+    @staticmethod
+    def _search_stage(connection, expression, limit, candidates, exclude_ids):
+        """
+        Una etapa de search: las `candidates` coincidencias más recientes de
+        `expression` (sin las de exclude_ids), ordenadas por relevancia.
+        El límite se busca recorriendo el índice por rowid y la consulta con
+        rank se restringe a ese rango, que FTS5 resuelve sin leer el resto.
+        """
+        oldest = connection.execute('''
+        SELECT rowid FROM task_search
+        WHERE task_search MATCH ?
+        ORDER BY rowid DESC
+        LIMIT 1 OFFSET ?
+        ''', (expression, candidates - 1)).fetchone()
+        excluded = ", ".join("?" * len(exclude_ids))
+        # rank es bm25 con los pesos por columna configurados en task_search
+        return connection.execute(f'''
+        SELECT s.rowid AS task_id, s.title, snippet(task_search, 1, '', '', '…', 8) AS note_snippet,
+            s.rank, t.deleted_at IS NOT NULL AS deleted
+        FROM task_search s
+        JOIN tasks t ON t.id = s.rowid
+        WHERE task_search MATCH ? AND s.rowid >= ? AND s.rowid NOT IN ({excluded})
+        ORDER BY s.rank
+        LIMIT ?
+        ''', (expression, oldest[0] if oldest else 0, *exclude_ids, limit)).fetchall()
+    
+    def _op_clear_deleted_tasks(self, cursor):
+        """Operación de escritura: borra definitivamente todo el historial de eliminadas"""
+        cursor.execute("DELETE FROM tasks WHERE deleted_at IS NOT NULL")
+        print(f"Se eliminaron {cursor.rowcount} tareas eliminadas")
+        return True
+    
+    def clear_deleted_tasks(self):
+        """Borra definitivamente todo el historial de tareas eliminadas"""
+        try:
+            return self.submit_write(self._op_clear_deleted_tasks).result()
+        except Exception as e:
+            print(f"Error al limpiar las tareas eliminadas: {e}")
+            return False
+    
+    def _start_backfills(self):
+        """Arranca el hilo que ejecuta los backfills pendientes de las migraciones"""
+        self._backfill_thread = threading.Thread(
+            target=self._run_backfills,
+            name="focus-title-db-backfill",
+            daemon=True
+        )
+        self._backfill_thread.start()
+    
+    def _run_backfills(self, batch_size=BACKFILL_BATCH_SIZE, pause=BACKFILL_PAUSE):
+        """
+        Ejecuta por lotes los backfills que no terminaron.
+        Cada lote es una escritura más del hilo escritor, así que las escrituras
+        de la interfaz se intercalan entre lotes en lugar de esperar al final.
+        """
+        try:
+            # Los lotes no hacen esperar a las lecturas de la interfaz
+            with self.background_writes():
+                for migration in pending_backfills(self.schema_version):
+                    progress = self.get_setting(migration.backfill_key)
+                    if progress == BACKFILL_DONE:
+                        continue
+                    after_id = int(progress) if progress else 0
+                    print(f"Backfill de la migración {migration.version} ({migration.description}) desde el id {after_id}")
+                    while after_id is not None:
+                        if self._backfill_stop.is_set():
+                            return
+                        after_id = self.submit_write(
+                            self._op_backfill_batch, migration, after_id, batch_size
+                        ).result()
+                        self._backfill_stop.wait(pause)
+                    print(f"Backfill de la migración {migration.version} terminado")
+        except Exception as e:
+            # Queda el avance guardado: se retoma en el próximo inicio
+            if not self._closed:
+                print(f"Error en el backfill, se reintentará en el próximo inicio: {e}")
+            return
+        self.backfills_done.set()
+    
+    def _op_backfill_batch(self, cursor, migration, after_id, batch_size):
+        """Operación de escritura: procesa un lote de un backfill y guarda el avance"""
+        last_id = migration.backfill(cursor, after_id, batch_size)
+        self._op_set_setting(cursor, migration.backfill_key,
+                             BACKFILL_DONE if last_id is None else last_id)
+        # Los intervalos agregados cambian las sumas registradas
+        self._after_commit(lambda: self._logged_time_cache.clear())
+        return last_id
+    
+    def backup_directory(self):
+        """Carpeta de las copias de seguridad: "backups" junto al archivo de la base de datos"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), "backups")
+    
+    def _backup_prefix(self):
+        return os.path.splitext(os.path.basename(self.db_path))[0] + "-"
+    
+    def backup(self, directory=None, pages=BACKUP_PAGES_PER_STEP, step_pause=BACKUP_STEP_PAUSE):
+        """
+        Copia la base de datos en caliente con la API de backup de SQLite.
+        
+        Copia pages páginas por paso y descansa step_pause segundos entre pasos,
+        así que nunca retiene el disco mucho tiempo. La copia se hace dentro de
+        una transacción de lectura: con WAL el escritor sigue confirmando mientras
+        tanto, y esos cambios no reinician la copia (quedan para la siguiente).
+        La copia se verifica con PRAGMA integrity_check antes de darla por buena
+        y después se aplica la política de retención.
+        
+        Returns:
+            Ruta de la copia creada, o None si falló
+        """
+        directory = directory or self.backup_directory()
+        path = None
+        start = time.perf_counter()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = self._reserve_backup_path(directory)
+            part_path = path + ".part"
+            target = sqlite3.connect(part_path)
             try:
-                self.cursor.execute("SELECT * FROM deleted_tasks ORDER BY deleted_at DESC")
-                rows = self.cursor.fetchall()
-                
-                deleted_tasks = []
-                for row in rows:
-                    # Crear una tarea con los datos de la base de datos
-                    task = TaskFactory.create_task(
-                        title=row['title'],
-                        note=row['note'],
-                        link=row['link']
+                with self.pool.connection() as connection:
+                    # Fijar la instantánea que se va a copiar
+                    connection.execute("BEGIN")
+                    connection.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                    connection.backup(
+                        target,
+                        pages=pages,
+                        progress=lambda status, remaining, total: time.sleep(step_pause)
                     )
-                    
-                    # Asignar el ID de la base de datos
-                    task.id = row['id']
-                    
-                    # Obtener el tiempo acumulado de la base de datos
-                    elapsed_time = row['elapsed_time']
-                    
-                    # Establecer el tiempo acumulado en la propiedad
-                    task.elapsed_time = elapsed_time
-                    
-                    # Asegurarse de que el temporizador tenga el tiempo correcto
-                    task.timer.set_elapsed_time(elapsed_time)
-                    
-                    # Guardar la fecha de eliminación
-                    task.deleted_at = row['deleted_at']
-                    
-                    print(f"Tarea eliminada cargada: {task.title}, tiempo: {elapsed_time} segundos")
-                    deleted_tasks.append(task)
-                
-                print(f"Se cargaron {len(deleted_tasks)} tareas eliminadas desde la base de datos")
-                return deleted_tasks
-            except sqlite3.Error as e:
-                print(f"Error al cargar las tareas eliminadas: {e}")
-                return []
+                    connection.rollback()
+                result = target.execute("PRAGMA integrity_check").fetchone()[0]
+            finally:
+                target.close()
+            if result != "ok":
+                raise sqlite3.DatabaseError(f"la copia no pasó integrity_check: {result}")
+            os.replace(part_path, path)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error al crear la copia de seguridad: {e}")
+            if path and os.path.exists(path + ".part"):
+                os.remove(path + ".part")
+            return None
+        
+        print(f"Copia de seguridad creada en {path} ({time.perf_counter() - start:.2f} s)")
+        self.rotate_backups(directory)
+        return path
     
-    def clear_deleted_tasks(self):
-        """Elimina todas las tareas de la tabla de tareas eliminadas"""
-        with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
+    def _reserve_backup_path(self, directory):
+        """
+        Ruta para una copia nueva, con la fecha hasta los milisegundos en el
+        nombre. Su archivo .part se crea aquí (O_EXCL): dos copias en el mismo
+        instante no pueden quedarse con el mismo nombre.
+        """
+        while True:
+            now = time.time()
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+            path = os.path.join(directory, f"{self._backup_prefix()}{stamp}.db")
+            if not os.path.exists(path):
+                try:
+                    os.close(os.open(path + ".part", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    return path
+                except FileExistsError:
+                    pass
+            # Ese milisegundo ya tiene copia: probar con el siguiente
+            time.sleep(0.001)
+    
+    def list_backups(self, directory=None):
+        """Rutas de las copias de seguridad, de la más reciente a la más antigua"""
+        directory = directory or self.backup_directory()
+        prefix = self._backup_prefix()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        # La fecha va en el nombre (AAAAMMDD-HHMMSS-mmm): el orden alfabético es el cronológico
+        backups = sorted(
+            (name for name in names if name.startswith(prefix) and name.endswith(".db")),
+            reverse=True
+        )
+        return [os.path.join(directory, name) for name in backups]
+    
+    def rotate_backups(self, directory=None, keep_last=BACKUP_KEEP_LAST, keep_days=BACKUP_KEEP_DAYS):
+        """
+        Borra las copias que ya no hacen falta.
+        Se conservan las keep_last más recientes y, además, la última de cada
+        uno de los keep_days días más recientes que tienen copia.
+        
+        Returns:
+            Lista de las copias borradas
+        """
+        prefix_length = len(self._backup_prefix())
+        days_kept = set()
+        removed = []
+        for index, path in enumerate(self.list_backups(directory)):
+            day = os.path.basename(path)[prefix_length:prefix_length + 8]
+            if index < keep_last:
+                days_kept.add(day)
+                continue
+            if day not in days_kept and len(days_kept) < keep_days:
+                days_kept.add(day)
+                continue
             try:
-                # Contar cuántas tareas hay antes de eliminar
-                self.cursor.execute("SELECT COUNT(*) FROM deleted_tasks")
-                count_before = self.cursor.fetchone()[0]
-                print(f"Intentando eliminar {count_before} tareas eliminadas")
-                
-                # Ejecutar la eliminación
-                self.cursor.execute("DELETE FROM deleted_tasks")
-                self.connection.commit()
-                
-                # Verificar que se hayan eliminado
-                self.cursor.execute("SELECT COUNT(*) FROM deleted_tasks")
-                count_after = self.cursor.fetchone()[0]
-                print(f"Después de eliminar, quedan {count_after} tareas eliminadas")
-                
-                return True
-            except sqlite3.Error as e:
-                print(f"Error al limpiar las tareas eliminadas: {e}")
-                return False
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                print(f"No se pudo borrar la copia {path}: {e}")
+        if removed:
+            print(f"Se borraron {len(removed)} copias de seguridad antiguas")
+        return removed
+    
+    def start_backups(self, interval=BACKUP_INTERVAL, directory=None):
+        """
+        Arranca el hilo que crea una copia de seguridad cada interval segundos.
+        La primera se hace cuando la última copia existente cumple interval
+        (nunca antes de BACKUP_FIRST_DELAY, para no competir con el inicio).
+        """
+        if self._backup_thread is not None:
+            return
+        
+        def run():
+            backups = self.list_backups(directory)
+            age = time.time() - os.path.getmtime(backups[0]) if backups else interval
+            delay = max(BACKUP_FIRST_DELAY, interval - age)
+            while not self._backup_stop.wait(delay):
+                self.backup(directory)
+                delay = interval
+        
+        self._backup_thread = threading.Thread(target=run, name="focus-title-db-backup", daemon=True)
+        self._backup_thread.start()
     
     def close(self):
-        """Cierra la conexión a la base de datos"""
-        with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
-            if self.connection:
-                try:
+        """
+        Cierra la conexión a la base de datos.
+        Antes aplica todas las escrituras que ya estaban en cola, en orden.
+        """
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._backfill_stop.set()
+            self._backup_stop.set()
+            self._write_queue.put(_STOP_WRITER)
+        self._writer_thread.join()
+        # Dejar terminar una copia de seguridad en curso antes de cerrar sus conexiones
+        if self._backup_thread is not None:
+            self._backup_thread.join()
+        
+        if self.connection:
+            # Volcar el WAL según el perfil activo antes de cerrar
+            self.checkpoint()
+        # Cerrar las conexiones de todos los hilos
+        self.pool.close_all()
+        if self.connection:
+            try:
+                with self.lock:  # Adquirir el bloqueo para operaciones de base de datos
                     self.connection.close()
-                    print("Conexión a la base de datos cerrada")
-                except Exception as e:
-                    print(f"Error al cerrar la conexión a la base de datos: {e}")
+                print("Conexión a la base de datos cerrada")
+            except Exception as e:
+                print(f"Error al cerrar la conexión a la base de datos: {e}")
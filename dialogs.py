@@ -1,4 +1,5 @@
 import flet as ft
+from models import TimerState
 from utils import format_time
 
 def create_settings_dialog(page, tasks, current_task_index, timer_running, timer_paused, 
@@ -62,13 +63,13 @@ def create_settings_dialog(page, tasks, current_task_index, timer_running, timer
                         ft.Row([
                             ft.Text("Enlace: ", style=ft.TextStyle(size=14, color=ft.Colors.GREY_700)),
                             ft.TextButton(
-                                text=task.link if hasattr(task, 'link') and task.link else "N/A",
-                                url=task.link if hasattr(task, 'link') and task.link else None,
-                                tooltip="Haz clic para abrir el enlace" if hasattr(task, 'link') and task.link else "No hay enlace disponible",
+                                text=task.link if task.link else "N/A",
+                                url=task.link if task.link else None,
+                                tooltip="Haz clic para abrir el enlace" if task.link else "No hay enlace disponible",
                                 style=ft.ButtonStyle(
-                                    color=ft.Colors.BLUE_700 if hasattr(task, 'link') and task.link else ft.Colors.GREY_400,
+                                    color=ft.Colors.BLUE_700 if task.link else ft.Colors.GREY_400,
                                 ),
-                                disabled=not (hasattr(task, 'link') and task.link),
+                                disabled=not task.link,
                             ),
                         ]),
                         ft.Row([
@@ -104,7 +105,7 @@ def create_settings_dialog(page, tasks, current_task_index, timer_running, timer
             page.snack_bar.open = True
             page.update()
             return
-            
+        
         task = tasks[task_index]
         print(f"Editando tarea {task_index + 1}: {task.title}")
         
@@ -129,7 +130,7 @@ def create_settings_dialog(page, tasks, current_task_index, timer_running, timer
         
         edit_link_field = ft.TextField(
             label="Enlace (opcional)",
-            value=task.link if hasattr(task, 'link') else "",
+            value=task.link or "",
             border_radius=10,
             width=400,
         )
@@ -217,7 +218,7 @@ def create_settings_dialog(page, tasks, current_task_index, timer_running, timer
             page.snack_bar.open = True
             page.update()
             return
-            
+        
         task = tasks[task_index]
         print(f"Eliminando tarea {task_index + 1}: {task.title}")
         
@@ -243,9 +244,9 @@ def create_settings_dialog(page, tasks, current_task_index, timer_running, timer
             
             print(f"Confirmando eliminación de tarea {task_index + 1}: {task_name}")
             
-            # Si la tarea que se está eliminando es la actual, detener el temporizador
-            if task_index == current_task_index and timer_running:
-                tasks[current_task_index].timer.stop()
+            # Detener el temporizador de la tarea si está en marcha (sea o no la actual)
+            if tasks[task_index].timer.state == TimerState.RUNNING:
+                tasks[task_index].timer.stop()
             
             # Eliminar la tarea
             tasks.pop(task_index)
@@ -255,7 +256,7 @@ def create_settings_dialog(page, tasks, current_task_index, timer_running, timer
             # Actualizar el contador de tareas
             if task_list_text:
                 task_list_text.value = f"Tareas agregadas: {len(tasks)}"
-            
+                
                 if current_task_index >= 0:
                     if display_title and display_note:
                         display_title.value = tasks[current_task_index].title
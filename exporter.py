@@ -0,0 +1,333 @@
+"""
+Exportación de tareas a CSV y otros formatos.
+
+Las filas salen directamente del cursor de SQLite por tramos (fetchmany) y
+se escriben al archivo sin crear objetos Task: el formato del tiempo y la
+conversión de deleted_at a hora local se hacen en la propia consulta. La
+exportación corre en un hilo propio (ExportJob), informa su avance y se
+puede cancelar; el archivo se escribe con extensión .part y solo se renombra
+al terminar, así que una exportación cancelada no deja archivos a medias.
+
+Los formatos se registran en EXPORT_FORMATS con register_format. Todos
+escriben tramo a tramo, también los comprimidos y Parquet, así que la
+memoria usada no depende del tamaño del historial. csv.zst y parquet
+necesitan los paquetes opcionales zstandard y pyarrow; sin ellos esos
+formatos quedan registrados pero no disponibles.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Encabezados sin tildes del CSV exportado (también los lee importer.py)
+CSV_HEADER = ["Tarea", "Titulo", "Nota", "Enlace", "Tiempo (segundos)", "Tiempo (formato)", "Estado", "Fecha Eliminacion"]
+
+# Claves de cada objeto en JSON Lines y columnas en Parquet (mismo orden que CSV_HEADER)
+FIELD_NAMES = ["tarea", "titulo", "nota", "enlace", "segundos", "tiempo", "estado", "fecha_eliminacion"]
+
+# Filas que se leen del cursor y se escriben de una vez
+EXPORT_CHUNK_SIZE = 2000
+
+# Niveles de compresión: rápidos, pensados para exportar historiales grandes
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Mismo formato que utils.format_time: MM:SS, o HH:MM:SS desde una hora
+_TIME_FORMAT_SQL = '''
+CASE WHEN elapsed_time >= 3600
+    THEN printf('%02d:%02d:%02d', elapsed_time / 3600, elapsed_time / 60 % 60, elapsed_time % 60)
+    ELSE printf('%02d:%02d', elapsed_time / 60, elapsed_time % 60)
+END
+'''
+
+# Una tarea en ejecución no reescribe elapsed_time mientras corre: su tiempo
+# se deduce del ancla started_at (julianday('now') pasado a timestamp Unix)
+_ELAPSED_SQL = '''
+CASE WHEN started_at IS NULL THEN elapsed_time
+    ELSE CAST((julianday('now') - 2440587.5) * 86400.0 - started_at AS INTEGER)
+END
+'''
+
+# Las comillas dobles se cambian por simples, como hacía la exportación original
+_ACTIVE_ROWS_SQL = f"""
+SELECT replace(title, '"', ''''), replace(COALESCE(note, ''), '"', ''''),
+    replace(COALESCE(link, ''), '"', ''''), elapsed_time, {_TIME_FORMAT_SQL},
+    'Activa', ''
+FROM (SELECT id, title, note, link, {_ELAPSED_SQL} AS elapsed_time FROM tasks WHERE deleted_at IS NULL)
+ORDER BY id
+"""
+
+_DELETED_ROWS_SQL = f"""
+SELECT replace(title, '"', ''''), replace(COALESCE(note, ''), '"', ''''),
+    replace(COALESCE(link, ''), '"', ''''), elapsed_time, {_TIME_FORMAT_SQL},
+    'Eliminada', COALESCE(datetime(deleted_at, 'localtime'), deleted_at, '')
+FROM tasks
+WHERE deleted_at IS NOT NULL
+ORDER BY deleted_at DESC, id DESC
+"""
+
+
+class _CSVRowWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.writer(stream, quoting=csv.QUOTE_MINIMAL)
+        self.writer.writerow(CSV_HEADER)
+    
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+    
+    def close(self):
+        self.stream.close()
+
+
+class _JSONLinesRowWriter:
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def write_rows(self, rows):
+        self.stream.write("".join(
+            json.dumps(dict(zip(FIELD_NAMES, row)), ensure_ascii=False) + "\n" for row in rows
+        ))
+    
+    def close(self):
+        self.stream.close()
+
+
+class _ParquetRowWriter:
+    """Cada tramo se escribe como un grupo de filas del archivo Parquet"""
+    
+    def __init__(self, path):
+        self.schema = pyarrow.schema([
+            ("tarea", pyarrow.int64()),
+            ("titulo", pyarrow.string()),
+            ("nota", pyarrow.string()),
+            ("enlace", pyarrow.string()),
+            ("segundos", pyarrow.int64()),
+            ("tiempo", pyarrow.string()),
+            ("estado", pyarrow.string()),
+            ("fecha_eliminacion", pyarrow.string()),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+    
+    def write_rows(self, rows):
+        columns = [list(column) for column in zip(*rows)]
+        self.writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+    
+    def close(self):
+        self.writer.close()
+
+
+def _open_text(path):
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def _open_gzip(path):
+    return gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=GZIP_LEVEL)
+
+
+def _open_zstd(path):
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return io.TextIOWrapper(compressor.stream_writer(open(path, 'wb')), encoding='utf-8', newline='')
+
+
+class ExportFormat:
+    """Un formato de exportación registrado"""
+    
+    def __init__(self, name, label, extension, open_writer, requires=None):
+        """
+        Args:
+            name: Clave en EXPORT_FORMATS
+            label: Texto para la interfaz
+            extension: Extensión del archivo, con el punto
+            open_writer: Función (ruta) que devuelve un objeto con write_rows(filas) y close()
+            requires: Nombre del paquete opcional que necesita, o None
+        """
+        self.name = name
+        self.label = label
+        self.extension = extension
+        self.open_writer = open_writer
+        self.requires = requires
+    
+    def available(self):
+        if self.requires == "zstandard":
+            return zstandard is not None
+        if self.requires == "pyarrow":
+            return pyarrow is not None
+        return True
+
+
+EXPORT_FORMATS = {}
+
+
+def register_format(export_format):
+    """Agrega (o reemplaza) un formato en el registro"""
+    EXPORT_FORMATS[export_format.name] = export_format
+    return export_format
+
+
+def available_formats():
+    """Formatos que se pueden usar con los paquetes instalados"""
+    return [export_format for export_format in EXPORT_FORMATS.values() if export_format.available()]
+
+
+register_format(ExportFormat("csv", "CSV", ".csv", lambda path: _CSVRowWriter(_open_text(path))))
+register_format(ExportFormat("csv.gz", "CSV comprimido (gzip)", ".csv.gz",
+                             lambda path: _CSVRowWriter(_open_gzip(path))))
+register_format(ExportFormat("csv.zst", "CSV comprimido (zstd)", ".csv.zst",
+                             lambda path: _CSVRowWriter(_open_zstd(path)), requires="zstandard"))
+register_format(ExportFormat("jsonl", "JSON Lines", ".jsonl",
+                             lambda path: _JSONLinesRowWriter(_open_text(path))))
+register_format(ExportFormat("parquet", "Parquet (columnar)", ".parquet",
+                             _ParquetRowWriter, requires="pyarrow"))
+
+
+class ExportCancelled(Exception):
+    """La exportación se canceló antes de terminar"""
+
+
+def export_tasks(db, path, export_format="csv", on_progress=None, cancel_event=None,
+                 chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Exporta las tareas activas y eliminadas en uno de los formatos registrados.
+    
+    Lee todo dentro de una misma transacción de lectura, así el archivo
+    refleja un único instante aunque el escritor siga confirmando cambios.
+    
+    Args:
+        db: Database de origen
+        path: Ruta del archivo a crear
+        export_format: Nombre de un formato de EXPORT_FORMATS
+        on_progress: Función (filas escritas, filas totales) llamada tras cada tramo
+        cancel_event: threading.Event opcional para cancelar entre tramos
+        chunk_size: Filas por tramo
+    
+    Returns:
+        (activas, eliminadas) exportadas
+    
+    Raises:
+        ExportCancelled: Si se activó cancel_event (no queda ningún archivo)
+    """
+    fmt = EXPORT_FORMATS[export_format]
+    if not fmt.available():
+        raise RuntimeError(f"El formato {fmt.label} necesita el paquete {fmt.requires}")
+    
+    # Incluir lo que todavía esté en la cola de escritura
+    db.flush_writes()
+    part_path = path + ".part"
+    counts = []
+    writer = None
+    try:
+        with db.pool.connection() as connection:
+            connection.execute("BEGIN")
+            active_total = connection.execute("SELECT COUNT(*) FROM tasks WHERE deleted_at IS NULL").fetchone()[0]
+            deleted_total = connection.execute("SELECT COUNT(*) FROM tasks WHERE deleted_at IS NOT NULL").fetchone()[0]
+            total = active_total + deleted_total
+            
+            writer = fmt.open_writer(part_path)
+            written = 0
+            for sql in (_ACTIVE_ROWS_SQL, _DELETED_ROWS_SQL):
+                cursor = connection.execute(sql)
+                exported = 0
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ExportCancelled()
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.write_rows([(written + i + 1,) + tuple(row) for i, row in enumerate(rows)])
+                    exported += len(rows)
+                    written += len(rows)
+                    if on_progress:
+                        on_progress(written, total)
+                counts.append(exported)
+            writer.close()
+            writer = None
+            connection.rollback()  # Solo se leyó: cerrar la transacción de lectura
+        os.replace(part_path, path)
+    except BaseException:
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    
+    if on_progress:
+        on_progress(sum(counts), sum(counts))
+    print(f"Archivo {fmt.label} exportado a {path}: {counts[0]} activas, {counts[1]} eliminadas")
+    return counts[0], counts[1]
+
+
+def export_csv(db, path, on_progress=None, cancel_event=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Exporta las tareas activas y eliminadas a un CSV (ver export_tasks)"""
+    return export_tasks(db, path, "csv", on_progress, cancel_event, chunk_size)
+
+
+class ExportJob:
+    """Exportación en un hilo en segundo plano, cancelable"""
+    
+    def __init__(self, db, path, on_progress=None, on_done=None, before_export=None, cancel_event=None,
+                 export_format="csv"):
+        """
+        Args:
+            db: Database de origen
+            path: Ruta del archivo a crear
+            on_progress: Función (filas escritas, filas totales), llamada desde el hilo del trabajo
+            on_done: Función (job) llamada al terminar, se haya completado, cancelado o fallado
+            before_export: Función opcional que se ejecuta en el hilo del trabajo antes
+                de exportar (por ejemplo, guardar las tareas con cambios)
+            cancel_event: threading.Event a usar para cancelar (por defecto uno nuevo)
+            export_format: Nombre de un formato de EXPORT_FORMATS
+        """
+        self.db = db
+        self.path = path
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.before_export = before_export
+        self.export_format = export_format
+        self.cancel_event = cancel_event or threading.Event()
+        self.counts = None  # (activas, eliminadas) al completarse
+        self.cancelled = False
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="focus-title-export", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def cancel(self):
+        """Pide cancelar; el trabajo se detiene al terminar el tramo en curso"""
+        self.cancel_event.set()
+    
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+    
+    def _run(self):
+        try:
+            if self.before_export:
+                self.before_export()
+            self.counts = export_tasks(self.db, self.path, self.export_format,
+                                       self.on_progress, self.cancel_event)
+        except ExportCancelled:
+            self.cancelled = True
+            print(f"Exportación a {self.path} cancelada")
+        except Exception as e:
+            self.error = e
+            print(f"Error al exportar tareas ({self.export_format}): {e}")
+        if self.on_done:
+            self.on_done(self)
@@ -0,0 +1,218 @@
+"""
+Importación de tareas desde CSV.
+
+Lee el formato que genera "Exportar a CSV" (y cualquier CSV con al menos una
+columna Titulo) fila por fila: las filas se validan a medida que se leen y se
+insertan por tramos, cada tramo en una transacción del hilo escritor. Solo hay
+en memoria el tramo que se está escribiendo y el que se está leyendo, así que
+el consumo no depende del tamaño del archivo.
+
+Uso:
+    python importer.py tareas.csv [--db focus_title.db] [--chunk-size 1000]
+"""
+import argparse
+import csv
+import datetime
+import io
+import os
+
+# Filas que se insertan por transacción
+IMPORT_CHUNK_SIZE = 1000
+
+# Errores de validación que se guardan para mostrar (el resto solo se cuentan)
+MAX_REPORTED_ERRORS = 20
+
+STATE_ACTIVE = "Activa"
+STATE_DELETED = "Eliminada"
+
+
+class ImportRowError(ValueError):
+    """Una fila del CSV no es válida"""
+
+
+class ImportResult:
+    """Resumen de una importación"""
+    
+    def __init__(self):
+        self.active = 0
+        self.deleted = 0
+        self.skipped = 0
+        self.errors = []  # (línea, mensaje) de las primeras filas inválidas
+    
+    @property
+    def imported(self):
+        return self.active + self.deleted
+    
+    def add_error(self, line_number, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+    
+    def __str__(self):
+        return (f"{self.imported} tareas importadas ({self.active} activas, "
+                f"{self.deleted} eliminadas), {self.skipped} filas omitidas")
+
+
+def parse_duration(value):
+    """Convierte "MM:SS" o "HH:MM:SS" en segundos"""
+    parts = value.split(":")
+    if len(parts) not in (2, 3) or not all(part.strip().isdigit() for part in parts):
+        raise ImportRowError(f"tiempo no válido: {value!r}")
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def parse_deleted_at(value):
+    """
+    Convierte la fecha de eliminación exportada (hora local) al formato UTC
+    con el que SQLite guarda deleted_at. Sin fecha devuelve None (se usa la actual).
+    """
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        local_date = datetime.datetime.fromisoformat(value.replace(' ', 'T'))
+    except ValueError:
+        raise ImportRowError(f"fecha de eliminación no válida: {value!r}")
+    utc_date = local_date.astimezone(datetime.timezone.utc)
+    return utc_date.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_row(row):
+    """
+    Valida una fila (diccionario columna -> texto) del CSV.
+    
+    Returns:
+        (estado, título, nota, enlace, segundos, deleted_at)
+    """
+    title = (row.get("Titulo") or "").strip()
+    if not title:
+        raise ImportRowError("la tarea no tiene título")
+    
+    seconds_text = (row.get("Tiempo (segundos)") or "").strip()
+    duration_text = (row.get("Tiempo (formato)") or "").strip()
+    if seconds_text:
+        if not seconds_text.isdigit():
+            raise ImportRowError(f"tiempo en segundos no válido: {seconds_text!r}")
+        elapsed_time = int(seconds_text)
+    elif duration_text:
+        elapsed_time = parse_duration(duration_text)
+    else:
+        elapsed_time = 0
+    
+    state = (row.get("Estado") or STATE_ACTIVE).strip() or STATE_ACTIVE
+    if state not in (STATE_ACTIVE, STATE_DELETED):
+        raise ImportRowError(f"estado desconocido: {state!r}")
+    deleted_at = parse_deleted_at(row.get("Fecha Eliminacion") or "") if state == STATE_DELETED else None
+    
+    return state, title, row.get("Nota") or "", row.get("Enlace") or "", elapsed_time, deleted_at
+
+
+def read_rows(csvfile):
+    """
+    Genera (número de línea, fila) de un CSV abierto en modo texto.
+    La primera línea tiene que ser un encabezado con la columna Titulo.
+    """
+    reader = csv.DictReader(csvfile)
+    if not reader.fieldnames or "Titulo" not in reader.fieldnames:
+        raise ImportRowError("el archivo no tiene la columna 'Titulo'")
+    for row in reader:
+        yield reader.line_num, row
+
+
+def import_csv(db, path, chunk_size=IMPORT_CHUNK_SIZE, on_progress=None, cancel_event=None, on_tasks=None):
+    """
+    Importa un CSV en la base de datos.
+    
+    Mientras el hilo escritor confirma un tramo, aquí ya se lee y valida el
+    siguiente; nunca hay más de dos tramos en memoria.
+    
+    Args:
+        db: Database donde importar
+        path: Ruta del archivo CSV
+        chunk_size: Filas por transacción
+        on_progress: Función (filas leídas, bytes leídos, bytes totales) llamada tras cada tramo
+        cancel_event: threading.Event opcional; si se activa, se deja de leer
+            (los tramos ya confirmados quedan importados)
+        on_tasks: Función opcional que recibe, tras confirmarse cada tramo, la
+            lista de sus tareas activas (Task con su id). Sin ella no se crean las Task
+    
+    Returns:
+        ImportResult con lo importado y las filas omitidas
+    """
+    result = ImportResult()
+    total_bytes = os.path.getsize(path)
+    rows_read = 0
+    pending = None  # Future del tramo en escritura
+    
+    def wait_pending():
+        if pending is None:
+            return
+        active_count, deleted_count, imported_tasks = pending.result()
+        result.active += active_count
+        result.deleted += deleted_count
+        if on_tasks and imported_tasks:
+            on_tasks(imported_tasks)
+    
+    with open(path, 'rb') as raw:
+        # El archivo binario da la posición para el progreso; utf-8-sig ignora el BOM
+        csvfile = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        active_rows, deleted_rows = [], []
+        for line_number, row in read_rows(csvfile):
+            rows_read += 1
+            try:
+                state, title, note, link, elapsed_time, deleted_at = parse_row(row)
+            except ImportRowError as e:
+                result.add_error(line_number, str(e))
+                continue
+            if state == STATE_DELETED:
+                deleted_rows.append((title, note, link, elapsed_time, deleted_at))
+            else:
+                active_rows.append((title, note, link, elapsed_time))
+            
+            if len(active_rows) + len(deleted_rows) >= chunk_size:
+                wait_pending()
+                pending = db.import_rows_async(active_rows, deleted_rows, with_tasks=on_tasks is not None)
+                active_rows, deleted_rows = [], []
+                if on_progress:
+                    on_progress(rows_read, raw.tell(), total_bytes)
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+        else:
+            if active_rows or deleted_rows:
+                wait_pending()
+                pending = db.import_rows_async(active_rows, deleted_rows, with_tasks=on_tasks is not None)
+        wait_pending()
+    
+    if on_progress:
+        on_progress(rows_read, total_bytes, total_bytes)
+    print(f"Importación de {path}: {result}")
+    return result
+
+
+if __name__ == "__main__":
+    from database import Database
+    
+    parser = argparse.ArgumentParser(description="Importa tareas desde un CSV exportado por Focus Title")
+    parser.add_argument("path", metavar="archivo", help="CSV a importar")
+    parser.add_argument("--db", default="focus_title.db", help="Base de datos de destino")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE,
+                        help="Filas por transacción")
+    args = parser.parse_args()
+    
+    def print_progress(rows_read, bytes_read, total_bytes):
+        percent = 100 * bytes_read / total_bytes if total_bytes else 100
+        print(f"\r{rows_read} filas leídas ({percent:.0f}%)", end="", flush=True)
+    
+    db = Database(args.db)
+    try:
+        import_result = import_csv(db, args.path, args.chunk_size, print_progress)
+        print()
+        for line_number, message in import_result.errors:
+            print(f"Línea {line_number}: {message}")
+    except (OSError, ImportRowError) as e:
+        print(f"No se pudo importar {args.path}: {e}")
+    finally:
+        db.close()
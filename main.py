@@ -1,16 +1,18 @@
 import flet as ft
-import asyncio
-import csv
 import os
 import datetime
-import time
+import threading
 import atexit  # Para asegurar guardado robusto al cerrar la app
 from models import Task, TaskFactory, TimerState
 from utils import format_time, calculate_font_sizes, create_button
-from ui_components import create_task_display, create_welcome_screen, create_input_fields
+from ui_components import create_task_display, create_task_details, create_welcome_screen, create_input_fields
 from settings_screen import create_settings_screen
 from dialogs import create_settings_dialog
-from database import Database
+from database import Database, DELETED_PAGE_SIZE
+from importer import import_csv
+from exporter import EXPORT_FORMATS, ExportJob, available_formats
+from persistence import SaveScheduler
+from ticker import TickScheduler
 
 def main(page: ft.Page):
     # Configuración inicial de la página
@@ -26,35 +28,28 @@ def main(page: ft.Page):
     
     # Inicializar la base de datos
     db = Database()
-    
-    # Función para guardar todas las tareas periódicamente
-    async def save_tasks_periodically():
-        while True:
-            await asyncio.sleep(60)  # Guardar cada minuto
-            try:
-                print("Guardando tareas periódicamente...")
-                db.save_all_tasks(tasks)
-            except Exception as e:
-                print(f"Error al guardar tareas periódicamente: {e}")
-    
-    # Iniciar el guardado periódico
-    page.run_task(save_tasks_periodically)
+    # Copias de seguridad periódicas en segundo plano (carpeta "backups")
+    db.start_backups()
+    # Guardado diferido: cada cambio en una tarea se guarda tras una pausa breve
+    saver = SaveScheduler(db)
+    # Un solo bucle de ticks para todos los temporizadores en pantalla
+    ticker = TickScheduler(page.run_task)
     
     # Función para guardar tareas cuando la página se cierra
     def save_all_and_close():
         print("Guardando todas las tareas y cerrando la base de datos...")
         try:
-            # Pausar todos los temporizadores activos y actualizar tiempos
-            for task in tasks:
-                if hasattr(task, 'timer') and task.timer.state == TimerState.RUNNING:
-                    task.timer.pause()
-                    print(f"Temporizador de '{task.title}' pausado con tiempo acumulado: {task.elapsed_time} segundos")
-            db.save_all_tasks(tasks)
+            ticker.stop()
+            # Guardar lo que el programador tenga pendiente
+            saver.close()
+            # Los temporizadores activos no se pausan: su ancla ya está guardada
+            # y al volver a abrir siguen contando desde ella
+            db.save_dirty_tasks(tasks)
             db.close()
             print("Tareas guardadas correctamente al cerrar la aplicación")
         except Exception as e:
             print(f"Error al guardar tareas al cerrar: {e}")
-
+    
     def on_window_event(e):
         if e.data == "close":
             print("Ventana cerrando, guardando tareas...")
@@ -62,10 +57,10 @@ def main(page: ft.Page):
     
     # Registrar el evento de cierre de ventana
     page.on_window_event = on_window_event
-
+    
     # Registrar el handler con atexit para asegurar guardado aunque falle el evento de ventana
     atexit.register(save_all_and_close)
-
+    
     
     # Variables para controlar el temporizador
     timer_running = False
@@ -76,11 +71,16 @@ def main(page: ft.Page):
     
     # Lista de tareas
     tasks = db.load_tasks()  # Cargar tareas desde la base de datos
+    saver.track(tasks)
     current_task_index = 0 if len(tasks) > 0 else -1
     
     # Variable para controlar si ya se actualizó la lista de tareas
     tasks_list_updated = False
     
+    # Páginas del historial de tareas eliminadas que se están mostrando
+    deleted_tasks_view = []
+    deleted_tasks_has_more = False
+    
     # Crear campos de entrada para el título, la nota y el enlace
     title_input, note_input = create_input_fields()
     
@@ -161,10 +161,8 @@ def main(page: ft.Page):
             saved_time = current_task.elapsed_time
             print(f"Iniciando tarea con tiempo acumulado: {saved_time} segundos")
             
-            # En lugar de usar start() que reinicia el tiempo, vamos a establecer manualmente el estado
-            # y calcular el tiempo de inicio para que el tiempo acumulado se mantenga
-            current_task.timer.state = TimerState.RUNNING
-            current_task.timer.start_time = time.time() - saved_time
+            # Arrancar sin reiniciar: se sigue contando sobre el tiempo acumulado
+            current_task.timer.start(keep_elapsed=True)
             
             # Actualizar el texto del temporizador para mostrar el tiempo acumulado
             timer_text.value = format_time(saved_time)
@@ -172,8 +170,12 @@ def main(page: ft.Page):
             timer_running = True
             timer_paused = False
             pause_resume_button.icon = ft.Icons.PAUSE
+            update_position_text()
+            # Registrar ya el inicio del intervalo de trabajo: el cambio está
+            # pendiente en el programador de guardado, que lo escribe una vez
+            saver.flush(wait=False)
             page.update()
-            page.run_task(update_display)
+            follow_timer(current_task)
             return
         
         if current_task.timer.state == TimerState.RUNNING:
@@ -182,6 +184,7 @@ def main(page: ft.Page):
             timer_running = False
             timer_paused = True
             pause_resume_button.icon = ft.Icons.PLAY_ARROW
+            ticker.unsubscribe(update_display)
         else:  # PAUSED
             # Reanudar el temporizador
             current_task.timer.resume()
@@ -189,92 +192,75 @@ def main(page: ft.Page):
             timer_paused = False
             pause_resume_button.icon = ft.Icons.PAUSE
             
-            # Actualizar la interfaz
-            page.update()
-            
-            # Luego ejecutamos la función update_display directamente usando page.run_task
-            page.run_task(update_display)
+            # El programador de ticks tiene un solo bucle: suscribirse de nuevo no lo duplica
+            follow_timer(current_task)
         
+        update_position_text()
+        # Registrar ya la transición (fin o inicio de un intervalo de trabajo)
+        saver.flush(wait=False)
         page.update()
     
-    # Función para actualizar el temporizador y aplicar el efecto arcoíris
-    async def update_display():
-        nonlocal timer_running
-        # Lista de colores para el efecto arcoíris con transiciones más suaves
-        colors = [
-            "#FF5252", "#FF7043", "#FFCA28", "#9CCC65", 
-            "#42A5F5", "#5C6BC0", "#AB47BC", "#EC407A"
-        ]
-        color_index = 0
-        last_second = -1  # Para controlar la actualización por segundo
-        
-        print("Iniciando temporizador...")
-        
-        # Obtener la tarea actual
-        current_task = tasks[current_task_index]
+    # Lista de colores para el efecto arcoíris con transiciones más suaves
+    rainbow_colors = [
+        "#FF5252", "#FF7043", "#FFCA28", "#9CCC65", 
+        "#42A5F5", "#5C6BC0", "#AB47BC", "#EC407A"
+    ]
+    color_index = 0
+    
+    # Función para actualizar el temporizador y aplicar el efecto arcoíris.
+    # La llama el programador de ticks una vez por segundo mientras la tarea
+    # mostrada esté en ejecución
+    def update_display():
+        nonlocal color_index
+        
+        # Sin tarea en ejecución en pantalla no hay nada que redibujar
+        if not (0 <= current_task_index < len(tasks)) or tasks[current_task_index].timer.state != TimerState.RUNNING:
+            ticker.unsubscribe(update_display)
+            return
         
-        # Asegurarse de que el temporizador esté corriendo
-        if current_task.timer.state != TimerState.RUNNING:
-            # Guardar el tiempo acumulado actual
-            saved_time = current_task.elapsed_time
-            print(f"Iniciando temporizador con tiempo acumulado: {saved_time} segundos")
+        # Obtener el tiempo transcurrido de la tarea actual
+        elapsed = tasks[current_task_index].elapsed_time
+        
+        # Actualizar el texto del temporizador
+        timer_text.value = format_time(elapsed)
+        
+        # Aplica el efecto de cambio de color con transición suave
+        # Solo cambiar el color cada 5 segundos para un efecto más suave
+        if elapsed % 5 == 0:
+            color = rainbow_colors[color_index % len(rainbow_colors)]
+            display_title.color = color
+            # Cambia también el color del borde del temporizador para un efecto visual más integrado
+            timer_container.bgcolor = ft.Colors.with_opacity(0.15, color)
+            # También cambia el color del texto del temporizador para mejor integración visual
+            timer_text.color = color
+            color_index += 1
             
-            # En lugar de usar start() que reinicia el tiempo, vamos a establecer manualmente el estado
-            # y calcular el tiempo de inicio para que el tiempo acumulado se mantenga
-            current_task.timer.state = TimerState.RUNNING
-            current_task.timer.start_time = time.time() - saved_time
-        
-        timer_running = True
-        
-        # Verificar que estamos trabajando con la tarea actual
-        task_index_at_start = current_task_index
-        
-        while timer_running and current_task_index == task_index_at_start and current_task.timer.state == TimerState.RUNNING:
-            try:
-                # Verificar si el temporizador sigue corriendo o si hemos cambiado de tarea
-                if current_task.timer.state != TimerState.RUNNING or current_task_index != task_index_at_start:
-                    break
-                    
-                # Obtener el tiempo transcurrido de la tarea actual
-                elapsed = current_task.elapsed_time
-                current_second = elapsed
-                
-                # Actualizar solo cuando cambie el segundo
-                if current_second != last_second:
-                    last_second = current_second
-                    
-                    # Actualizar el texto del temporizador
-                    timer_text.value = format_time(elapsed)
-                    
-                    # Aplica el efecto de cambio de color con transición suave
-                    # Solo cambiar el color cada 5 segundos para un efecto más suave
-                    if elapsed % 5 == 0:
-                        display_title.color = colors[color_index % len(colors)]
-                        # Cambia también el color del borde del temporizador para un efecto visual más integrado
-                        timer_container.bgcolor = ft.Colors.with_opacity(0.15, colors[color_index % len(colors)])
-                        # También cambia el color del texto del temporizador para mejor integración visual
-                        timer_text.color = colors[color_index % len(colors)]
-                        color_index += 1
-                    
-                    # Actualiza la página
-                    page.update()
-                
-                # Ajusta el tamaño del título, la nota y el temporizador según el tamaño de la ventana
-                # y la orientación (portrait/landscape) - esto se hace menos frecuentemente
-                if elapsed % 5 == 0:
-                    sizes = calculate_font_sizes(page, font_size_multiplier)
-                    display_title.size = sizes["title"]
-                    display_note.size = sizes["note"]
-                    timer_text.size = sizes["timer"]
-                
-                # Espera un tiempo más corto para actualizar más frecuentemente
-                # Esto permite una actualización más fluida del temporizador
-                await asyncio.sleep(0.1)  # Actualizar cada 100ms para mayor fluidez
-            except Exception as e:
-                print(f"Error en update_display: {e}")
-                break
-        
-        print("Temporizador detenido")
+            # Ajusta el tamaño del título, la nota y el temporizador según el tamaño de la ventana
+            # y la orientación (portrait/landscape) - esto se hace menos frecuentemente
+            sizes = calculate_font_sizes(page, font_size_multiplier)
+            display_title.size = sizes["title"]
+            display_note.size = sizes["note"]
+            timer_text.size = sizes["timer"]
+        
+        # Actualiza la página
+        page.update()
+    
+    # Función para mostrar la posición de la tarea y cuántos temporizadores más siguen en marcha.
+    # Se recalcula al cambiar de tarea o de estado, nunca en cada tick
+    def update_position_text():
+        running = sum(1 for task in tasks if task.timer.state == TimerState.RUNNING)
+        if 0 <= current_task_index < len(tasks) and tasks[current_task_index].timer.state == TimerState.RUNNING:
+            running -= 1
+        text = f"Tarea {current_task_index + 1} de {len(tasks)}"
+        if running > 0:
+            text += f" · {running} más en marcha"
+        task_position_text.value = text
+    
+    # Función para redibujar el temporizador de una tarea en ejecución en cada cambio de segundo
+    def follow_timer(task):
+        # Los ticks caen justo después de que cambie el segundo mostrado de esta tarea
+        ticker.align_to(task.timer.get_monotonic_anchor())
+        ticker.subscribe(update_display)
     
     # Función para agregar una tarea a la lista
     def add_task_to_list():
@@ -291,9 +277,10 @@ def main(page: ft.Page):
         # Crear una nueva tarea
         new_task = TaskFactory.create_task(title_input.value, note_input.value, link_input.value)
         tasks.append(new_task)
+        saver.track([new_task])
         
-        # Guardar la tarea en la base de datos
-        db.save_task(new_task)
+        # Guardar la tarea en la base de datos (en segundo plano)
+        db.save_task_async(new_task)
         
         # Si es la primera tarea, establecer el índice actual
         if current_task_index == -1:
@@ -321,8 +308,23 @@ def main(page: ft.Page):
         
         page.update()
     
+    # Función para leer una página del historial de tareas eliminadas
+    def fetch_deleted_page(after=None):
+        # Pedir una tarea de más para saber si quedan páginas por cargar
+        page_tasks = list(db.iter_deleted_tasks(after=after, limit=DELETED_PAGE_SIZE + 1))
+        return page_tasks[:DELETED_PAGE_SIZE], len(page_tasks) > DELETED_PAGE_SIZE
+    
+    # Función para cargar la siguiente página del historial de tareas eliminadas
+    def load_more_deleted_tasks(e=None):
+        nonlocal deleted_tasks_has_more
+        after = db.deleted_task_cursor(deleted_tasks_view[-1]) if deleted_tasks_view else None
+        page_tasks, deleted_tasks_has_more = fetch_deleted_page(after)
+        deleted_tasks_view.extend(page_tasks)
+        show_settings_screen(keep_deleted_pages=True)
+    
     # Función para mostrar la pantalla de configuración
-    def show_settings_screen(e=None):
+    def show_settings_screen(e=None, keep_deleted_pages=False):
+        nonlocal deleted_tasks_has_more
         # Asegurarse de que todos los contenedores estén en la página
         if len(page.controls) == 0 or (len(page.controls) > 0 and page.controls[0] != welcome_container):
             # Restaurar todos los contenedores principales
@@ -332,9 +334,12 @@ def main(page: ft.Page):
         welcome_container.visible = False
         task_container.visible = False
         
-        # Cargar las tareas eliminadas - Forzar una recarga completa desde la base de datos
-        deleted_tasks = db.load_deleted_tasks()
-        print(f"Mostrando pantalla de configuración con {len(deleted_tasks)} tareas eliminadas")
+        # Cargar solo la primera página del historial de tareas eliminadas
+        # (o conservar las páginas ya cargadas con "Cargar más")
+        if not keep_deleted_pages:
+            page_tasks, deleted_tasks_has_more = fetch_deleted_page()
+            deleted_tasks_view[:] = page_tasks
+        print(f"Mostrando pantalla de configuración con {len(deleted_tasks_view)} tareas eliminadas")
         
         # Función para depurar el problema con el botón de limpiar
         def debug_clear_deleted(e):
@@ -351,11 +356,20 @@ def main(page: ft.Page):
             edit_task,
             delete_task,
             close_settings_screen,
-            deleted_tasks,
+            deleted_tasks_view,
             restore_task,
             debug_clear_deleted,  # Usar la función de depuración
             export_tasks_to_csv,  # Pasar la función de exportación a CSV
-            delete_selected_tasks  # Pasar la función para eliminar tareas seleccionadas
+            delete_selected_tasks,  # Pasar la función para eliminar tareas seleccionadas
+            db.storage_profile,
+            change_storage_profile,
+            load_more_deleted_tasks if deleted_tasks_has_more else None,
+            restore_selected_tasks,
+            import_tasks_from_csv,
+            job_status,
+            [(export_format.name, export_format.label) for export_format in available_formats()],
+            db.search,
+            db.time_report
         )
         
         # Actualizar el contenido del contenedor de configuración
@@ -366,82 +380,81 @@ def main(page: ft.Page):
         
         page.update()
     
+    # Función para cambiar el perfil de almacenamiento de la base de datos
+    def change_storage_profile(profile_name):
+        if db.set_storage_profile(profile_name):
+            page.snack_bar = ft.SnackBar(content=ft.Text(f"Perfil de almacenamiento cambiado a '{profile_name}'"))
+        else:
+            page.snack_bar = ft.SnackBar(content=ft.Text("Error al cambiar el perfil de almacenamiento"))
+        page.snack_bar.open = True
+        page.update()
+    
+    # Función para agregar a la lista en memoria tareas que ya están guardadas
+    # (restauradas o importadas): sus cambios se guardan con el programador
+    def add_saved_tasks(new_tasks):
+        tasks.extend(new_tasks)
+        saver.track(new_tasks)
+    
     # Función para restaurar una tarea eliminada
-    def restore_task(deleted_task_index):
-        # Cargar las tareas eliminadas
-        deleted_tasks = db.load_deleted_tasks()
-        
-        # Verificar que el índice sea válido
-        if deleted_task_index < 0 or deleted_task_index >= len(deleted_tasks):
-            print(f"Error: Índice de tarea eliminada inválido para restaurar: {deleted_task_index}")
+    def restore_task(deleted_task_id):
+        restore_tasks([deleted_task_id])
+    
+    # Función para restaurar varias tareas eliminadas en una sola transacción
+    def restore_tasks(deleted_task_ids):
+        restored = db.restore_many(deleted_task_ids)
+        restored_tasks = [task for task in restored or [] if task is not None]
+        
+        # Verificar que se haya restaurado alguna tarea
+        if not restored_tasks:
+            print(f"Error: No se pudo restaurar ninguna de las tareas eliminadas: {deleted_task_ids}")
             page.snack_bar = ft.SnackBar(content=ft.Text("Error al restaurar la tarea"))
             page.snack_bar.open = True
             page.update()
             return
         
-        # Obtener la tarea eliminada
-        deleted_task = deleted_tasks[deleted_task_index]
-        
-        # Crear una nueva tarea con los mismos datos
-        new_task = TaskFactory.create_task(
-            title=deleted_task.title,
-            note=deleted_task.note,
-            link=getattr(deleted_task, 'link', None)
-        )
-        
-        # Establecer el tiempo acumulado
-        elapsed_time = getattr(deleted_task, 'elapsed_time', 0)
-        print(f"Restaurando tarea con tiempo acumulado: {elapsed_time} segundos")
-        new_task.elapsed_time = elapsed_time
-        
-        # Asegurarse de que el temporizador tenga el tiempo correcto
-        new_task.timer.set_elapsed_time(elapsed_time)
-        
-        # Agregar la tarea a la lista de tareas
-        tasks.append(new_task)
-        
-        # Guardar la tarea en la base de datos
-        saved_task = db.save_task(new_task)
-        if saved_task:
-            print(f"Tarea restaurada guardada con ID: {saved_task.id}")
-        else:
-            print("Error al guardar la tarea restaurada en la base de datos")
-        
-        # Eliminar la tarea de la tabla de tareas eliminadas
-        # Esto evita que aparezca en la lista de tareas eliminadas
-        if hasattr(deleted_task, 'id'):
-            try:
-                # Eliminar directamente de la tabla deleted_tasks
-                with db.lock:
-                    db.cursor.execute("DELETE FROM deleted_tasks WHERE id = ?", (deleted_task.id,))
-                    db.connection.commit()
-                    print(f"Tarea eliminada de la tabla deleted_tasks con ID: {deleted_task.id}")
-            except Exception as e:
-                print(f"Error al eliminar tarea restaurada del historial: {e}")
+        # Agregar las tareas a la lista de tareas (ya están guardadas con su id)
+        for task in restored_tasks:
+            print(f"Tarea restaurada con ID: {task.id}, tiempo acumulado: {task.elapsed_time} segundos")
+        add_saved_tasks(restored_tasks)
         
         # Actualizar el contador de tareas
         task_list_text.value = f"Tareas agregadas: {len(tasks)}"
         
         # Habilitar el botón de inicio si es la primera tarea
-        if len(tasks) == 1:
+        if len(tasks) == len(restored_tasks):
             start_button.disabled = False
         
         # Mostrar mensaje de confirmación
-        page.snack_bar = ft.SnackBar(content=ft.Text(f"Tarea '{deleted_task.title}' restaurada con tiempo: {format_time(elapsed_time)}"))
+        if len(restored_tasks) == 1:
+            task = restored_tasks[0]
+            message = f"Tarea '{task.title}' restaurada con tiempo: {format_time(task.elapsed_time)}"
+        else:
+            message = f"Se restauraron {len(restored_tasks)} tareas"
+        page.snack_bar = ft.SnackBar(content=ft.Text(message))
         page.snack_bar.open = True
         
         # Actualizar la pantalla de configuración inmediatamente
         show_settings_screen()
     
+    # Función para restaurar las tareas seleccionadas del historial
+    def restore_selected_tasks(selected_tasks):
+        task_ids = [task_id for task_id, selected in selected_tasks.items() if selected]
+        if not task_ids:
+            page.snack_bar = ft.SnackBar(content=ft.Text("No hay tareas seleccionadas para restaurar"))
+            page.snack_bar.open = True
+            page.update()
+            return
+        restore_tasks(task_ids)
+    
     # Función para limpiar todas las tareas eliminadas
     def clear_deleted_tasks(e=None):
         print(f"clear_deleted_tasks llamada con parámetro: {e}")
         
         # Comprobar directamente si hay tareas eliminadas
-        deleted_tasks = db.load_deleted_tasks()
-        print(f"Hay {len(deleted_tasks)} tareas eliminadas para borrar")
+        deleted_count = db.count_deleted_tasks()
+        print(f"Hay {deleted_count} tareas eliminadas para borrar")
         
-        if len(deleted_tasks) == 0:
+        if deleted_count == 0:
             # No hay tareas para eliminar
             page.snack_bar = ft.SnackBar(content=ft.Text("No hay tareas eliminadas para limpiar"))
             page.snack_bar.open = True
@@ -451,21 +464,10 @@ def main(page: ft.Page):
         # ELIMINAR DIRECTAMENTE SIN DIÁLOGO
         print("Eliminando tareas sin diálogo de confirmación")
         
-        # Ejecutar directamente la consulta SQL para asegurar que se eliminan
-        try:
-            with db.lock:
-                db.cursor.execute("DELETE FROM deleted_tasks")
-                db.connection.commit()
-                print("Consulta SQL de eliminación ejecutada directamente")
-                
-                # Verificar que se hayan eliminado
-                db.cursor.execute("SELECT COUNT(*) FROM deleted_tasks")
-                count_after = db.cursor.fetchone()[0]
-                print(f"Después de eliminar, quedan {count_after} tareas eliminadas")
-        except Exception as e:
-            print(f"Error al eliminar tareas: {e}")
+        # Borrar el historial en el hilo escritor
+        if not db.clear_deleted_tasks():
             page.snack_bar = ft.SnackBar(
-                content=ft.Text(f"Error al eliminar tareas: {e}"),
+                content=ft.Text("Error al eliminar tareas"),
                 bgcolor=ft.Colors.RED_700,
                 action="OK"
             )
@@ -488,62 +490,25 @@ def main(page: ft.Page):
         
         # Luego recargar la pantalla de configuración
         show_settings_screen()
-        
+    
     def delete_selected_tasks(selected_tasks):
         print(f"delete_selected_tasks llamada con {len([k for k, v in selected_tasks.items() if v])} tareas seleccionadas")
         
-        # Verificar si hay tareas seleccionadas
-        selected_indices = [idx for idx, selected in selected_tasks.items() if selected]
+        # Obtener los IDs de las tareas seleccionadas (la selección se guarda por id)
+        task_ids = [task_id for task_id, selected in selected_tasks.items() if selected]
         
-        if not selected_indices:
+        if not task_ids:
             # No hay tareas seleccionadas
             page.snack_bar = ft.SnackBar(content=ft.Text("No hay tareas seleccionadas para eliminar"))
             page.snack_bar.open = True
             page.update()
             return
         
-        # Cargar las tareas eliminadas
-        deleted_tasks = db.load_deleted_tasks()
-        
-        # Verificar que los índices sean válidos
-        valid_indices = [idx for idx in selected_indices if 0 <= idx < len(deleted_tasks)]
-        
-        if not valid_indices:
-            page.snack_bar = ft.SnackBar(content=ft.Text("No se encontraron tareas válidas para eliminar"))
-            page.snack_bar.open = True
-            page.update()
-            return
-        
-        # Obtener los IDs de las tareas a eliminar
-        task_ids = []
-        for idx in valid_indices:
-            if idx < len(deleted_tasks) and hasattr(deleted_tasks[idx], 'id'):
-                task_ids.append(deleted_tasks[idx].id)
-        
-        if not task_ids:
-            page.snack_bar = ft.SnackBar(content=ft.Text("No se encontraron IDs válidos para eliminar"))
-            page.snack_bar.open = True
-            page.update()
-            return
-        
-        # Eliminar las tareas seleccionadas
-        try:
-            with db.lock:
-                # Crear una cadena de placeholders para la consulta SQL
-                placeholders = ", ".join(["?" for _ in task_ids])
-                
-                # Ejecutar la consulta para eliminar las tareas seleccionadas
-                db.cursor.execute(f"DELETE FROM deleted_tasks WHERE id IN ({placeholders})", task_ids)
-                db.connection.commit()
-                
-                # Verificar cuántas tareas quedan
-                db.cursor.execute("SELECT COUNT(*) FROM deleted_tasks")
-                count_after = db.cursor.fetchone()[0]
-                print(f"Se eliminaron {len(task_ids)} tareas. Quedan {count_after} tareas eliminadas")
-        except Exception as e:
-            print(f"Error al eliminar tareas seleccionadas: {e}")
+        # Eliminar las tareas seleccionadas en una sola transacción
+        results = db.purge_deleted_many(task_ids)
+        if results is None:
             page.snack_bar = ft.SnackBar(
-                content=ft.Text(f"Error al eliminar tareas seleccionadas: {e}"),
+                content=ft.Text("Error al eliminar tareas seleccionadas"),
                 bgcolor=ft.Colors.RED_700,
                 action="OK"
             )
@@ -551,9 +516,11 @@ def main(page: ft.Page):
             page.update()
             return
         
+        print(f"Se eliminaron {sum(results)} tareas. Quedan {db.count_deleted_tasks()} tareas eliminadas")
+        
         # Mostrar mensaje de confirmación
         page.snack_bar = ft.SnackBar(
-            content=ft.Text(f"Se eliminaron {len(task_ids)} tareas seleccionadas"),
+            content=ft.Text(f"Se eliminaron {sum(results)} tareas seleccionadas"),
             bgcolor=ft.Colors.GREEN_700,
             action="OK"
         )
@@ -634,7 +601,7 @@ def main(page: ft.Page):
         )
         
         edit_link_field = ft.TextField(
-            value=tasks[task_index].link if hasattr(tasks[task_index], 'link') and tasks[task_index].link else "",
+            value=tasks[task_index].link if tasks[task_index].link else "",
             label="Enlace",
             border_radius=10,
             expand=True,
@@ -665,7 +632,7 @@ def main(page: ft.Page):
                 page.snack_bar.open = True
                 page.update()
                 return
-                
+            
             # Guardar los cambios
             save_task_changes(task_index, edit_title_field, edit_note_field, edit_link_field)
             
@@ -773,14 +740,15 @@ def main(page: ft.Page):
         
         # Obtener la tarea a eliminar
         task_to_delete = tasks[task_index]
-        task_id = getattr(task_to_delete, 'id', None)
+        task_id = task_to_delete.id
         task_name = task_to_delete.title
         
         print(f"Intentando eliminar tarea con ID: {task_id}")
         
-        # Si la tarea que se está eliminando es la actual, detener el temporizador
-        if task_index == current_task_index:
+        # Detener el temporizador si es la tarea actual o si sigue en marcha en segundo plano
+        if task_index == current_task_index or task_to_delete.timer.state == TimerState.RUNNING:
             task_to_delete.timer.stop()
+        if task_index == current_task_index:
             timer_running = False
             timer_paused = False
         
@@ -797,91 +765,25 @@ def main(page: ft.Page):
         
         # Actualizar el tiempo acumulado en la tarea antes de eliminarla
         task_to_delete.elapsed_time = elapsed_time
-        task_to_delete.timer.set_elapsed_time(elapsed_time)
         print(f"Tiempo acumulado final de la tarea a eliminar: {elapsed_time} segundos")
         
-        # Guardar la tarea en la tabla de tareas eliminadas antes de eliminarla
-        if task_id:
-            # Asegurarse de que la tarea tenga todos los atributos necesarios
-            if not hasattr(task_to_delete, 'link'):
-                task_to_delete.link = ""
-            
-            # Intentar eliminar la tarea de la base de datos (esto la mueve a deleted_tasks)
-            # Pasar el tiempo acumulado actualizado para asegurar que se preserve
-            success = db.delete_task(task_id, elapsed_time)
-            if success:
-                print(f"Tarea guardada en deleted_tasks con ID: {task_id} y tiempo: {elapsed_time} segundos")
-            else:
-                print(f"Error al guardar la tarea en deleted_tasks")
-                # Intentar insertar directamente en la tabla deleted_tasks como respaldo
-                try:
-                    with db.lock:
-                        db.cursor.execute('''
-                        INSERT INTO deleted_tasks (title, note, link, elapsed_time)
-                        VALUES (?, ?, ?, ?)
-                        ''', (
-                            task_to_delete.title,
-                            task_to_delete.note,
-                            getattr(task_to_delete, 'link', ''),
-                            elapsed_time
-                        ))
-                        db.connection.commit()
-                        print(f"Tarea insertada directamente en deleted_tasks como respaldo")
-                except Exception as e:
-                    print(f"Error al insertar directamente en deleted_tasks: {e}")
-        else:
-            # Si la tarea no tiene ID, primero guardarla en la base de datos para obtener un ID
-            print(f"La tarea no tiene ID, intentando guardarla primero")
+        # Marcar la tarea como eliminada en segundo plano (conserva su id).
+        # Se pasa el objeto y no el id: si su inserción aún está en cola, el
+        # escritor la aplica antes y la eliminación ya encuentra la fila
+        def on_task_archived(future):
             try:
-                # Guardar la tarea para obtener un ID
-                saved_task = db.save_task(task_to_delete)
-                if saved_task:
-                    task_id = saved_task.id
-                    print(f"Tarea guardada con nuevo ID: {task_id}")
-                    
-                    # Ahora intentar moverla a deleted_tasks
-                    # Pasar el tiempo acumulado actualizado para asegurar que se preserve
-                    success = db.delete_task(task_id, elapsed_time)
-                    if success:
-                        print(f"Tarea guardada en deleted_tasks con ID: {task_id} y tiempo: {elapsed_time} segundos")
-                    else:
-                        print(f"Error al guardar la tarea en deleted_tasks")
-                        # Intentar insertar directamente como respaldo
-                        try:
-                            with db.lock:
-                                db.cursor.execute('''
-                                INSERT INTO deleted_tasks (title, note, link, elapsed_time)
-                                VALUES (?, ?, ?, ?)
-                                ''', (
-                                    task_to_delete.title,
-                                    task_to_delete.note,
-                                    getattr(task_to_delete, 'link', ''),
-                                    elapsed_time
-                                ))
-                                db.connection.commit()
-                                print(f"Tarea insertada directamente en deleted_tasks como respaldo")
-                        except Exception as e:
-                            print(f"Error al insertar directamente en deleted_tasks: {e}")
+                if future.result():
+                    print(f"Tarea '{task_name}' movida al historial con tiempo: {elapsed_time} segundos")
                 else:
-                    print(f"No se pudo obtener un ID para la tarea")
-                    # Intentar insertar directamente como respaldo
-                    try:
-                        with db.lock:
-                            db.cursor.execute('''
-                            INSERT INTO deleted_tasks (title, note, link, elapsed_time)
-                            VALUES (?, ?, ?, ?)
-                            ''', (
-                                task_to_delete.title,
-                                task_to_delete.note,
-                                getattr(task_to_delete, 'link', ''),
-                                elapsed_time
-                            ))
-                            db.connection.commit()
-                            print(f"Tarea insertada directamente en deleted_tasks como respaldo")
-                    except Exception as e:
-                        print(f"Error al insertar directamente en deleted_tasks: {e}")
+                    print(f"Error al mover la tarea '{task_name}' al historial")
             except Exception as e:
-                print(f"Error al intentar guardar la tarea: {e}")
+                print(f"Error al mover la tarea '{task_name}' al historial: {e}")
+        
+        # Los cambios aún no guardados de la tarea (título, nota, cierre del intervalo
+        # de trabajo) y su eliminación se confirman juntos, en un solo commit
+        with db.transaction(wait=False):
+            db.save_task_async(task_to_delete)
+            db.delete_task_async(task_to_delete, elapsed_time).add_done_callback(on_task_archived)
         
         # Eliminar la tarea de la lista en memoria
         print(f"Eliminando tarea {task_index + 1}: {task_name}")
@@ -904,11 +806,20 @@ def main(page: ft.Page):
             
             # Actualizar la interfaz con la tarea actual si estamos en la pantalla de tareas
             if not config_container.visible and current_task_index >= 0:
-                display_title.value = tasks[current_task_index].title
-                display_note.value = tasks[current_task_index].note
+                current_task = tasks[current_task_index]
+                display_title.value = current_task.title
+                display_note.value = current_task.note
+                
+                # La tarea que pasa a mostrarse puede tener su propio temporizador en marcha
+                timer_running = current_task.timer.state == TimerState.RUNNING
+                timer_paused = current_task.timer.state == TimerState.PAUSED
+                pause_resume_button.icon = ft.Icons.PAUSE if timer_running else ft.Icons.PLAY_ARROW
+                timer_text.value = format_time(current_task.elapsed_time)
+                if timer_running:
+                    follow_timer(current_task)
                 
                 # Actualizar el indicador de posición y los botones de navegación
-                task_position_text.value = f"Tarea {current_task_index + 1} de {len(tasks)}"
+                update_position_text()
                 prev_task_button.visible = current_task_index > 0
                 next_task_button.visible = current_task_index < len(tasks) - 1
         
@@ -981,6 +892,9 @@ def main(page: ft.Page):
     
     # Función para crear un elemento de tarea con edición in-line
     def create_task_item(index, task, time_str):
+        # La nota y el enlace se leen al desplegar el elemento, no al armar la lista
+        details_view = create_task_details(page, task)
+        
         # Crear un contenedor para la vista normal (no edición)
         normal_view = ft.Column([
             ft.Row([
@@ -988,19 +902,7 @@ def main(page: ft.Page):
                 ft.Text(f"Tiempo: {time_str}", color=ft.Colors.BLUE_700),
             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
             ft.Text(f"Título: {task.title}", style=ft.TextStyle(size=16)),
-            ft.Text(f"Nota: {task.note if task.note else 'N/A'}", style=ft.TextStyle(size=14, color=ft.Colors.GREY_500)),
-            ft.Row([
-                ft.Text("Enlace: ", style=ft.TextStyle(size=14, color=ft.Colors.GREY_700)),
-                ft.TextButton(
-                    text=task.link if hasattr(task, 'link') and task.link else "N/A",
-                    url=task.link if hasattr(task, 'link') and task.link else None,
-                    tooltip="Haz clic para abrir el enlace" if hasattr(task, 'link') and task.link else "No hay enlace disponible",
-                    style=ft.ButtonStyle(
-                        color=ft.Colors.BLUE_700 if hasattr(task, 'link') and task.link else ft.Colors.GREY_500,
-                    ),
-                    disabled=not (hasattr(task, 'link') and task.link),
-                ),
-            ]),
+            details_view,
             ft.Row([
                 ft.ElevatedButton(
                     text="Editar",
@@ -1023,7 +925,8 @@ def main(page: ft.Page):
             ], alignment=ft.MainAxisAlignment.END, spacing=10),
         ])
         
-        # Crear campos para la vista de edición
+        # Crear campos para la vista de edición (la nota y el enlace se
+        # completan al entrar en modo de edición, ver toggle_edit_mode)
         edit_title_field = ft.TextField(
             value=task.title,
             label="Título",
@@ -1032,7 +935,7 @@ def main(page: ft.Page):
         )
         
         edit_note_field = ft.TextField(
-            value=task.note if task.note else "",
+            value="",
             label="Nota",
             multiline=True,
             min_lines=2,
@@ -1042,7 +945,7 @@ def main(page: ft.Page):
         )
         
         edit_link_field = ft.TextField(
-            value=task.link if hasattr(task, 'link') and task.link else "",
+            value="",
             label="Enlace",
             border_radius=10,
             width=400,
@@ -1098,7 +1001,8 @@ def main(page: ft.Page):
                 offset=ft.Offset(0, 2)
             ),
             margin=ft.margin.only(bottom=10),
-            data={"normal_view": normal_view, "edit_view": edit_view, "index": index}  # Guardar referencias para acceso fácil
+            data={"normal_view": normal_view, "edit_view": edit_view, "index": index,
+                  "note_field": edit_note_field, "link_field": edit_link_field}  # Guardar referencias para acceso fácil
         )
         
         return task_container
@@ -1117,8 +1021,10 @@ def main(page: ft.Page):
                 
                 # Si estamos cancelando, no hacemos nada más
                 if not cancel and edit_view.visible:
-                    # Estamos entrando en modo de edición
+                    # Estamos entrando en modo de edición: ahora sí se leen la nota y el enlace
                     print(f"Editando tarea {task_index + 1}: {tasks[task_index].title}")
+                    task_container.data["note_field"].value = tasks[task_index].note or ""
+                    task_container.data["link_field"].value = tasks[task_index].link or ""
                 
                 page.update()
                 break
@@ -1149,9 +1055,8 @@ def main(page: ft.Page):
         # Actualizar el enlace si se proporcionó
         if link_field:
             tasks[task_index].link = link_field.value
-            
-        # Guardar los cambios en la base de datos
-        db.save_all_tasks(tasks)  # Guardar todas las tareas para asegurar persistencia
+        
+        # No hace falta guardar aquí: cada cambio ya avisó al programador de guardado
         
         # Si la tarea actual es la que se está editando, actualizar la interfaz principal
         if task_index == current_task_index:
@@ -1177,115 +1082,204 @@ def main(page: ft.Page):
         page.update()
         return True
     
-    # Función para exportar tareas a CSV
-    def export_tasks_to_csv(e=None):
-        # Función para exportar todas las tareas (activas y eliminadas) a un archivo CSV
+    # Estado de la importación o exportación en curso, visible en la pantalla de configuración
+    job_cancel_event = None
+    
+    def cancel_current_job(e=None):
+        if job_cancel_event is not None:
+            job_cancel_event.set()
+            job_status_text.value = "Cancelando..."
+            page.update()
+    
+    job_status_text = ft.Text(value="", size=14, color=ft.Colors.BLUE_700, selectable=True)
+    job_progress_bar = ft.ProgressBar(value=0, width=400)
+    job_cancel_button = ft.TextButton(text="Cancelar", icon=ft.Icons.CANCEL, on_click=cancel_current_job)
+    job_status = ft.Column(
+        [job_status_text, ft.Row([job_progress_bar, job_cancel_button])],
+        spacing=5,
+        visible=False
+    )
+    
+    def is_job_running():
+        return job_cancel_event is not None
+    
+    def start_job_status(message):
+        nonlocal job_cancel_event
+        job_cancel_event = threading.Event()
+        job_status_text.value = message
+        job_progress_bar.value = 0
+        job_progress_bar.visible = True
+        job_cancel_button.visible = True
+        job_status.visible = True
+        page.update()
+        return job_cancel_event
+    
+    def finish_job_status(message=None):
+        nonlocal job_cancel_event
+        job_cancel_event = None
+        # Con mensaje, queda a la vista el resultado (por ejemplo, la ruta del archivo)
+        job_status.visible = message is not None
+        job_status_text.value = message or ""
+        job_progress_bar.visible = False
+        job_cancel_button.visible = False
+    
+    def show_job_already_running():
+        page.snack_bar = ft.SnackBar(content=ft.Text("Ya hay una importación o exportación en curso"))
+        page.snack_bar.open = True
+        page.update()
+    
+    # Selector de archivos para la importación
+    import_file_picker = ft.FilePicker()
+    page.overlay.append(import_file_picker)
+    
+    # Función para importar tareas desde un CSV (formato de "Exportar a CSV")
+    def import_tasks_from_csv(e=None):
+        if is_job_running():
+            show_job_already_running()
+            return
+        import_file_picker.on_result = on_import_file_picked
+        import_file_picker.pick_files(
+            dialog_title="Importar tareas desde CSV",
+            allowed_extensions=["csv"],
+            allow_multiple=False
+        )
+    
+    def on_import_file_picked(e):
+        if not e.files or is_job_running():
+            return
+        path = e.files[0].path
+        cancel_event = start_job_status(f"Importando {os.path.basename(path)}...")
+        # Importar en segundo plano para no bloquear la interfaz
+        threading.Thread(target=run_import, args=(path, cancel_event), daemon=True).start()
+    
+    def run_import(path, cancel_event):
+        def on_progress(rows_read, bytes_read, total_bytes):
+            job_status_text.value = f"Importando {os.path.basename(path)}: {rows_read} filas leídas"
+            job_progress_bar.value = bytes_read / total_bytes if total_bytes else 1
+            page.update()
+        
+        # La lista de tareas se comparte con la interfaz: cada tramo confirmado
+        # se agrega en su hilo, sin guardar aquí las tareas de todo el archivo
+        def on_tasks(imported_tasks):
+            page.run_task(add_imported_tasks, imported_tasks)
+        
+        try:
+            # Los tramos no hacen esperar a las lecturas de la interfaz mientras tanto
+            with db.background_writes():
+                result = import_csv(db, path, on_progress=on_progress, cancel_event=cancel_event, on_tasks=on_tasks)
+        except Exception as ex:
+            print(f"Error al importar {path}: {ex}")
+            page.run_task(show_import_error, ex)
+            return
+        page.run_task(finish_import, result, cancel_event.is_set())
+    
+    async def add_imported_tasks(imported_tasks):
+        # Agregar a la lista en memoria las tareas activas de un tramo importado
+        add_saved_tasks(imported_tasks)
+        task_list_text.value = f"Tareas agregadas: {len(tasks)}"
+        if tasks:
+            start_button.disabled = False
+        page.update()
+    
+    async def show_import_error(error):
+        finish_job_status()
+        page.snack_bar = ft.SnackBar(content=ft.Text(f"Error al importar tareas: {error}"))
+        page.snack_bar.open = True
+        page.update()
+    
+    async def finish_import(result, cancelled):
+        finish_job_status()
+        message = f"Importación {'cancelada' if cancelled else 'terminada'}: {result}"
+        if result.errors:
+            line_number, error = result.errors[0]
+            message += f" (línea {line_number}: {error})"
+        page.snack_bar = ft.SnackBar(content=ft.Text(message), action="OK")
+        page.snack_bar.open = True
+        
+        # Actualizar la pantalla de configuración si está abierta
+        if config_container.visible:
+            show_settings_screen()
+        else:
+            page.update()
+    
+    # Función para exportar tareas a CSV u otro formato registrado
+    # (en segundo plano, con progreso y cancelable)
+    def export_tasks_to_csv(e=None, export_format="csv"):
+        if is_job_running():
+            show_job_already_running()
+            return
+        
+        # Verificar si hay tareas para exportar (activas o eliminadas)
+        if len(tasks) == 0 and db.count_deleted_tasks() == 0:
+            page.snack_bar = ft.SnackBar(content=ft.Text("No hay tareas para exportar"))
+            page.snack_bar.open = True
+            page.update()
+            return
+        
         try:
-            # Cargar las tareas eliminadas desde la base de datos
-            deleted_tasks = db.load_deleted_tasks()
-            
-            # Verificar si hay tareas para exportar (activas o eliminadas)
-            if len(tasks) == 0 and len(deleted_tasks) == 0:
-                page.snack_bar = ft.SnackBar(content=ft.Text("No hay tareas para exportar"))
-                page.snack_bar.open = True
-                page.update()
-                return
-            
             # Crear el directorio de descargas si no existe
             downloads_dir = os.path.join(os.path.expanduser("~"), "Downloads")
             if not os.path.exists(downloads_dir):
                 os.makedirs(downloads_dir)
-            
-            # Crear un nombre de archivo con timestamp
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"focus_title_tareas_{timestamp}.csv"
-            filepath = os.path.join(downloads_dir, filename)
-            
-            # Abrir el archivo para escribir
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                # Crear el escritor CSV
-                csv_writer = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL)
-                
-                # Escribir encabezados sin tildes
-                csv_writer.writerow(["Tarea", "Titulo", "Nota", "Enlace", "Tiempo (segundos)", "Tiempo (formato)", "Estado", "Fecha Eliminacion"])
-                
-                # Escribir datos de cada tarea activa
-                for i, task in enumerate(tasks):
-                    # Manejar comillas dobles en título, nota y enlace
-                    title = task.title.replace('"', "'")
-                    note = task.note.replace('"', "'") if task.note else ""
-                    link = task.link.replace('"', "'") if hasattr(task, 'link') and task.link else ""
-                    
-                    # Obtener el tiempo formateado
-                    time_str = format_time(task.elapsed_time)
-                    
-                    # Escribir fila (tareas activas)
-                    csv_writer.writerow([i+1, title, note, link, task.elapsed_time, time_str, "Activa", ""])
-                
-                # Escribir datos de cada tarea eliminada
-                for i, task in enumerate(deleted_tasks):
-                    # Manejar comillas dobles en título, nota y enlace
-                    title = task.title.replace('"', "'")
-                    note = task.note.replace('"', "'") if task.note else ""
-                    link = task.link.replace('"', "'") if hasattr(task, 'link') and task.link else ""
-                    
-                    # Obtener el tiempo formateado
-                    time_str = format_time(task.elapsed_time)
-                    
-                    # Obtener la fecha de eliminación y convertirla de UTC a hora local
-                    deleted_date = ""
-                    if hasattr(task, 'deleted_at') and task.deleted_at:
-                        try:
-                            # Parsear la fecha de SQLite (formato ISO)
-                            utc_date = datetime.datetime.fromisoformat(task.deleted_at.replace(' ', 'T'))
-                            # Convertir a hora local
-                            local_date = utc_date.replace(tzinfo=datetime.timezone.utc).astimezone()
-                            # Formatear la fecha en un formato legible
-                            deleted_date = local_date.strftime("%Y-%m-%d %H:%M:%S")
-                        except Exception as e:
-                            print(f"Error al convertir fecha: {e}")
-                            deleted_date = task.deleted_at  # Usar la fecha original si hay error
-                    
-                    # Escribir fila (tareas eliminadas)
-                    csv_writer.writerow([len(tasks) + i + 1, title, note, link, task.elapsed_time, time_str, "Eliminada", deleted_date])
-            
-            # Mostrar mensaje de éxito en snackbar con la ruta del archivo
-            page.snack_bar = ft.SnackBar(
-                content=ft.Text(f"Archivo CSV exportado exitosamente a: {filepath}"),
-                bgcolor=ft.Colors.GREEN_700,
-                action="OK"
-            )
+        except OSError as ex:
+            page.snack_bar = ft.SnackBar(content=ft.Text(f"Error al exportar tareas: {str(ex)}"))
             page.snack_bar.open = True
-            
-            # Asegurarse de que el contenedor de información sea visible y esté en primer plano
-            download_info_container.visible = True
-            download_path_text.value = f"Archivo CSV guardado en: {filepath}"
-            download_path_text.visible = True
-            
-            # Forzar la actualización de la página para mostrar el mensaje
             page.update()
-            
-            print(f"Archivo CSV exportado exitosamente a: {filepath}")
-            print(f"Total de tareas exportadas: {len(tasks)} activas, {len(deleted_tasks)} eliminadas")
-            
-        except Exception as e:
-            # Mostrar mensaje de error
-            page.snack_bar = ft.SnackBar(content=ft.Text(f"Error al exportar tareas: {str(e)}"))
+            print(f"Error al exportar tareas a CSV: {str(ex)}")
+            return
+        
+        # Crear un nombre de archivo con timestamp
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"focus_title_tareas_{timestamp}{EXPORT_FORMATS[export_format].extension}"
+        filepath = os.path.join(downloads_dir, filename)
+        
+        last_percent = -1
+        
+        def on_export_progress(written, total):
+            nonlocal last_percent
+            # Actualizar la interfaz solo cuando cambia el porcentaje
+            percent = 100 * written // total if total else 100
+            if percent != last_percent:
+                last_percent = percent
+                job_status_text.value = f"Exportando {filename}: {written} de {total} tareas"
+                job_progress_bar.value = percent / 100
+                page.update()
+        
+        def on_export_done(job):
+            if job.error is not None:
+                finish_job_status()
+                page.snack_bar = ft.SnackBar(content=ft.Text(f"Error al exportar tareas: {str(job.error)}"))
+            elif job.cancelled:
+                finish_job_status()
+                page.snack_bar = ft.SnackBar(content=ft.Text("Exportación cancelada"))
+            else:
+                active_count, deleted_count = job.counts
+                print(f"Total de tareas exportadas: {active_count} activas, {deleted_count} eliminadas")
+                finish_job_status(f"Archivo guardado en: {filepath}")
+                page.snack_bar = ft.SnackBar(
+                    content=ft.Text(f"Archivo exportado exitosamente a: {filepath}"),
+                    bgcolor=ft.Colors.GREEN_700,
+                    action="OK"
+                )
             page.snack_bar.open = True
             page.update()
-            print(f"Error al exportar tareas a CSV: {str(e)}")
+        
+        ExportJob(
+            db,
+            filepath,
+            on_progress=on_export_progress,
+            on_done=on_export_done,
+            # Guardar antes los cambios pendientes (incluido el tiempo de un temporizador en marcha)
+            before_export=saver.flush,
+            cancel_event=start_job_status(f"Exportando {filename}..."),
+            export_format=export_format
+        ).start()
     
     # Función para regresar a la pantalla de inicio
     def return_to_home():
-        nonlocal timer_running, timer_paused
-        
-        # Si hay una tarea activa, pausar su temporizador
-        if current_task_index >= 0 and current_task_index < len(tasks):
-            current_task = tasks[current_task_index]
-            if current_task.timer.state == TimerState.RUNNING:
-                current_task.timer.pause()
-                timer_running = False
-                timer_paused = True
+        # Los temporizadores en marcha siguen contando; solo se deja de redibujar
+        # el de la pantalla de tareas, que queda oculta
+        ticker.unsubscribe(update_display)
         
         # Mostrar la pantalla de inicio y ocultar la pantalla de tareas
         welcome_container.visible = True
@@ -1298,14 +1292,8 @@ def main(page: ft.Page):
     def navigate_task(direction):
         nonlocal current_task_index, timer_running, timer_paused
         
-        # Obtener la tarea actual
-        current_task = tasks[current_task_index]
-        
-        # Pausar el temporizador de la tarea actual si está corriendo
-        if current_task.timer.state == TimerState.RUNNING:
-            current_task.timer.pause()
-            timer_running = False
-            timer_paused = True
+        # El temporizador de la tarea que se deja no se pausa: varias tareas pueden
+        # correr a la vez y cada una cuenta desde su ancla sin trabajo por tick
         
         # Calcular el nuevo índice
         new_index = current_task_index + direction
@@ -1322,7 +1310,7 @@ def main(page: ft.Page):
             display_note.value = new_current_task.note
             
             # Actualizar el enlace
-            link_value = new_current_task.link if hasattr(new_current_task, 'link') else ""
+            link_value = new_current_task.link or ""
             display_link.text = link_value if link_value else "Sin enlace"
             display_link.url = link_value if link_value else None
             display_link.tooltip = "Haz clic para abrir el enlace" if link_value else "No hay enlace disponible"
@@ -1336,7 +1324,7 @@ def main(page: ft.Page):
             timer_text.value = format_time(elapsed_time)
             
             # Actualizar el indicador de posición
-            task_position_text.value = f"Tarea {current_task_index + 1} de {len(tasks)}"
+            update_position_text()
             
             # Actualizar visibilidad de los botones de navegación
             prev_task_button.visible = current_task_index > 0
@@ -1347,10 +1335,13 @@ def main(page: ft.Page):
                 pause_resume_button.icon = ft.Icons.PAUSE
                 timer_running = True
                 timer_paused = False
+                follow_timer(new_current_task)
             else:  # PAUSED o STOPPED
                 pause_resume_button.icon = ft.Icons.PLAY_ARROW
                 timer_running = False
                 timer_paused = (new_current_task.timer.state == TimerState.PAUSED)
+                # La tarea mostrada no corre: no hace falta redibujar el temporizador
+                ticker.unsubscribe(update_display)
         
         # Actualizar la página
         page.update()
@@ -1368,8 +1359,10 @@ def main(page: ft.Page):
         
         print("Iniciando temporizador desde start_button_clicked")
         
-        # Establecer la primera tarea como la actual
-        current_task_index = 0
+        # Establecer como actual la tarea que quedó en ejecución, o la primera
+        current_task_index = next(
+            (i for i, task in enumerate(tasks) if task.timer.state == TimerState.RUNNING), 0
+        )
         
         # Obtener la tarea actual
         current_task = tasks[current_task_index]
@@ -1379,7 +1372,7 @@ def main(page: ft.Page):
         display_note.value = current_task.note
         
         # Actualizar el enlace
-        link_value = current_task.link if hasattr(current_task, 'link') else ""
+        link_value = current_task.link or ""
         display_link.text = link_value if link_value else "Sin enlace"
         display_link.url = link_value if link_value else None
         display_link.tooltip = "Haz clic para abrir el enlace" if link_value else "No hay enlace disponible"
@@ -1391,16 +1384,16 @@ def main(page: ft.Page):
         timer_text.value = format_time(elapsed_time)
         
         # Actualizar el indicador de posición
-        task_position_text.value = f"Tarea {current_task_index + 1} de {len(tasks)}"
+        update_position_text()
         
         # Actualizar visibilidad de los botones de navegación
         prev_task_button.visible = current_task_index > 0
         next_task_button.visible = current_task_index < len(tasks) - 1
         
-        # Configurar el botón de pausa/reanudación para iniciar (no iniciar automáticamente)
-        timer_running = False
-        timer_paused = False
-        pause_resume_button.icon = ft.Icons.PLAY_ARROW
+        # Configurar el botón de pausa/reanudación según el estado guardado de la tarea
+        timer_running = current_task.timer.state == TimerState.RUNNING
+        timer_paused = current_task.timer.state == TimerState.PAUSED
+        pause_resume_button.icon = ft.Icons.PAUSE if timer_running else ft.Icons.PLAY_ARROW
         
         # Mostrar la pantalla de tareas y ocultar la pantalla de inicio
         welcome_container.visible = False
@@ -1409,8 +1402,10 @@ def main(page: ft.Page):
         # Actualizar la página
         page.update()
         
-        # No iniciamos la actualización del temporizador automáticamente
-        # Solo se iniciará cuando el usuario haga clic en el botón de reproducción
+        # El temporizador se sigue mostrando si la tarea quedó en ejecución al cerrar;
+        # si no, se iniciará cuando el usuario haga clic en el botón de reproducción
+        if timer_running:
+            follow_timer(current_task)
     
     # Crear botones para la pantalla de inicio
     start_button = create_button(
@@ -1550,7 +1545,7 @@ def main(page: ft.Page):
                     [
                         ft.Text("Lista de Tareas", size=18, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_700),
                         ft.Divider(),
-
+                        
                         task_list_container,
                     ],
                     spacing=10,
@@ -0,0 +1,445 @@
+"""
+Migraciones del esquema de la base de datos.
+
+La versión del archivo se guarda en PRAGMA user_version. Cada migración
+sube la versión en uno, se aplica en su propia transacción junto con el
+cambio de versión y es idempotente, así que un archivo que ya tenga parte
+del esquema (por ejemplo, creado por una versión anterior de la aplicación)
+se migra sin errores.
+
+Los cambios de esquema son rápidos y se aplican al abrir la base de datos.
+Los rellenos de datos costosos (backfills) no: se declaran en la migración
+y el hilo de backfills de Database los ejecuta por lotes en segundo plano,
+guardando su avance en app_settings para continuar donde quedaron.
+"""
+import sqlite3
+from rollups import UNDATED_STARTED_AT, roll_up_interval
+
+# Tareas que procesa cada lote de un backfill
+BACKFILL_BATCH_SIZE = 500
+
+# Segundos de pausa entre lotes para dejar pasar las escrituras de la interfaz
+BACKFILL_PAUSE = 0.05
+
+# Valor que marca un backfill como terminado en app_settings
+BACKFILL_DONE = "done"
+
+
+class Migration:
+    """Un paso del esquema: la versión a la que lleva y cómo aplicarlo"""
+    
+    def __init__(self, version, description, apply, backfill=None):
+        """
+        Args:
+            version: Valor de user_version tras aplicar la migración
+            description: Texto para los mensajes de depuración
+            apply: Función (cursor) que modifica el esquema, sin hacer commit
+            backfill: Función opcional (cursor, after_id, batch_size) que procesa
+                un lote de filas con clave (normalmente el id) mayor que after_id y
+                devuelve la última clave procesada, o None si ya no quedan filas
+        """
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.backfill = backfill
+    
+    @property
+    def backfill_key(self):
+        """Clave de app_settings donde se guarda el avance del backfill"""
+        return f"backfill.{self.version}"
+
+
+def _column_names(cursor, table):
+    return [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _table_names(cursor):
+    return [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()]
+
+
+def _create_base_tables(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        note TEXT,
+        link TEXT,
+        elapsed_time INTEGER DEFAULT 0,
+        timer_state INTEGER DEFAULT 0
+    )
+    ''')
+    
+    # Crear tabla para tareas eliminadas
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS deleted_tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        note TEXT,
+        link TEXT,
+        elapsed_time INTEGER DEFAULT 0,
+        deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def _create_app_settings(cursor):
+    # Tabla de configuración de la aplicación (clave/valor)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS app_settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''')
+
+
+def _drop_legacy_task_state(cursor):
+    # Versiones antiguas agregaron a tasks una columna task_state que ya no se
+    # usa en ningún lado: siempre vale 0 y timer_state guarda el estado real
+    if "task_state" not in _column_names(cursor, "tasks"):
+        return
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute("ALTER TABLE tasks DROP COLUMN task_state")
+    else:
+        # Sin DROP COLUMN la columna se deja: tiene valor por defecto y no estorba
+        print("SQLite no soporta DROP COLUMN, se conserva la columna task_state")
+
+
+def _index_deleted_at(cursor):
+    # Índice para recorrer el historial de eliminadas por fecha
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_deleted_tasks_deleted_at
+    ON deleted_tasks (deleted_at)
+    ''')
+
+
+def _create_time_intervals(cursor):
+    # Una fila por cada vez que un temporizador empieza a correr;
+    # ended_at se completa al pausarlo
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS time_intervals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL,
+        started_at REAL NOT NULL,
+        ended_at REAL
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_time_intervals_task_start
+    ON time_intervals (task_id, started_at)
+    ''')
+
+
+def _backfill_legacy_intervals(cursor, after_id, batch_size):
+    """
+    Convierte en intervalos el tiempo acumulado antes de que existiera time_intervals.
+    
+    Para cada tarea cuyo elapsed_time supera lo registrado en intervalos cerrados
+    se agrega un intervalo sin fecha con la diferencia: empieza en
+    UNDATED_STARTED_AT, así suma al total de la tarea pero no cae en ningún
+    día de los informes ni de time_rollups. Las tareas con un intervalo
+    abierto se saltan: su tiempo todavía está cambiando.
+    """
+    # Desde la migración 8 las eliminadas están en tasks y su tiempo ya consta
+    # en elapsed_time: no hace falta pasarlo a intervalos
+    skip_deleted = "AND t.deleted_at IS NULL" if "deleted_at" in _column_names(cursor, "tasks") else ""
+    rows = cursor.execute(f'''
+    SELECT t.id, t.elapsed_time,
+        (SELECT COALESCE(SUM(ended_at - started_at), 0) FROM time_intervals
+         WHERE task_id = t.id AND ended_at IS NOT NULL) AS logged,
+        EXISTS (SELECT 1 FROM time_intervals
+                WHERE task_id = t.id AND ended_at IS NULL) AS has_open
+    FROM tasks t
+    WHERE t.id > ? {skip_deleted}
+    ORDER BY t.id
+    LIMIT ?
+    ''', (after_id, batch_size)).fetchall()
+    if not rows:
+        return None
+    
+    intervals = []
+    for task_id, elapsed_time, logged, has_open in rows:
+        missing = (elapsed_time or 0) - logged
+        # Menos de un segundo es solo el redondeo de elapsed_time
+        if has_open or missing < 1:
+            continue
+        intervals.append((task_id, UNDATED_STARTED_AT, UNDATED_STARTED_AT + missing))
+    cursor.executemany(
+        "INSERT INTO time_intervals (task_id, started_at, ended_at) VALUES (?, ?, ?)",
+        intervals
+    )
+    if intervals:
+        print(f"Backfill de intervalos: {len(intervals)} tareas con tiempo anterior registrado")
+    return rows[-1][0] if len(rows) == batch_size else None
+
+
+def _create_search_index(cursor):
+    # Índice de texto completo de tareas activas y eliminadas. Una sola tabla
+    # para que bm25 compare todo con las mismas estadísticas; el rowid dice de
+    # dónde viene cada fila: id * 2 para tasks, id * 2 + 1 para deleted_tasks
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(
+        title, note, link,
+        tokenize = "unicode61 remove_diacritics 2",
+        prefix = '2 3 4'
+    )
+    ''')
+    # Ranking: el título pesa más que la nota, y la nota más que el enlace
+    cursor.execute("INSERT INTO task_search (task_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)')")
+    
+    for table, offset in (("tasks", 0), ("deleted_tasks", 1)):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO task_search (rowid, title, note, link)
+            VALUES (new.id * 2 + {offset}, new.title, new.note, new.link);
+        END
+        ''')
+        # Guardar el tiempo no toca el índice: solo cuando cambia el texto
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF title, note, link ON {table}
+        WHEN old.title IS NOT new.title OR old.note IS NOT new.note OR old.link IS NOT new.link
+        BEGIN
+            DELETE FROM task_search WHERE rowid = old.id * 2 + {offset};
+            INSERT INTO task_search (rowid, title, note, link)
+            VALUES (new.id * 2 + {offset}, new.title, new.note, new.link);
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table}
+        BEGIN
+            DELETE FROM task_search WHERE rowid = old.id * 2 + {offset};
+        END
+        ''')
+
+
+def _backfill_search_index(cursor, after_key, batch_size):
+    """
+    Indexa las filas que ya existían al crear task_search.
+    
+    Recorre tasks y deleted_tasks en el orden de su clave en el índice
+    (id * 2 y id * 2 + 1). INSERT OR REPLACE lee el texto actual de la fila,
+    así que no importa que un disparador ya la haya indexado.
+    """
+    rows = cursor.execute('''
+    SELECT id * 2 AS search_key, title, note, link FROM tasks
+    WHERE id > ? / 2 ORDER BY id LIMIT ?
+    ''', (after_key, batch_size)).fetchall()
+    rows += cursor.execute('''
+    SELECT id * 2 + 1 AS search_key, title, note, link FROM deleted_tasks
+    WHERE id > (? - 1) / 2 ORDER BY id LIMIT ?
+    ''', (after_key, batch_size)).fetchall()
+    rows = sorted(rows, key=lambda row: row[0])[:batch_size]
+    if not rows:
+        return None
+    cursor.executemany(
+        "INSERT OR REPLACE INTO task_search (rowid, title, note, link) VALUES (?, ?, ?, ?)",
+        [tuple(row) for row in rows]
+    )
+    return rows[-1][0] if len(rows) == batch_size else None
+
+
+def _create_time_rollups(cursor):
+    # Segundos trabajados por tarea en cada día, semana y mes (period es la
+    # fecha local en que empieza); la clave sigue el orden de las consultas
+    # de los informes: una granularidad y un rango de fechas
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS time_rollups (
+        granularity TEXT NOT NULL,
+        period TEXT NOT NULL,
+        task_id INTEGER NOT NULL,
+        seconds REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, period, task_id)
+    ) WITHOUT ROWID
+    ''')
+    # Hasta dónde se sumó cada intervalo a time_rollups
+    if "rolled_until" not in _column_names(cursor, "time_intervals"):
+        cursor.execute("ALTER TABLE time_intervals ADD COLUMN rolled_until REAL")
+
+
+def _backfill_time_rollups(cursor, after_id, batch_size):
+    """
+    Suma a time_rollups los intervalos cerrados antes de que existiera la tabla.
+    Los abiertos se suman al guardar o pausar su tarea.
+    """
+    rows = cursor.execute('''
+    SELECT id, ended_at FROM time_intervals
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+    ''', (after_id, batch_size)).fetchall()
+    if not rows:
+        return None
+    for interval_id, ended_at in rows:
+        if ended_at is not None:
+            roll_up_interval(cursor, interval_id, ended_at)
+    return rows[-1][0] if len(rows) == batch_size else None
+
+
+def _soft_delete_tasks(cursor):
+    # Las tareas eliminadas pasan a ser filas de tasks con deleted_at: eliminar
+    # y restaurar es un UPDATE que conserva el id (y con él los intervalos y
+    # los totales de tiempo de la tarea)
+    if "deleted_at" not in _column_names(cursor, "tasks"):
+        cursor.execute("ALTER TABLE tasks ADD COLUMN deleted_at TIMESTAMP")
+    # Índices parciales: uno recorre el historial por fecha, el otro las
+    # tareas activas, sin que ninguno cargue con las filas del otro grupo
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_tasks_deleted_at
+    ON tasks (deleted_at, id) WHERE deleted_at IS NOT NULL
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_tasks_active
+    ON tasks (id) WHERE deleted_at IS NULL
+    ''')
+    
+    # El índice de búsqueda se rehace con rowid = tasks.id (ya no hay dos tablas
+    # que distinguir). Se quita antes de copiar el historial y sus disparadores
+    # se crean después: indexar aquí cada fila copiada bloquearía el inicio, y
+    # de eso se encarga el backfill de esta migración, por lotes
+    cursor.execute("DROP TABLE IF EXISTS task_search")
+    for trigger in ("insert", "update", "delete"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS tasks_search_{trigger}")
+    
+    # Copiar el historial a tasks (con ids nuevos: los de deleted_tasks eran de
+    # otra secuencia) y quitar la tabla, junto con sus disparadores
+    if "deleted_tasks" in _table_names(cursor):
+        cursor.execute('''
+        INSERT INTO tasks (title, note, link, elapsed_time, timer_state, deleted_at)
+        SELECT title, note, link, elapsed_time, 0, COALESCE(deleted_at, CURRENT_TIMESTAMP)
+        FROM deleted_tasks
+        ORDER BY id
+        ''')
+        cursor.execute("DROP TABLE deleted_tasks")
+    
+    cursor.execute('''
+    CREATE VIRTUAL TABLE task_search USING fts5(
+        title, note, link,
+        tokenize = "unicode61 remove_diacritics 2",
+        prefix = '2 3 4'
+    )
+    ''')
+    cursor.execute("INSERT INTO task_search (task_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)')")
+    cursor.execute('''
+    CREATE TRIGGER tasks_search_insert AFTER INSERT ON tasks
+    BEGIN
+        INSERT INTO task_search (rowid, title, note, link)
+        VALUES (new.id, new.title, new.note, new.link);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER tasks_search_update AFTER UPDATE OF title, note, link ON tasks
+    WHEN old.title IS NOT new.title OR old.note IS NOT new.note OR old.link IS NOT new.link
+    BEGIN
+        DELETE FROM task_search WHERE rowid = old.id;
+        INSERT INTO task_search (rowid, title, note, link)
+        VALUES (new.id, new.title, new.note, new.link);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER tasks_search_delete AFTER DELETE ON tasks
+    BEGIN
+        DELETE FROM task_search WHERE rowid = old.id;
+    END
+    ''')
+    # El backfill de la migración 6 recorría deleted_tasks: lo reemplaza el de esta
+    cursor.execute(
+        "INSERT OR REPLACE INTO app_settings (key, value) VALUES (?, ?)",
+        (next(m for m in MIGRATIONS if m.version == 6).backfill_key, BACKFILL_DONE)
+    )
+
+
+
+def _backfill_search_tasks(cursor, after_id, batch_size):
+    """Indexa en task_search las tareas (activas y eliminadas) que ya existían"""
+    rows = cursor.execute('''
+    SELECT id, title, note, link FROM tasks
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+    ''', (after_id, batch_size)).fetchall()
+    if not rows:
+        return None
+    # INSERT OR REPLACE lee el texto actual: da igual si un disparador ya la indexó
+    cursor.executemany(
+        "INSERT OR REPLACE INTO task_search (rowid, title, note, link) VALUES (?, ?, ?, ?)",
+        [tuple(row) for row in rows]
+    )
+    return rows[-1][0] if len(rows) == batch_size else None
+
+
+def _add_timer_anchor(cursor):
+    # Ancla del temporizador en ejecución: instante (timestamp Unix) desde el
+    # que se cuenta su tiempo acumulado, es decir, time.time() - elapsed_time
+    # al arrancar o reanudar. NULL si el temporizador no está corriendo
+    if "started_at" not in _column_names(cursor, "tasks"):
+        cursor.execute("ALTER TABLE tasks ADD COLUMN started_at REAL")
+    # Las filas en ejecución de versiones anteriores no tienen ancla: al cargarlas
+    # siempre se detenían, así que se dejan detenidas con su último tiempo guardado
+    cursor.execute("UPDATE tasks SET timer_state = 0 WHERE timer_state = 1 AND started_at IS NULL")
+
+
+# Migraciones en orden. Nunca se editan ni se reordenan las ya publicadas:
+# cualquier cambio nuevo va en una migración nueva al final.
+MIGRATIONS = [
+    Migration(1, "tablas tasks y deleted_tasks", _create_base_tables),
+    Migration(2, "tabla app_settings", _create_app_settings),
+    Migration(3, "quitar la columna heredada task_state", _drop_legacy_task_state),
+    Migration(4, "índice del historial de eliminadas", _index_deleted_at),
+    Migration(5, "tabla time_intervals", _create_time_intervals,
+              backfill=_backfill_legacy_intervals),
+    Migration(6, "índice de búsqueda de texto completo", _create_search_index,
+              backfill=_backfill_search_index),
+    Migration(7, "totales de tiempo por período (time_rollups)", _create_time_rollups,
+              backfill=_backfill_time_rollups),
+    Migration(8, "borrado lógico con tasks.deleted_at", _soft_delete_tasks,
+              backfill=_backfill_search_tasks),
+    Migration(9, "ancla del temporizador (tasks.started_at)", _add_timer_anchor),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(connection):
+    """
+    Lleva el esquema hasta SCHEMA_VERSION.
+    
+    Cada migración pendiente se aplica en su propia transacción junto con el
+    cambio de user_version: si una falla, el archivo queda en la última versión
+    completa y se reintenta en el próximo inicio.
+    
+    Returns:
+        La versión del esquema tras migrar
+    """
+    current = get_schema_version(connection)
+    if current > SCHEMA_VERSION:
+        print(f"La base de datos tiene la versión {current}, más nueva que esta aplicación ({SCHEMA_VERSION})")
+        return current
+    
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        try:
+            cursor = connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            migration.apply(cursor)
+            cursor.execute(f"PRAGMA user_version = {migration.version}")
+            connection.commit()
+            current = migration.version
+            print(f"Migración {migration.version} aplicada: {migration.description}")
+        except sqlite3.Error as e:
+            print(f"Error en la migración {migration.version} ({migration.description}): {e}")
+            try:
+                connection.rollback()
+            except sqlite3.Error:
+                pass
+            break
+    return current
+
+
+def pending_backfills(version):
+    """Migraciones ya aplicadas (hasta version) que declaran un backfill"""
+    return [m for m in MIGRATIONS if m.backfill and m.version <= version]
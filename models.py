@@ -1,67 +1,267 @@
 import time
 from enum import Enum
 
+# Nanosegundos por segundo: el tiempo se acumula en enteros, sin redondeos
+NS_PER_SECOND = 1_000_000_000
+
 # Definir estados posibles para el temporizador
 class TimerState(Enum):
     STOPPED = 0
     RUNNING = 1
     PAUSED = 2
 
+# Relojes que usan los temporizadores (en las pruebas se cambia por uno simulado)
+class SystemClock:
+    __slots__ = ()
+    
+    def monotonic_ns(self):
+        """Reloj monotónico: mide el tiempo trabajado, no salta si se ajusta la hora"""
+        return time.monotonic_ns()
+    
+    def time(self):
+        """Reloj de pared (timestamp Unix): solo para lo que se guarda en la base de datos"""
+        return time.time()
+
+SYSTEM_CLOCK = SystemClock()
+
 # Clase para el temporizador de cada tarea
 class TaskTimer:
-    def __init__(self):
-        self.state = TimerState.STOPPED
-        self.elapsed_time = 0
+    # Campos declarados: sin __dict__ por instancia (se cargan miles de tareas)
+    __slots__ = (
+        "_state", "accumulated_ns", "run_started_ns", "start_time", "clock", "revision",
+        "saved_revision", "interval_events", "open_interval", "owner",
+    )
+    
+    def __init__(self, clock=SYSTEM_CLOCK):
+        self._state = TimerState.STOPPED
+        # Tiempo de los tramos ya cerrados, en nanosegundos
+        self.accumulated_ns = 0
+        # Reloj monotónico al empezar el tramo en curso (None si no está corriendo)
+        self.run_started_ns = None
+        # Ancla en reloj de pared del tramo en curso: timestamp Unix desde el que
+        # cuenta el temporizador. Se guarda en tasks.started_at (ver get_anchor)
+        self.start_time = None
+        self.clock = clock
+        # Contadores de cambios para saber si hay algo pendiente de guardar
+        self.revision = 0
+        self.saved_revision = 0
+        # Transiciones aún no registradas en la tabla time_intervals: ("start" | "end", instante)
+        self.interval_events = []
+        # Intervalo abierto en la base de datos: (id de la fila, instante de inicio)
+        self.open_interval = None
+        # Tarea a la que pertenece: se le avisa de cada cambio (ver Task.on_dirty)
+        self.owner = None
+    
+    @property
+    def state(self):
+        return self._state
+    
+    @state.setter
+    def state(self, value):
+        if value != self._state:
+            # Cada entrada o salida del estado RUNNING abre o cierra un intervalo de trabajo
+            if value == TimerState.RUNNING:
+                self.interval_events.append(("start", self.clock.time()))
+            elif self._state == TimerState.RUNNING:
+                self.interval_events.append(("end", self.clock.time()))
+            self._state = value
+            self.touch()
+    
+    def touch(self):
+        """Marca el temporizador como modificado desde el último guardado"""
+        self.revision += 1
+        if self.owner is not None:
+            self.owner._changed()
+        return self
+    
+    def _begin_run(self):
+        self.run_started_ns = self.clock.monotonic_ns()
+        self.start_time = self.clock.time() - self.accumulated_ns / NS_PER_SECOND
+    
+    def _end_run(self):
+        self.accumulated_ns += self.clock.monotonic_ns() - self.run_started_ns
+        self.run_started_ns = None
         self.start_time = None
-        self.pause_time = None
-    
-    def start(self):
-        if self.state == TimerState.STOPPED:
-            self.start_time = time.time()
-            self.elapsed_time = 0
-        elif self.state == TimerState.PAUSED:
-            # Reanudar desde donde se quedó
-            self.start_time = time.time() - self.elapsed_time
-        
+    
+    def start(self, keep_elapsed=False):
+        """
+        Pone el temporizador en marcha. Desde STOPPED empieza de cero, salvo con
+        keep_elapsed=True (seguir contando sobre el tiempo ya guardado de la tarea).
+        """
+        if self.state == TimerState.RUNNING:
+            return self
+        if self.state == TimerState.STOPPED and not keep_elapsed:
+            self.accumulated_ns = 0
+        self._begin_run()
         self.state = TimerState.RUNNING
         return self
     
     def pause(self):
         if self.state == TimerState.RUNNING:
-            self.pause_time = time.time()
-            self.elapsed_time = int(self.pause_time - self.start_time)
+            self._end_run()
             self.state = TimerState.PAUSED
         return self
     
     def resume(self):
         if self.state == TimerState.PAUSED:
-            self.start_time = time.time() - self.elapsed_time
+            self._begin_run()
             self.state = TimerState.RUNNING
         return self
     
     def stop(self):
+        # El tramo en curso se suma antes de detener: no se pierde al leer el tiempo después
+        if self.state == TimerState.RUNNING:
+            self._end_run()
         self.state = TimerState.STOPPED
         return self
     
+    def get_elapsed_ns(self):
+        """Tiempo acumulado exacto, en nanosegundos"""
+        if self.state == TimerState.RUNNING:
+            return self.accumulated_ns + self.clock.monotonic_ns() - self.run_started_ns
+        return self.accumulated_ns
+    
     def get_elapsed_time(self):
+        """Tiempo acumulado en segundos enteros, tal como se muestra y se guarda"""
+        return self.get_elapsed_ns() // NS_PER_SECOND
+    
+    def get_anchor(self):
+        """
+        Instante (timestamp Unix) desde el que cuenta un temporizador en ejecución,
+        o None si no está corriendo. Con el ancla guardada, el tiempo acumulado se
+        deduce en cualquier momento sin volver a escribirlo.
+        """
+        if self.state == TimerState.RUNNING:
+            return self.start_time
+        return None
+    
+    def get_monotonic_anchor(self):
+        """
+        Igual que get_anchor pero en segundos del reloj monotónico (time.monotonic),
+        que no cambia si se ajusta la hora del sistema: sirve para alinear los ticks.
+        """
         if self.state == TimerState.RUNNING:
-            current_time = time.time()
-            return int(current_time - self.start_time)
-        return self.elapsed_time
+            return (self.run_started_ns - self.accumulated_ns) / NS_PER_SECOND
+        return None
+    
+    def restore(self, state, elapsed_time, anchor=None):
+        """
+        Rehace el temporizador tal como quedó guardado, sin registrar
+        transiciones (el intervalo abierto, si lo hay, ya está en la base de datos).
+        Un estado RUNNING sin ancla no se puede reconstruir y queda en pausa.
+        """
+        if state == TimerState.RUNNING and anchor is None:
+            state = TimerState.PAUSED
+        if state == TimerState.RUNNING:
+            # Lo que pasó desde el ancla solo se puede medir con el reloj de pared
+            self.accumulated_ns = 0
+            self.run_started_ns = self.clock.monotonic_ns() - round((self.clock.time() - anchor) * NS_PER_SECOND)
+            self.start_time = anchor
+        else:
+            self.accumulated_ns = elapsed_time * NS_PER_SECOND
+            self.run_started_ns = None
+            self.start_time = None
+        self._state = state
+        return self
     
     def set_elapsed_time(self, time_value):
-        self.elapsed_time = time_value
+        # Reescribir el mismo segundo no descarta la fracción acumulada
+        if time_value == self.get_elapsed_time():
+            return self
+        self.accumulated_ns = time_value * NS_PER_SECOND
         if self.state == TimerState.RUNNING:
-            self.start_time = time.time() - time_value
+            self._begin_run()
+        self.touch()
         return self
 
 # Clase para las tareas
 class Task:
+    __slots__ = (
+        "id", "deleted_at", "_title", "_note", "_link", "_details_loader", "timer",
+        "revision", "saved_revision", "on_dirty",
+    )
+    
     def __init__(self, title, note, link=None):
-        self.title = title
-        self.note = note
-        self.link = link
+        self.id = None
+        # Fecha de eliminación (texto UTC de SQLite) de las tareas del historial
+        self.deleted_at = None
+        self._title = title
+        self._note = note
+        self._link = link
+        # Función (task) -> (note, link) de las tareas cargadas solo como resumen:
+        # la nota y el enlace se leen de la base de datos cuando se piden
+        self._details_loader = None
         self.timer = TaskTimer()
+        # Una tarea nueva siempre está pendiente de guardar
+        self.revision = 1
+        self.saved_revision = 0
+        # Función (task) llamada cada vez que la tarea pasa a tener cambios,
+        # por ejemplo SaveScheduler.mark_dirty
+        self.on_dirty = None
+        self.timer.owner = self
+    
+    @property
+    def title(self):
+        return self._title
+    
+    @title.setter
+    def title(self, value):
+        if value != self._title:
+            self._title = value
+            self.revision += 1
+            self._changed()
+    
+    @property
+    def note(self):
+        if self._details_loader is not None:
+            return self._details_loader(self)[0]
+        return self._note
+    
+    @note.setter
+    def note(self, value):
+        self.load_details()
+        if value != self._note:
+            self._note = value
+            self.revision += 1
+            self._changed()
+    
+    @property
+    def link(self):
+        if self._details_loader is not None:
+            return self._details_loader(self)[1]
+        return self._link
+    
+    @link.setter
+    def link(self, value):
+        self.load_details()
+        if value != self._link:
+            self._link = value
+            self.revision += 1
+            self._changed()
+    
+    def _changed(self):
+        if self.on_dirty is not None:
+            self.on_dirty(self)
+    
+    def set_details_loader(self, loader):
+        """
+        Deja la nota y el enlace sin cargar: se piden a loader(task) cada vez
+        que se leen, así la tarea no guarda en memoria textos que quizá nunca se muestren.
+        """
+        self._note = None
+        self._link = None
+        self._details_loader = loader
+    
+    def has_details(self):
+        """Indica si la nota y el enlace están en memoria (y por tanto hay que guardarlos)"""
+        return self._details_loader is None
+    
+    def load_details(self):
+        """Trae la nota y el enlace a memoria, antes de modificarlos"""
+        if self._details_loader is not None:
+            self._note, self._link = self._details_loader(self)
+            self._details_loader = None
+        return self
     
     @property
     def elapsed_time(self):
@@ -70,6 +270,32 @@ class Task:
     @elapsed_time.setter
     def elapsed_time(self, value):
         self.timer.set_elapsed_time(value)
+    
+    def is_dirty(self):
+        """
+        Indica si la tarea tiene cambios sin guardar.
+        Que un temporizador siga corriendo no es un cambio: su tiempo se
+        deduce del ancla guardada al arrancar o reanudar.
+        """
+        return (
+            self.revision != self.saved_revision
+            or self.timer.revision != self.timer.saved_revision
+        )
+    
+    def snapshot_revision(self):
+        """Devuelve las revisiones actuales para confirmarlas tras guardar"""
+        return (self.revision, self.timer.revision)
+    
+    def mark_clean(self, revisions=None):
+        """
+        Marca la tarea como guardada.
+        Si se pasan las revisiones tomadas antes de guardar, solo se confirman
+        esas, de modo que un cambio hecho durante el guardado sigue pendiente.
+        """
+        task_revision, timer_revision = revisions or self.snapshot_revision()
+        self.saved_revision = task_revision
+        self.timer.saved_revision = timer_revision
+        return self
 
 # Fábrica de tareas (patrón Factory)
 class TaskFactory:
@@ -0,0 +1,165 @@
+"""
+Guardado diferido de las tareas modificadas.
+
+Cada cambio en una tarea (título, nota, enlace o temporizador) la marca como
+pendiente con mark_dirty. Las tareas pendientes se guardan juntas cuando
+pasa QUIET_PERIOD sin cambios nuevos o, si siguen llegando, como mucho
+MAX_DELAY después del primero, lo que ocurra antes. Así una ráfaga de
+ediciones se escribe en una sola transacción y nada espera más de MAX_DELAY.
+Sin cambios pendientes el hilo queda dormido: no se despierta ni escribe.
+"""
+import contextlib
+import threading
+import time
+
+# Segundos sin cambios tras los que se guarda
+QUIET_PERIOD = 2.0
+
+# Espera máxima desde el primer cambio pendiente, aunque sigan llegando otros
+MAX_DELAY = 10.0
+
+
+class SaveScheduler:
+    """Agrupa los cambios de las tareas y los guarda con Database.save_dirty_tasks_async"""
+    
+    def __init__(self, db, quiet_period=QUIET_PERIOD, max_delay=MAX_DELAY):
+        """
+        Args:
+            db: Database donde guardar
+            quiet_period: Segundos sin cambios tras los que se guarda
+            max_delay: Espera máxima desde el primer cambio pendiente
+        """
+        self.db = db
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        # Tareas pendientes, una vez cada una (por identidad: las nuevas aún no tienen id)
+        self._pending = {}
+        self._first_change = None
+        self._last_change = None
+        self._condition = threading.Condition()
+        self._closed = False
+        # Contadores (solo lectura desde fuera)
+        self.changes = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self._thread = threading.Thread(target=self._run, name="focus-title-saver", daemon=True)
+        self._thread.start()
+    
+    def track(self, tasks):
+        """Hace que cada cambio de estas tareas se guarde a través del programador"""
+        for task in tasks:
+            task.on_dirty = self.mark_dirty
+        return self
+    
+    def mark_dirty(self, task):
+        """Anota una tarea con cambios; se guardará en el próximo vaciado"""
+        with self._condition:
+            if self._closed:
+                return
+            now = time.monotonic()
+            self._pending[id(task)] = task
+            self.changes += 1
+            if self._first_change is None:
+                self._first_change = now
+                self._condition.notify()
+            self._last_change = now
+    
+    def _deadline(self):
+        return min(self._last_change + self.quiet_period, self._first_change + self.max_delay)
+    
+    def _take_pending(self):
+        tasks = list(self._pending.values())
+        self._pending.clear()
+        self._first_change = None
+        self._last_change = None
+        return tasks
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                # Sin cambios pendientes se espera sin plazo
+                while not self._closed and self._first_change is None:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                delay = self._deadline() - time.monotonic()
+                if delay > 0:
+                    # Un cambio nuevo durante la espera corre el plazo: volver a calcularlo
+                    self._condition.wait(delay)
+                    continue
+                tasks = self._take_pending()
+            self._save(tasks)
+    
+    def _save(self, tasks, background=True):
+        """
+        Encola el guardado de las tareas y actualiza los contadores al terminar.
+        Con background=True (el plazo venció) las lecturas de la interfaz no lo
+        esperan; un vaciado pedido con flush sí se ve en la siguiente lectura.
+        """
+        try:
+            with self.db.background_writes() if background else contextlib.nullcontext():
+                future = self.db.save_dirty_tasks_async(tasks)
+        except Exception as e:
+            print(f"Error al programar el guardado de {len(tasks)} tareas: {e}")
+            return None
+        
+        def count_rows(done):
+            try:
+                written = done.result()
+            except Exception as e:
+                print(f"Error al guardar las tareas pendientes: {e}")
+                return
+            with self._condition:
+                self.flushes += 1
+                self.rows_written += written
+        future.add_done_callback(count_rows)
+        return future
+    
+    def _save_now(self, tasks, background=True):
+        if not tasks:
+            return 0
+        future = self._save(tasks, background)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+    
+    def flush(self, wait=True):
+        """
+        Guarda ya lo pendiente, sin esperar el plazo.
+        
+        Args:
+            wait: Si es False solo se encola el guardado (para llamarlo desde la interfaz)
+        
+        Returns:
+            Número de filas escritas (0 si no había nada pendiente), o None si hubo
+            un error. Con wait=False, el Future del guardado o None si no había nada
+        """
+        with self._condition:
+            tasks = self._take_pending()
+        if not wait:
+            return self._save(tasks, background=False) if tasks else None
+        return self._save_now(tasks, background=False)
+    
+    def stats(self):
+        """Contadores: cambios recibidos, vaciados hechos, filas escritas y tareas pendientes"""
+        with self._condition:
+            return {
+                "changes": self.changes,
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "pending": len(self._pending),
+            }
+    
+    def close(self):
+        """Detiene el hilo y guarda lo pendiente. Llamar antes de Database.close"""
+        with self._condition:
+            if self._closed:
+                return 0
+            self._closed = True
+            tasks = self._take_pending()
+            self._condition.notify()
+        self._thread.join()
+        return self._save_now(tasks)
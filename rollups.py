@@ -0,0 +1,82 @@
+"""
+Totales de tiempo por tarea y período (tabla time_rollups).
+
+Cada intervalo de time_intervals se reparte entre los días locales que cubre
+(se parte en la medianoche) y cada parte se suma a su día, a su semana (de
+lunes a domingo) y a su mes, así un informe es solo una lectura por rango
+de la clave, sin agrupar. El avance se guarda en time_intervals.rolled_until:
+un intervalo abierto se va sumando cada vez que se guarda su tarea, y al
+cerrarse se suma solo lo que falte, así que ningún tramo se cuenta dos veces.
+"""
+import datetime
+
+# Granularidades que se mantienen en time_rollups
+GRANULARITIES = ("day", "week", "month")
+
+# Inicio de los intervalos sin fecha: el tiempo acumulado antes de que
+# existiera time_intervals (ver migrations._backfill_legacy_intervals). Cuenta
+# para el total de la tarea, pero no se sabe en qué día se trabajó, así que
+# no se suma a ningún período
+UNDATED_STARTED_AT = 0.0
+
+_ADD_SECONDS_SQL = '''
+INSERT INTO time_rollups (granularity, period, task_id, seconds) VALUES (?, ?, ?, ?)
+ON CONFLICT (granularity, period, task_id) DO UPDATE SET seconds = seconds + excluded.seconds
+'''
+
+
+def period_start(day, granularity):
+    """Primer día del período que contiene a `day` (un datetime.date)"""
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Granularidad desconocida: {granularity!r}")
+
+
+def split_by_day(started_at, ended_at):
+    """
+    Reparte un tramo (timestamps Unix) entre los días locales que cubre.
+    
+    Returns:
+        Lista de (datetime.date, segundos)
+    """
+    parts = []
+    while started_at < ended_at:
+        day = datetime.date.fromtimestamp(started_at)
+        next_midnight = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time()).timestamp()
+        part_end = min(ended_at, next_midnight)
+        parts.append((day, part_end - started_at))
+        started_at = part_end
+    return parts
+
+
+def roll_up_interval(cursor, interval_id, until):
+    """
+    Suma a time_rollups lo que un intervalo lleva trabajado desde la última vez
+    hasta `until`, sin hacer commit.
+    
+    Returns:
+        Segundos agregados
+    """
+    row = cursor.execute(
+        "SELECT task_id, started_at, rolled_until FROM time_intervals WHERE id = ?",
+        (interval_id,)
+    ).fetchone()
+    if row is None:
+        return 0.0
+    task_id, started_at, rolled_until = row[0], row[1], row[2]
+    if started_at <= UNDATED_STARTED_AT:
+        return 0.0
+    since = started_at if rolled_until is None else max(started_at, rolled_until)
+    if until <= since:
+        return 0.0
+    cursor.executemany(_ADD_SECONDS_SQL, [
+        (granularity, period_start(day, granularity).isoformat(), task_id, seconds)
+        for day, seconds in split_by_day(since, until)
+        for granularity in GRANULARITIES
+    ])
+    cursor.execute("UPDATE time_intervals SET rolled_until = ? WHERE id = ?", (until, interval_id))
+    return until - since
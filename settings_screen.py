@@ -1,12 +1,20 @@
+import threading
 import flet as ft
 from utils import format_time
+from ui_components import create_task_details, create_time_report_view
+
+# Segundos sin escribir tras los que se busca
+SEARCH_DEBOUNCE = 0.3
 
 def create_settings_screen(page, tasks, current_task_index, timer_running, timer_paused,
-                          on_edit_task, on_delete_task, on_close, deleted_tasks=None, on_restore_task=None, on_clear_deleted=None, on_export_csv=None, on_delete_selected=None):
+                          on_edit_task, on_delete_task, on_close, deleted_tasks=None, on_restore_task=None, on_clear_deleted=None, on_export_csv=None, on_delete_selected=None,
+                          storage_profile=None, on_storage_profile_change=None, on_load_more_deleted=None,
+                          on_restore_selected=None, on_import_csv=None, job_status=None, export_formats=None,
+                          on_search=None, on_time_report=None):
     # Diccionario para almacenar el estado de edición de las tareas
     editing_tasks = {}
     
-    # Diccionario para almacenar el estado de selección de tareas eliminadas
+    # Diccionario para almacenar el estado de selección de tareas eliminadas (por id de la tarea)
     selected_deleted_tasks = {}
     
     # Función para alternar el modo de edición
@@ -117,30 +125,24 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
         visible=False,  # Inicialmente oculto
     )
     
-    # Crear el botón de exportar a CSV con función personalizada
+    # Selector del formato de exportación: lista de (nombre, etiqueta) disponibles
+    export_format_dropdown = ft.Dropdown(
+        label="Formato",
+        value="csv",
+        options=[ft.dropdown.Option(name, label) for name, label in (export_formats or [("csv", "CSV")])],
+        width=220,
+        visible=bool(export_formats) and len(export_formats) > 1,
+    )
+    
+    # Crear el botón de exportar (la exportación corre en segundo plano
+    # y su progreso se muestra en job_status)
     def on_export_csv_click(e):
         if on_export_csv:
-            # Llamar a la función original de exportación
-            on_export_csv(e)
-            
-            # Mostrar el mensaje de éxito
-            # Obtener la ruta del archivo (usando la fecha actual como aproximación)
-            import datetime
-            import os
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"focus_title_tareas_{timestamp}.csv"
-            downloads_dir = os.path.join(os.path.expanduser("~"), "Downloads")
-            filepath = os.path.join(downloads_dir, filename)
-            
-            # Actualizar y mostrar el contenedor de información
-            download_path_text.value = f"Archivo CSV guardado en: {filepath}"
-            download_path_text.visible = True
-            download_info_container.visible = True
-            page.update()
+            on_export_csv(e, export_format_dropdown.value)
     
     export_csv_button = ft.Container(
         content=ft.ElevatedButton(
-            text="Exportar a CSV",
+            text="Exportar",
             icon=ft.Icons.DOWNLOAD,
             on_click=on_export_csv_click,
             style=ft.ButtonStyle(
@@ -153,6 +155,23 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
         margin=ft.margin.only(bottom=10),
     )
     
+    # Crear el botón de importar desde CSV
+    import_csv_button = ft.Container(
+        content=ft.ElevatedButton(
+            text="Importar CSV",
+            icon=ft.Icons.UPLOAD_FILE,
+            on_click=on_import_csv,
+            style=ft.ButtonStyle(
+                color=ft.Colors.WHITE,
+                bgcolor=ft.Colors.BLUE_700,
+                padding=15,
+            ),
+        ),
+        alignment=ft.alignment.center,
+        margin=ft.margin.only(bottom=10),
+        visible=on_import_csv is not None,
+    )
+    
     # Crear la lista de tareas
     task_list = ft.ListView(
         spacing=10,
@@ -209,7 +228,7 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
                 )
                 
                 link_field = ft.TextField(
-                    value=task.link if hasattr(task, 'link') and task.link else "",
+                    value=task.link if task.link else "",
                     label="Enlace",
                     border_radius=10,
                     expand=True,
@@ -258,19 +277,8 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
                         ft.Text(f"Tiempo: {time_str}", color=ft.Colors.BLUE_700),
                     ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                     ft.Text(f"Título: {task.title}", style=ft.TextStyle(size=16)),
-                    ft.Text(f"Nota: {task.note if task.note else 'N/A'}", style=ft.TextStyle(size=14, color=ft.Colors.GREY_500)),
-                    ft.Row([
-                        ft.Text("Enlace: ", style=ft.TextStyle(size=14, color=ft.Colors.GREY_700)),
-                        ft.TextButton(
-                            text=task.link if hasattr(task, 'link') and task.link else "N/A",
-                            url=task.link if hasattr(task, 'link') and task.link else None,
-                            tooltip="Haz clic para abrir el enlace" if hasattr(task, 'link') and task.link else "No hay enlace disponible",
-                            style=ft.ButtonStyle(
-                                color=ft.Colors.BLUE_700 if hasattr(task, 'link') and task.link else ft.Colors.GREY_500,
-                            ),
-                            disabled=not (hasattr(task, 'link') and task.link),
-                        ),
-                    ]),
+                    # La nota y el enlace se leen al desplegarlos, no al armar la lista
+                    create_task_details(page, task),
                     ft.Row([
                         ft.ElevatedButton(
                             text="Editar",
@@ -343,7 +351,7 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
             
             # Formatear la fecha de eliminación si está disponible y convertirla de UTC a hora local
             deleted_date = 'Fecha desconocida'
-            if hasattr(task, 'deleted_at') and task.deleted_at:
+            if task.deleted_at:
                 try:
                     import datetime
                     # Parsear la fecha de SQLite (formato ISO)
@@ -358,14 +366,14 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
             
             # Crear checkbox para seleccionar la tarea eliminada
             task_checkbox = ft.Checkbox(
-                value=selected_deleted_tasks.get(i, False),
-                on_change=lambda e, idx=i: toggle_deleted_task_selection(idx, e.control.value)
+                value=selected_deleted_tasks.get(task.id, False),
+                on_change=lambda e, task_id=task.id: toggle_deleted_task_selection(task_id, e.control.value)
             )
             
             # Función para cambiar el estado de selección de una tarea eliminada
-            def toggle_deleted_task_selection(task_idx, is_selected):
-                selected_deleted_tasks[task_idx] = is_selected
-                # Actualizar el botón de eliminar seleccionadas
+            def toggle_deleted_task_selection(task_id, is_selected):
+                selected_deleted_tasks[task_id] = is_selected
+                # Actualizar los botones de las tareas seleccionadas
                 update_delete_selected_button()
                 page.update()
             
@@ -378,25 +386,14 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
                         ft.Text(f"Tiempo: {time_str}", color=ft.Colors.BLUE_700),
                     ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                     ft.Text(f"Título: {task.title}", style=ft.TextStyle(size=16)),
-                    ft.Text(f"Nota: {task.note if task.note else 'N/A'}", style=ft.TextStyle(size=14, color=ft.Colors.GREY_500)),
-                    ft.Row([
-                        ft.Text("Enlace: ", style=ft.TextStyle(size=14, color=ft.Colors.GREY_700)),
-                        ft.TextButton(
-                            text=task.link if hasattr(task, 'link') and task.link else "N/A",
-                            url=task.link if hasattr(task, 'link') and task.link else None,
-                            tooltip="Haz clic para abrir el enlace" if hasattr(task, 'link') and task.link else "No hay enlace disponible",
-                            style=ft.ButtonStyle(
-                                color=ft.Colors.BLUE_700 if hasattr(task, 'link') and task.link else ft.Colors.GREY_500,
-                            ),
-                            disabled=not (hasattr(task, 'link') and task.link),
-                        ),
-                    ]),
+                    # La nota y el enlace se leen al desplegarlos, no al armar la lista
+                    create_task_details(page, task),
                     ft.Text(f"Eliminada: {deleted_date}", style=ft.TextStyle(size=12, color=ft.Colors.GREY_700)),
                     ft.Row([
                         ft.ElevatedButton(
                             text="Restaurar",
                             icon=ft.Icons.RESTORE,
-                            on_click=lambda e, idx=i: on_restore_task(idx) if on_restore_task else None,
+                            on_click=lambda e, task_id=task.id: on_restore_task(task_id) if on_restore_task else None,
                             style=ft.ButtonStyle(
                                 color=ft.Colors.WHITE,
                                 bgcolor=ft.Colors.GREEN_700,
@@ -419,6 +416,19 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
             
             deleted_task_list.controls.append(deleted_task_item)
         
+        # Botón para cargar la siguiente página del historial
+        if on_load_more_deleted:
+            deleted_task_list.controls.append(
+                ft.Container(
+                    content=ft.TextButton(
+                        text="Cargar más",
+                        icon=ft.Icons.EXPAND_MORE,
+                        on_click=on_load_more_deleted,
+                    ),
+                    alignment=ft.alignment.center,
+                )
+            )
+        
         # Crear el contenedor para la lista de tareas eliminadas
         deleted_task_list_container = ft.Container(
             content=deleted_task_list,
@@ -445,11 +455,29 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
             margin=ft.margin.only(top=10, right=10),
         )
         
-        # Función para actualizar el estado del botón de eliminar seleccionadas
+        # Crear el botón para restaurar las tareas seleccionadas
+        restore_selected_button = ft.Container(
+            content=ft.ElevatedButton(
+                text="Restaurar seleccionadas",
+                icon=ft.Icons.RESTORE,
+                on_click=lambda e: on_restore_selected(selected_deleted_tasks) if on_restore_selected else None,
+                style=ft.ButtonStyle(
+                    color=ft.Colors.WHITE,
+                    bgcolor=ft.Colors.GREEN_700,
+                    padding=15,
+                ),
+                disabled=True,  # Inicialmente deshabilitado hasta que se seleccione alguna tarea
+            ),
+            alignment=ft.alignment.center_right,
+            margin=ft.margin.only(top=10),
+        )
+        
+        # Función para actualizar el estado de los botones de las tareas seleccionadas
         def update_delete_selected_button():
             # Verificar si hay alguna tarea seleccionada
             has_selected = any(selected_deleted_tasks.values())
             delete_selected_button.content.disabled = not has_selected
+            restore_selected_button.content.disabled = not has_selected
         
         # Crear el botón para limpiar todas las tareas eliminadas
         clear_button = ft.Container(
@@ -469,7 +497,7 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
         
         # Crear un Row para contener ambos botones
         buttons_row = ft.Row(
-            [clear_button, delete_selected_button],
+            [clear_button, ft.Row([restore_selected_button, delete_selected_button])],
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
         )
         
@@ -487,6 +515,70 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
             buttons_row,
         ])
     
+    # Búsqueda de texto completo en tareas activas y eliminadas
+    search_results = ft.Column(spacing=5)
+    
+    # Última búsqueda pedida y temporizador de la que está esperando
+    search_state = {"query": "", "timer": None}
+    
+    def schedule_search(query):
+        # Cada tecla reinicia la espera; la búsqueda corre fuera del hilo de la interfaz
+        search_state["query"] = query
+        if search_state["timer"] is not None:
+            search_state["timer"].cancel()
+        timer = threading.Timer(SEARCH_DEBOUNCE, run_search, args=(query,))
+        timer.daemon = True
+        search_state["timer"] = timer
+        timer.start()
+    
+    def run_search(query):
+        results = on_search(query) if query.strip() else []
+        page.run_task(show_search_results, query, results)
+    
+    async def show_search_results(query, results):
+        # Una respuesta que llega después de otra tecla ya no sirve
+        if query != search_state["query"]:
+            return
+        search_results.controls.clear()
+        if query.strip() and not results:
+            search_results.controls.append(ft.Text("Sin resultados", color=ft.Colors.GREY_500))
+        for result in results:
+            if result.deleted:
+                action = ft.TextButton(
+                    text="Restaurar",
+                    icon=ft.Icons.RESTORE,
+                    on_click=lambda e, task_id=result.task_id: on_restore_task(task_id) if on_restore_task else None,
+                )
+            else:
+                # Índice de la tarea en la lista para reutilizar el botón de editar
+                task_index = next((i for i, task in enumerate(tasks) if task.id == result.task_id), None)
+                action = ft.TextButton(
+                    text="Editar",
+                    icon=ft.Icons.EDIT,
+                    on_click=lambda e, idx=task_index: on_edit_task(idx),
+                    disabled=task_index is None,
+                )
+            search_results.controls.append(
+                ft.Row([
+                    ft.Column([
+                        ft.Text(result.title, weight=ft.FontWeight.BOLD),
+                        ft.Text(result.note_snippet, size=12, color=ft.Colors.GREY_500, visible=bool(result.note_snippet)),
+                    ], spacing=2, expand=True),
+                    ft.Text("Eliminada" if result.deleted else "Activa",
+                            color=ft.Colors.RED_400 if result.deleted else ft.Colors.GREEN_700),
+                    action,
+                ], vertical_alignment=ft.CrossAxisAlignment.CENTER)
+            )
+        page.update()
+    
+    search_field = ft.TextField(
+        label="Buscar tareas",
+        hint_text="Título, nota o enlace",
+        helper_text="Primero las coincidencias en el título; si hay muchas, entre las más recientes",
+        prefix_icon=ft.Icons.SEARCH,
+        on_change=lambda e: schedule_search(e.control.value),
+    )
+    
     # Columna principal con todas las secciones
     main_column = [
         header,
@@ -499,11 +591,22 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
                     weight=ft.FontWeight.BOLD,
                     color=ft.Colors.BLUE_700,
                 ),
-                export_csv_button,
+                ft.Row([import_csv_button, export_format_dropdown, export_csv_button]),
             ],
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
             vertical_alignment=ft.CrossAxisAlignment.CENTER,
         ),
+    ]
+    
+    # Agregar el estado de la importación en curso (lo actualiza main)
+    if job_status:
+        main_column.append(job_status)
+    
+    # Agregar la búsqueda si hay dónde buscar
+    if on_search:
+        main_column += [search_field, search_results]
+    
+    main_column += [
         ft.Divider(),
         task_list_container,
     ]
@@ -512,6 +615,49 @@ def create_settings_screen(page, tasks, current_task_index, timer_running, timer
     if deleted_tasks_section:
         main_column.append(deleted_tasks_section)
     
+    # Agregar el informe de tiempo (lee solo los totales por día)
+    if on_time_report:
+        main_column.append(
+            ft.Column([
+                ft.Container(height=20),  # Espaciador
+                ft.Text(
+                    "Informe de tiempo",
+                    size=18,
+                    weight=ft.FontWeight.BOLD,
+                    color=ft.Colors.BLUE_700,
+                ),
+                ft.Divider(),
+                create_time_report_view(page, on_time_report),
+            ])
+        )
+    
+    # Agregar el selector del perfil de almacenamiento
+    if on_storage_profile_change:
+        storage_profile_dropdown = ft.Dropdown(
+            label="Perfil de almacenamiento",
+            value=storage_profile,
+            options=[
+                ft.dropdown.Option("safe", "Seguro (sincroniza cada cambio)"),
+                ft.dropdown.Option("balanced", "Equilibrado (recomendado)"),
+                ft.dropdown.Option("fast", "Rápido (sin sincronizar con el disco)"),
+            ],
+            on_change=lambda e: on_storage_profile_change(e.control.value),
+            width=350,
+        )
+        main_column.append(
+            ft.Column([
+                ft.Container(height=20),  # Espaciador
+                ft.Text(
+                    "Almacenamiento",
+                    size=18,
+                    weight=ft.FontWeight.BOLD,
+                    color=ft.Colors.BLUE_700,
+                ),
+                ft.Divider(),
+                storage_profile_dropdown,
+            ])
+        )
+    
     # Agregar el botón de cerrar
     main_column.append(
         ft.Container(
@@ -0,0 +1,451 @@
+"""
+Pruebas de Database sobre un archivo temporal.
+
+Uso:
+    python -m unittest test_database
+"""
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from database import Database
+from importer import import_csv
+from migrations import run_migrations
+from persistence import SaveScheduler
+from rollups import roll_up_interval
+from models import TaskFactory
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Abre una base de datos nueva en un directorio temporal para cada prueba"""
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self._tmp_dir.name, "test.db"))
+    
+    def tearDown(self):
+        self.db.close()
+        self._tmp_dir.cleanup()
+    
+    def rows(self, sql, params=()):
+        with self.db.pool.connection() as connection:
+            return [tuple(row) for row in connection.execute(sql, params).fetchall()]
+
+
+def _fail(cursor):
+    raise RuntimeError("fallo")
+
+
+class RollbackIdTest(DatabaseTestCase):
+    """Una inserción que se deshace no deja a la tarea con el id de una fila inexistente"""
+    
+    def test_failed_operation_clears_id(self):
+        task = TaskFactory.create_task("A", "")
+        
+        def insert_then_fail(cursor):
+            self.db._upsert_task(cursor, task)
+            raise RuntimeError("fallo")
+        
+        with self.assertRaises(RuntimeError):
+            self.db.submit_write(insert_then_fail).result()
+        self.assertIsNone(task.id)
+    
+    def test_failed_transaction_clears_ids(self):
+        first = TaskFactory.create_task("A", "")
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.save_task_async(first)
+                self.db.submit_write(_fail)
+        self.assertIsNone(first.id)
+        
+        # La siguiente inserción reutiliza el id deshecho; volver a guardar la
+        # primera tarea crea su propia fila en lugar de pisar la otra
+        second = TaskFactory.create_task("B", "")
+        self.db.save_task(second)
+        self.db.save_task(first)
+        self.assertNotEqual(first.id, second.id)
+        self.assertEqual(self.rows("SELECT id, title FROM tasks ORDER BY id"),
+                         [(second.id, "B"), (first.id, "A")])
+    
+    def test_failed_insert_many_clears_ids(self):
+        tasks = [TaskFactory.create_task(f"T{i}", "") for i in range(3)]
+        
+        def insert_then_fail(cursor):
+            self.db._op_insert_many(cursor, tasks)
+            raise RuntimeError("fallo")
+        
+        with self.assertRaises(RuntimeError):
+            self.db.submit_write(insert_then_fail).result()
+        self.assertEqual([task.id for task in tasks], [None, None, None])
+        self.assertEqual(self.rows("SELECT COUNT(*) FROM tasks"), [(0,)])
+
+
+
+class IntervalEventsTest(DatabaseTestCase):
+    """Cada transición del temporizador se registra una sola vez en time_intervals"""
+    
+    def intervals(self, task):
+        return self.rows("SELECT started_at, ended_at IS NOT NULL FROM time_intervals WHERE task_id = ?",
+                         (task.id,))
+    
+    def test_two_saves_in_one_batch_write_one_interval(self):
+        task = TaskFactory.create_task("A", "")
+        self.db.save_task(task)
+        task.timer.start()
+        task.timer.pause()
+        
+        # Retener al escritor para que los dos guardados caigan en el mismo lote
+        release = threading.Event()
+        self.db.submit_write(lambda cursor: release.wait(5))
+        futures = [self.db.save_task_async(task), self.db.save_task_async(task)]
+        release.set()
+        for future in futures:
+            future.result()
+        
+        self.assertEqual(len(self.intervals(task)), 1)
+        self.assertEqual(task.timer.interval_events, [])
+    
+    def test_rolled_back_events_are_written_later(self):
+        task = TaskFactory.create_task("A", "")
+        self.db.save_task(task)
+        task.timer.start()
+        task.timer.pause()
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.save_task_async(task)
+                self.db.submit_write(_fail)
+        self.assertEqual(self.intervals(task), [])
+        self.assertEqual([kind for kind, _ in task.timer.interval_events], ["start", "end"])
+        
+        self.db.save_task(task)
+        self.assertEqual([closed for _, closed in self.intervals(task)], [1])
+
+
+
+class TransactionTest(DatabaseTestCase):
+    """db.transaction(): todo o nada, con un solo commit (como al eliminar una tarea desde la interfaz)"""
+    
+    def setUp(self):
+        super().setUp()
+        self.task = TaskFactory.create_task("Original", "nota")
+        self.db.save_task(self.task)
+        self.task.title = "Editada"
+    
+    def task_row(self):
+        return self.rows("SELECT title, deleted_at IS NOT NULL FROM tasks WHERE id = ?", (self.task.id,))
+    
+    def test_commit_applies_all_writes(self):
+        with self.db.transaction():
+            saved = self.db.save_task_async(self.task)
+            deleted = self.db.delete_task_async(self.task)
+        self.assertIs(saved.result(), self.task)
+        self.assertTrue(deleted.result())
+        self.assertEqual(self.task_row(), [("Editada", 1)])
+        self.assertFalse(self.task.is_dirty())
+    
+    def test_commit_without_waiting(self):
+        with self.db.transaction(wait=False):
+            self.db.save_task_async(self.task)
+            deleted = self.db.delete_task_async(self.task)
+        self.assertTrue(deleted.result(timeout=5))
+        self.assertEqual(self.task_row(), [("Editada", 1)])
+    
+    def test_exception_in_block_writes_nothing(self):
+        with self.assertRaises(ValueError):
+            with self.db.transaction():
+                saved = self.db.save_task_async(self.task)
+                raise ValueError("cancelado")
+        with self.assertRaises(RuntimeError):
+            saved.result()
+        self.assertEqual(self.task_row(), [("Original", 0)])
+        self.assertTrue(self.task.is_dirty())
+    
+    def test_failed_write_rolls_back_the_unit(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                saved = self.db.save_task_async(self.task)
+                self.db.delete_task_async(self.task)
+                self.db.submit_write(_fail)
+        with self.assertRaises(RuntimeError):
+            saved.result()
+        self.assertEqual(self.task_row(), [("Original", 0)])
+        self.assertTrue(self.task.is_dirty())
+    
+    def test_failed_nested_block_keeps_outer_writes(self):
+        with self.db.transaction():
+            self.db.save_task_async(self.task)
+            with self.assertRaises(ValueError):
+                with self.db.transaction():
+                    deleted = self.db.delete_task_async(self.task)
+                    raise ValueError("cancelado")
+        with self.assertRaises(RuntimeError):
+            deleted.result()
+        self.assertEqual(self.task_row(), [("Editada", 0)])
+    
+    def test_result_inside_block_raises(self):
+        with self.db.transaction():
+            future = self.db.save_task_async(self.task)
+            with self.assertRaises(RuntimeError):
+                future.result()
+
+
+
+class ReadAfterWriteTest(DatabaseTestCase):
+    """Una lectura ve las escrituras ya encoladas, aunque las haya enviado otro hilo"""
+    
+    def test_read_from_other_thread_sees_queued_write(self):
+        # Retener al escritor hasta después de empezar la lectura
+        release = threading.Event()
+        self.db.submit_write(lambda cursor: release.wait(5))
+        self.db.save_task_async(TaskFactory.create_task("Informe", ""))
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        
+        results = []
+        reader = threading.Thread(target=lambda: results.extend(self.db.search("informe")))
+        reader.start()
+        reader.join(5)
+        timer.join()
+        
+        self.assertEqual([result.title for result in results], ["Informe"])
+    
+    def test_background_writes_do_not_delay_reads(self):
+        self.db.save_task(TaskFactory.create_task("Informe", ""))
+        release = threading.Event()
+        with self.db.background_writes():
+            held = self.db.submit_write(lambda cursor: release.wait(5))
+        try:
+            started = time.monotonic()
+            results = self.db.search("informe")
+            self.assertLess(time.monotonic() - started, 1.0)
+            self.assertEqual([result.title for result in results], ["Informe"])
+        finally:
+            release.set()
+            held.result()
+
+
+
+class BulkOperationsTest(DatabaseTestCase):
+    """insert_many, update_many, delete_many y restore_many: una transacción y un resultado por tarea"""
+    
+    def titles(self, where="1"):
+        return self.rows(f"SELECT id, title FROM tasks WHERE {where} ORDER BY id")
+    
+    def test_insert_many_assigns_ids(self):
+        existing = TaskFactory.create_task("Existente", "")
+        self.db.save_task(existing)
+        new_tasks = [TaskFactory.create_task(f"T{i}", "") for i in range(3)]
+        
+        ids = self.db.insert_many([existing] + new_tasks)
+        
+        self.assertEqual(ids, [None] + [task.id for task in new_tasks])
+        self.assertEqual(len(set(ids[1:])), 3)
+        self.assertEqual(self.titles(), [(existing.id, "Existente")] + [(task.id, task.title) for task in new_tasks])
+        self.assertFalse(any(task.is_dirty() for task in new_tasks))
+    
+    def test_update_many_reports_each_task(self):
+        tasks = [TaskFactory.create_task(f"T{i}", "") for i in range(3)]
+        self.db.insert_many(tasks)
+        self.db.delete_task(tasks[2].id)
+        unsaved = TaskFactory.create_task("Sin guardar", "")
+        for task in tasks:
+            task.title += " editada"
+        
+        results = self.db.update_many(tasks + [unsaved])
+        
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(self.titles(), [(tasks[0].id, "T0 editada"), (tasks[1].id, "T1 editada"),
+                                         (tasks[2].id, "T2")])
+    
+    def test_delete_and_restore_many(self):
+        tasks = [TaskFactory.create_task(f"T{i}", "") for i in range(3)]
+        self.db.insert_many(tasks)
+        
+        results = self.db.delete_many([tasks[0], tasks[1].id, tasks[0], 9999])
+        
+        self.assertEqual(results, [True, True, True, False])
+        self.assertEqual(self.titles("deleted_at IS NULL"), [(tasks[2].id, "T2")])
+        restored = self.db.restore_many([tasks[0].id, tasks[2].id])
+        self.assertEqual(restored[0].id, tasks[0].id)
+        self.assertIsNone(restored[1])
+        self.assertEqual(self.titles("deleted_at IS NOT NULL"), [(tasks[1].id, "T1")])
+    
+    def test_failed_unit_rolls_back_bulk_writes(self):
+        tasks = [TaskFactory.create_task(f"T{i}", "") for i in range(2)]
+        self.db.insert_many(tasks)
+        new_task = TaskFactory.create_task("Nueva", "")
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.submit_write(self.db._op_delete_many, tasks, [None, None])
+                self.db.submit_write(self.db._op_insert_many, [new_task])
+                self.db.submit_write(_fail)
+        self.assertIsNone(new_task.id)
+        self.assertEqual(self.titles("deleted_at IS NULL"), [(task.id, task.title) for task in tasks])
+
+
+
+class TimeReportTest(DatabaseTestCase):
+    """El informe marca las tareas eliminadas: siguen en tasks con su título"""
+    
+    def test_report_marks_deleted_tasks(self):
+        task = TaskFactory.create_task("Informe", "")
+        self.db.save_task(task)
+        now = datetime.datetime.now().timestamp()
+        
+        def log_work(cursor):
+            cursor.execute("INSERT INTO time_intervals (task_id, started_at, ended_at) VALUES (?, ?, ?)",
+                           (task.id, now - 60, now))
+            roll_up_interval(cursor, cursor.lastrowid, now)
+        self.db.submit_write(log_work).result()
+        today = datetime.date.fromtimestamp(now)
+        report = lambda: [row[2:] for row in self.db.time_report(today, today + datetime.timedelta(days=1))]
+        
+        self.assertEqual(report(), [("Informe", 60, False)])
+        self.db.delete_task(task.id)
+        self.assertEqual(report(), [("Informe", 60, True)])
+        self.db.clear_deleted_tasks()
+        self.assertEqual(report(), [(None, 60, True)])
+
+
+class SaveSchedulerTest(DatabaseTestCase):
+    """Pausar o reanudar se guarda una sola vez, a través del programador"""
+    
+    def test_flush_without_waiting_writes_the_transition_once(self):
+        saver = SaveScheduler(self.db, quiet_period=60, max_delay=60)
+        try:
+            task = TaskFactory.create_task("A", "")
+            self.db.save_task(task)
+            saver.track([task])
+            task.timer.start()
+            
+            self.assertEqual(saver.flush(wait=False).result(), 1)
+            self.assertIsNone(saver.flush(wait=False))
+            self.assertEqual(saver.stats()["pending"], 0)
+            self.assertEqual(self.rows("SELECT COUNT(*) FROM time_intervals WHERE task_id = ?", (task.id,)), [(1,)])
+        finally:
+            saver.close()
+
+
+class BackupTest(DatabaseTestCase):
+    """Dos copias seguidas, aunque caigan en el mismo segundo, no se pisan"""
+    
+    def test_backups_in_the_same_second_are_kept(self):
+        directory = os.path.join(self._tmp_dir.name, "backups")
+        paths = [self.db.backup(directory, step_pause=0) for _ in range(3)]
+        
+        self.assertNotIn(None, paths)
+        self.assertEqual(len(set(paths)), 3)
+        self.assertEqual(self.db.list_backups(directory), paths[::-1])
+        self.assertFalse([name for name in os.listdir(directory) if name.endswith(".part")])
+
+
+class ImportTest(DatabaseTestCase):
+    """import_csv entrega por tramos las tareas activas importadas, con el id de su fila"""
+    
+    def test_import_passes_new_tasks_by_chunk(self):
+        existing = TaskFactory.create_task("Existente", "")
+        self.db.save_task(existing)
+        path = os.path.join(self._tmp_dir.name, "tareas.csv")
+        with open(path, "w", encoding="utf-8", newline="") as csvfile:
+            csvfile.write("Titulo,Nota,Enlace,Tiempo (segundos),Estado,Fecha Eliminacion\n")
+            csvfile.write("A,nota A,,10,Activa,\n")
+            csvfile.write("B,,,60,Eliminada,2024-01-01 10:00:00\n")
+            csvfile.write("C,,http://c,5,Activa,\n")
+            csvfile.write("D,,,1,Activa,\n")
+        
+        chunks = []
+        result = import_csv(self.db, path, chunk_size=2, on_tasks=chunks.append)
+        imported_tasks = [task for chunk in chunks for task in chunk]
+        
+        self.assertEqual((result.active, result.deleted), (3, 1))
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 2])
+        self.assertEqual([(task.id, task.title, task.note, task.link, task.elapsed_time) for task in imported_tasks],
+                         self.rows("SELECT id, title, note, link, elapsed_time FROM tasks "
+                                   "WHERE deleted_at IS NULL AND id != ? ORDER BY id", (existing.id,)))
+        self.assertFalse(any(task.is_dirty() for task in imported_tasks))
+    
+    def test_tasks_are_only_built_on_request(self):
+        future = self.db.import_rows_async([("A", "", "", 0)], [("B", "", "", 0, None)])
+        self.assertEqual(future.result(), (1, 1, []))
+
+
+class SearchTest(DatabaseTestCase):
+    """La búsqueda pone primero las coincidencias en el título, aunque haya muchas más recientes en la nota"""
+    
+    def test_old_title_match_ranks_first(self):
+        old_task = TaskFactory.create_task("Informe anual", "")
+        self.db.save_task(old_task)
+        self.db.insert_many([TaskFactory.create_task(f"Tarea {i}", "revisar el informe") for i in range(1100)])
+        
+        results = self.db.search("informe", limit=5)
+        
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0].task_id, old_task.id)
+        self.assertEqual(len({result.task_id for result in results}), 5)
+
+
+class LegacyTimeTest(unittest.TestCase):
+    """El tiempo anterior a time_intervals cuenta para la tarea, pero no para ningún día"""
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self._tmp_dir.name, "legacy.db")
+        # focus_title.db es una base de datos de antes de las migraciones
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "focus_title.db"), path)
+        self.db = Database(path)
+    
+    def tearDown(self):
+        self.db.close()
+        self._tmp_dir.cleanup()
+    
+    def test_legacy_time_is_undated(self):
+        self.assertTrue(self.db.backfills_done.wait(5))
+        task = next(task for task in self.db.load_tasks() if task.title == "TAREA3")
+        today = datetime.date.today()
+        midnight = datetime.datetime.combine(today, datetime.time()).timestamp()
+        
+        self.assertEqual(self.db.get_logged_time(task.id), 4)
+        self.assertEqual(self.db.get_time_between(task.id, midnight, midnight + 86400), 0)
+        self.assertEqual(self.db.time_report(today, today + datetime.timedelta(days=1)), [])
+        self.assertEqual(self.db.time_report(datetime.date(1970, 1, 1), today, "month"), [])
+
+
+
+class SoftDeleteMigrationTest(unittest.TestCase):
+    """Al pasar deleted_tasks a tasks, el historial se indexa en segundo plano y no al migrar"""
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp_dir.name, "legacy.db")
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "focus_title.db"), self.path)
+        connection = sqlite3.connect(self.path)
+        connection.executemany("INSERT INTO deleted_tasks (title, note) VALUES (?, ?)",
+                               [(f"Archivada {i}", "historial") for i in range(50)])
+        connection.commit()
+        connection.close()
+    
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+    
+    def test_history_is_indexed_by_backfill(self):
+        connection = sqlite3.connect(self.path)
+        run_migrations(connection)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM task_search").fetchone()[0], 0)
+        connection.close()
+        
+        db = Database(self.path)
+        try:
+            self.assertTrue(db.backfills_done.wait(5))
+            results = db.search("archivada", limit=100)
+            self.assertEqual(len(results), 50)
+            self.assertTrue(all(result.deleted for result in results))
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Pruebas de los temporizadores con un reloj simulado (versiones reducidas de
+"python benchmarks.py drift" y "python benchmarks.py concurrent").
+
+Uso:
+    python -m unittest test_timer
+"""
+import asyncio
+import math
+import random
+import unittest
+from unittest import mock
+from benchmarks import FakeClock
+from models import NS_PER_SECOND, TaskTimer, TimerState
+from ticker import TICK_MARGIN, TickScheduler
+
+
+class TimerDriftTest(unittest.TestCase):
+    """Miles de ciclos arranque/pausa no acumulan ni un nanosegundo de deriva"""
+    
+    def test_no_drift_after_many_cycles(self):
+        rng = random.Random(7)
+        clock = FakeClock()
+        timer = TaskTimer(clock=clock)
+        expected_ns = 0
+        for cycle in range(20_000):
+            timer.start(keep_elapsed=True)
+            run_ns = rng.randrange(1, 3 * NS_PER_SECOND)
+            clock.advance(run_ns)
+            if cycle % 100 == 0:
+                # Un ajuste de la hora con el temporizador en marcha no cambia lo medido
+                clock.adjust_wall(rng.uniform(-120.0, 120.0))
+            expected_ns += run_ns
+            timer.pause()
+            clock.advance(rng.randrange(0, 5 * NS_PER_SECOND))
+            timer.interval_events.clear()
+        
+        self.assertEqual(timer.get_elapsed_ns(), expected_ns)
+        self.assertEqual(timer.get_elapsed_time(), expected_ns // NS_PER_SECOND)
+    
+    def test_running_timer_reads_without_drift(self):
+        clock = FakeClock()
+        timer = TaskTimer(clock=clock)
+        timer.start()
+        for second in range(1, 1001):
+            clock.advance(NS_PER_SECOND)
+            self.assertEqual(timer.get_elapsed_time(), second)
+        self.assertEqual(timer.state, TimerState.RUNNING)
+
+
+class ConcurrentTimersTest(unittest.TestCase):
+    """Varios temporizadores en marcha con un solo TickScheduler y un reloj simulado"""
+    
+    def test_every_timer_advances_once_per_tick(self):
+        clock = FakeClock()
+        timers = []
+        for _ in range(5):
+            # Cada temporizador empieza a una fracción de segundo distinta
+            timers.append(TaskTimer(clock=clock).start())
+            clock.advance(NS_PER_SECOND * 3 // 10)
+        
+        loop = asyncio.new_event_loop()
+        real_sleep = asyncio.sleep
+        
+        async def fake_sleep(delay):
+            # Dormir es avanzar el reloj simulado lo pedido (al menos un
+            # nanosegundo, para que un despertar temprano no se repita sin fin)
+            clock.advance(max(1, math.ceil(delay * NS_PER_SECOND)))
+            await real_sleep(0)
+        
+        ticker = TickScheduler(lambda handler, *args: loop.create_task(handler(*args)),
+                               clock=lambda: clock.monotonic_ns() / NS_PER_SECOND)
+        ticker.align_to(timers[0].get_monotonic_anchor())
+        shown = [[] for _ in timers]
+        tick_instants = []
+        done = loop.create_future()
+        
+        for timer, seconds in zip(timers, shown):
+            ticker.subscribe(lambda timer=timer, seconds=seconds: seconds.append(timer.get_elapsed_time()))
+        
+        def end_of_tick():
+            tick_instants.append(clock.monotonic_ns() / NS_PER_SECOND)
+            if len(tick_instants) == 30:
+                ticker.stop()
+                done.set_result(None)
+        ticker.subscribe(end_of_tick)
+        
+        with mock.patch("ticker.asyncio.sleep", fake_sleep):
+            loop.run_until_complete(done)
+        loop.run_until_complete(real_sleep(0))
+        loop.close()
+        
+        for seconds in shown:
+            self.assertEqual(len(seconds), 30)
+            self.assertEqual([b - a for a, b in zip(seconds, seconds[1:])], [1] * 29)
+        # El temporizador alineado cambia de segundo justo en cada tick
+        self.assertEqual(shown[0], list(range(shown[0][0], shown[0][0] + 30)))
+        for instant in tick_instants:
+            offset = (instant - ticker.phase - TICK_MARGIN) % ticker.interval
+            self.assertAlmostEqual(min(offset, ticker.interval - offset), 0.0, places=6)
+        self.assertEqual(ticker.ticks, 30)
+        self.assertEqual(ticker.missed_ticks, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Programador de ticks compartido por toda la aplicación.
+
+Un solo bucle asíncrono despierta una vez por segundo y llama a los
+suscriptores (por ejemplo, el que redibuja el temporizador en pantalla).
+El bucle arranca con el primer suscriptor y se cancela al quitarse el
+último, así que pausar y reanudar muchas veces nunca deja bucles duplicados
+y sin temporizadores en marcha no hay ningún despertar.
+
+Cada despertar se programa para el próximo cambio de segundo del
+temporizador mostrado (ver align_to), medido con el reloj monotónico. El
+plazo se calcula de nuevo en cada vuelta a partir del reloj, no sumando
+intervalos, así que los retrasos no se acumulan; y un despertar que llega
+antes del límite no repite el segundo anterior.
+"""
+import asyncio
+import math
+import threading
+import time
+
+# Segundos entre ticks
+TICK_INTERVAL = 1.0
+
+# Margen tras el límite del segundo: al despertar, int(transcurrido) ya cambió
+TICK_MARGIN = 0.005
+
+# Marca del bucle que se está arrancando (todavía sin Future)
+_STARTING = object()
+
+
+class TickScheduler:
+    """Bucle único que reparte un tick por segundo entre los suscriptores"""
+    
+    def __init__(self, run_task, interval=TICK_INTERVAL, clock=time.monotonic):
+        """
+        Args:
+            run_task: Función que ejecuta una corrutina en el bucle de la interfaz
+                y devuelve un Future cancelable (page.run_task en Flet)
+            interval: Segundos entre ticks
+            clock: Reloj monotónico con el que se programan los despertares
+        """
+        self.run_task = run_task
+        self.interval = interval
+        self.clock = clock
+        # Instante del reloj monotónico (módulo interval) en el que cae cada tick
+        self.phase = 0.0
+        # Funciones sin argumentos, en orden de suscripción; un dict evita duplicados
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._handle = None
+        # Cambia cada vez que se arranca o se detiene el bucle: un bucle de una
+        # generación anterior que aún no atendió su cancelación termina solo
+        self._generation = 0
+        # Contadores (solo lectura desde fuera)
+        self.wakeups = 0
+        self.ticks = 0
+        self.missed_ticks = 0  # Límites que pasaron sin despertar (bucle bloqueado)
+        self.loops_started = 0
+    
+    def align_to(self, anchor):
+        """
+        Hace coincidir los ticks con los cambios de segundo de un temporizador
+        cuyo tiempo se cuenta desde `anchor`, en segundos del mismo reloj monotónico
+        (TaskTimer.get_monotonic_anchor). Si el bucle estaba esperando con otra
+        fase, se reinicia con la nueva.
+        """
+        phase = anchor % self.interval
+        with self._lock:
+            if abs(phase - self.phase) < 1e-3:
+                return
+            self.phase = phase
+            if self._handle is None:
+                return
+            handle = self._handle
+            generation = self._next_generation()
+        if handle is not _STARTING:
+            handle.cancel()
+        self._launch(generation)
+    
+    def _next_generation(self):
+        """Prepara el arranque de un bucle nuevo (con el bloqueo tomado)"""
+        self._generation += 1
+        self._handle = _STARTING
+        self.loops_started += 1
+        return self._generation
+    
+    def _launch(self, generation):
+        handle = self.run_task(self._run, generation)
+        with self._lock:
+            if generation == self._generation:
+                self._handle = handle
+                return
+        # Se detuvo o se reinició mientras arrancaba
+        if handle is not None:
+            handle.cancel()
+    
+    def subscribe(self, callback):
+        """Agrega un suscriptor (si ya estaba, no hace nada) y arranca el bucle si hacía falta"""
+        with self._lock:
+            self._subscribers[callback] = None
+            if self._handle is not None:
+                return callback
+            generation = self._next_generation()
+        self._launch(generation)
+        return callback
+    
+    def unsubscribe(self, callback):
+        """Quita un suscriptor; sin suscriptores el bucle se cancela"""
+        with self._lock:
+            self._subscribers.pop(callback, None)
+            if self._subscribers:
+                return
+            handle, self._handle = self._handle, None
+            self._generation += 1
+        if handle is not None and handle is not _STARTING:
+            handle.cancel()
+    
+    def is_running(self):
+        with self._lock:
+            return self._handle is not None
+    
+    def _tick_index(self, now):
+        """Número del último límite de tick alcanzado en el instante `now`"""
+        return math.floor((now - self.phase - TICK_MARGIN) / self.interval)
+    
+    async def _run(self, generation):
+        last_tick = self._tick_index(self.clock())
+        while True:
+            # Dormir hasta el próximo límite, calculado siempre desde el reloj
+            deadline = self.phase + (last_tick + 1) * self.interval + TICK_MARGIN
+            await asyncio.sleep(max(0.0, deadline - self.clock()))
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self.wakeups += 1
+                tick = self._tick_index(self.clock())
+                if tick <= last_tick:
+                    # Despertó antes del límite: esperar el resto sin repetir el segundo
+                    continue
+                self.missed_ticks += tick - last_tick - 1
+                last_tick = tick
+                self.ticks += 1
+                callbacks = list(self._subscribers)
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Error en un suscriptor del temporizador: {e}")
+    
+    def stop(self):
+        """Quita todos los suscriptores y cancela el bucle"""
+        with self._lock:
+            self._subscribers.clear()
+            handle, self._handle = self._handle, None
+            self._generation += 1
+        if handle is not None and handle is not _STARTING:
+            handle.cancel()
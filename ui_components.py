@@ -1,3 +1,4 @@
+import datetime
 import flet as ft
 from utils import format_time, create_button
 
@@ -129,6 +130,49 @@ def create_task_display(title, note, timer_text, task_position_text, link=None):
         "home_button": home_button,
     }
 
+def create_task_details(page, task):
+    """
+    Nota y enlace de una tarea en las listas de tareas.
+    
+    Si la tarea se cargó solo como resumen, no se leen al crear el control:
+    se muestra un botón que los pide a la base de datos al desplegarlo, así
+    armar una lista larga no trae a memoria todas las notas.
+    """
+    details_view = ft.Column(spacing=0)
+    
+    def show_details(e=None):
+        note, link = task.note, task.link
+        details_view.controls = [
+            ft.Text(f"Nota: {note if note else 'N/A'}", style=ft.TextStyle(size=14, color=ft.Colors.GREY_500)),
+            ft.Row([
+                ft.Text("Enlace: ", style=ft.TextStyle(size=14, color=ft.Colors.GREY_700)),
+                ft.TextButton(
+                    text=link if link else "N/A",
+                    url=link if link else None,
+                    tooltip="Haz clic para abrir el enlace" if link else "No hay enlace disponible",
+                    style=ft.ButtonStyle(
+                        color=ft.Colors.BLUE_700 if link else ft.Colors.GREY_500,
+                    ),
+                    disabled=not link,
+                ),
+            ]),
+        ]
+        if e is not None:
+            page.update()
+    
+    if task.has_details():
+        # Ya está en memoria (tarea nueva o editada): mostrarla no cuesta nada
+        show_details()
+    else:
+        details_view.controls = [
+            ft.TextButton(
+                text="Mostrar nota y enlace",
+                icon=ft.Icons.EXPAND_MORE,
+                on_click=show_details,
+            ),
+        ]
+    return details_view
+
 def create_welcome_screen(title_input, note_input, link_input, add_task_button, start_button, settings_button, task_list_text):
     """
     Crea la pantalla de bienvenida con campos para agregar tareas
@@ -259,3 +303,82 @@ def create_input_fields():
     )
     
     return title_input, note_input
+
+# Rango que muestra el informe de tiempo para cada granularidad: (etiqueta, días hacia atrás)
+REPORT_RANGES = {
+    "day": ("Últimos 14 días", 14),
+    "week": ("Últimas 8 semanas", 8 * 7),
+    "month": ("Últimos 12 meses", 365),
+}
+
+def create_time_report_view(page, on_time_report):
+    """
+    Crea la vista del informe de tiempo trabajado por día, semana o mes.
+    on_time_report(inicio, fin, granularidad) devuelve las filas de Database.time_report
+    """
+    report_list = ft.Column(spacing=5)
+    
+    def report_label(title, deleted):
+        # Las eliminadas siguen en tasks con su título; solo las borradas del historial no lo tienen
+        if title is None:
+            return "(tarea borrada del historial)"
+        return f"{title} (eliminada)" if deleted else title
+    
+    def show_report(granularity):
+        label, days = REPORT_RANGES[granularity]
+        end = datetime.date.today() + datetime.timedelta(days=1)
+        start = end - datetime.timedelta(days=days)
+        rows = on_time_report(start, end, granularity)
+        
+        # Agrupar las filas por período (ya vienen ordenadas)
+        periods = {}
+        for period, task_id, title, seconds, deleted in rows:
+            periods.setdefault(period, []).append((report_label(title, deleted), deleted, seconds))
+        
+        report_list.controls.clear()
+        if not periods:
+            report_list.controls.append(ft.Text(f"Sin tiempo registrado ({label.lower()})", color=ft.Colors.GREY_500))
+        # El período más reciente primero
+        for period in sorted(periods, reverse=True):
+            entries = periods[period]
+            report_list.controls.append(
+                ft.Row([
+                    ft.Text(period, weight=ft.FontWeight.BOLD),
+                    ft.Text(format_time(sum(seconds for _, _, seconds in entries)), color=ft.Colors.BLUE_700),
+                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
+            )
+            for task_label, deleted, seconds in entries:
+                report_list.controls.append(
+                    ft.Row([
+                        ft.Text(task_label, color=ft.Colors.GREY_500 if deleted else ft.Colors.BLACK),
+                        ft.Text(format_time(seconds)),
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
+                )
+            report_list.controls.append(ft.Divider(height=1))
+    
+    def on_granularity_change(e):
+        show_report(e.control.value)
+        page.update()
+    
+    granularity_dropdown = ft.Dropdown(
+        label="Agrupar por",
+        value="day",
+        options=[
+            ft.dropdown.Option("day", "Día"),
+            ft.dropdown.Option("week", "Semana"),
+            ft.dropdown.Option("month", "Mes"),
+        ],
+        on_change=on_granularity_change,
+        width=200,
+    )
+    show_report(granularity_dropdown.value)
+    
+    return ft.Column([
+        granularity_dropdown,
+        ft.Container(
+            content=report_list,
+            border=ft.border.all(1, ft.Colors.GREY_300),
+            border_radius=10,
+            padding=10,
+        ),
+    ])